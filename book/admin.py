@@ -5,7 +5,29 @@ from django.contrib import messages
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.apps import apps
-from .models import Work, Edition, Copy, Author, OpenLibraryCache
+from django.core.management import call_command
+from .models import (
+    Work, Edition, Copy, Author, OpenLibraryCache, OpenLibraryFetchLease, OLIndexSearchDoc, OLIndexSearchIsbn,
+)
+from .routers import ol_cache_alias
+from .utils.ol_circuit_breaker import circuit_breaker
+from .utils.ol_memory_cache import memory_cache
+from .utils.ol_metrics import ol_metrics
+from .utils.ol_write_buffer import write_buffer
+
+
+def forget_pending_responses():
+    """Drop OpenLibrary responses held outside the cache table, before its rows are deleted"""
+    write_buffer.clear()
+    memory_cache.clear()
+
+
+def delete_cached_responses():
+    """Empty the OpenLibrary cache, along with the ISBN lookups built from its search responses"""
+    forget_pending_responses()
+    OpenLibraryCache.objects.all().delete()
+    OLIndexSearchIsbn.objects.all().delete()
+    OLIndexSearchDoc.objects.all().delete()
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
@@ -64,6 +86,7 @@ class OpenLibraryCacheAdmin(admin.ModelAdmin):
     
     def clear_cache(self, request, queryset):
         """Admin action to clear selected cache entries"""
+        forget_pending_responses()
         deleted_count = queryset.delete()[0]
         if deleted_count == 1:
             message = '1 cache entry was'
@@ -80,6 +103,8 @@ class BookAdminSite(admin.AdminSite):
         custom_urls = [
             path('wipe-database/', self.admin_view(self.wipe_database_view), name='wipe-database'),
             path('clear-cache/', self.admin_view(self.clear_cache_view), name='clear-cache'),
+            path('rebuild-cache/', self.admin_view(self.rebuild_cache_view), name='rebuild-cache'),
+            path('ol-metrics/', self.admin_view(self.ol_metrics_view), name='ol-metrics'),
         ]
         return custom_urls + urls
 
@@ -98,7 +123,6 @@ class BookAdminSite(admin.AdminSite):
             Edition = apps.get_model('book', 'Edition')
             Work = apps.get_model('book', 'Work')
             Author = apps.get_model('book', 'Author')
-            OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
             Location = apps.get_model('book', 'Location')
             Room = apps.get_model('book', 'Room')
             Bookcase = apps.get_model('book', 'Bookcase')
@@ -112,7 +136,7 @@ class BookAdminSite(admin.AdminSite):
             Edition.objects.all().delete()
             Work.objects.all().delete()
             Author.objects.all().delete()
-            OpenLibraryCache.objects.all().delete()
+            delete_cached_responses()
             Shelf.objects.all().delete()
             Box.objects.all().delete()
             Bookcase.objects.all().delete()
@@ -131,7 +155,7 @@ class BookAdminSite(admin.AdminSite):
 
     def clear_cache_view(self, request):
         if request.method == 'POST' and request.POST.get('confirm'):
-            OpenLibraryCache.objects.all().delete()
+            delete_cached_responses()
             messages.success(request, "OpenLibrary cache has been cleared.")
             return HttpResponseRedirect(reverse('admin:index'))
         
@@ -141,6 +165,38 @@ class BookAdminSite(admin.AdminSite):
             context={'title': 'Clear OpenLibrary Cache'}
         )
 
+    def rebuild_cache_view(self, request):
+        """Recreate the OpenLibrary cache database's schema and empty it"""
+        if request.method == 'POST' and request.POST.get('confirm'):
+            alias = ol_cache_alias()
+            # Brings a new or outdated cache database up to the current schema
+            call_command('migrate', 'book', database=alias, verbosity=0)
+            OpenLibraryFetchLease.objects.all().delete()
+            delete_cached_responses()
+            OpenLibraryCache.vacuum()
+            messages.success(request, f"OpenLibrary cache database '{alias}' has been rebuilt.")
+            return HttpResponseRedirect(reverse('admin:index'))
+
+        return render(
+            request,
+            'admin/rebuild_cache_confirmation.html',
+            context={'title': 'Rebuild OpenLibrary Cache Database', 'alias': ol_cache_alias()}
+        )
+
+    def ol_metrics_view(self, request):
+        """Summary of OpenLibrary cache hits, misses and upstream latency in this worker"""
+        return render(
+            request,
+            'admin/ol_metrics.html',
+            context={
+                **self.each_context(request),
+                'title': 'OpenLibrary Metrics',
+                'rows': ol_metrics.summary(),
+                'memory_cache': memory_cache.stats(),
+                'circuit': circuit_breaker.stats(),
+            }
+        )
+
 # Create custom admin site instance
 admin_site = BookAdminSite(name='admin')
 
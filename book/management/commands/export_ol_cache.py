@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from book.utils.ol_cache_bundle import export_entries
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Writes OpenLibrary cache entries to a compressed bundle that import_ol_cache can load elsewhere'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'bundle',
+            help='Path of the bundle to write (conventionally .jsonl.gz)',
+        )
+        parser.add_argument(
+            '--referenced',
+            action='store_true',
+            help='Only entries about Works and Authors in the local catalogue',
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Only entries of this endpoint type (author, work, work_search, ...); repeatable',
+        )
+        parser.add_argument(
+            '--include-expired',
+            action='store_true',
+            help='Also export entries past their cache lifetime',
+        )
+        parser.add_argument(
+            '--fixture',
+            action='store_true',
+            help='Mark the bundle as a fixture, whose entries are stamped as fetched when imported',
+        )
+
+    def handle(self, *args, **options):
+        written = export_entries(
+            options['bundle'],
+            referenced_only=options['referenced'],
+            endpoints=options['endpoints'],
+            include_expired=options['include_expired'],
+            fixture=options['fixture'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Exported {written} cache entries to {options["bundle"]}'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from book.utils.ol_cache_bundle import BundleError, import_entries
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Loads a bundle written by export_ol_cache into the OpenLibrary cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'bundle',
+            help='Path of the bundle to read',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Overwrite entries that are already cached (by default they are kept)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Entries per bulk INSERT',
+        )
+        ages = parser.add_mutually_exclusive_group()
+        ages.add_argument(
+            '--as-fresh',
+            action='store_true',
+            dest='as_fresh',
+            default=None,
+            help='Stamp entries as fetched now (the default for fixture bundles)',
+        )
+        ages.add_argument(
+            '--keep-age',
+            action='store_false',
+            dest='as_fresh',
+            help='Keep when entries were originally fetched (the default for other bundles)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            imported = import_entries(options['bundle'], replace=options['replace'],
+                                      chunk_size=options['chunk_size'], as_fresh=options['as_fresh'])
+        except (BundleError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} cache entries from {options["bundle"]}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from book.models import OpenLibraryCache
+from book.utils.ol_isbn import index_search_docs, isbn_index_enabled
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Fills the local ISBN index from the search.json responses already in the OpenLibrary cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Cache entries indexed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        if not isbn_index_enabled():
+            raise CommandError('OL_ISBN_INDEX is off')
+        entries = OpenLibraryCache.objects.filter(request_url__contains='/search.json').order_by('pk')
+        chunk, scanned, indexed = [], 0, 0
+        for entry in entries.iterator(chunk_size=options['chunk_size']):
+            chunk.append((entry.request_url, entry.response_data))
+            scanned += 1
+            if len(chunk) >= options['chunk_size']:
+                indexed += index_search_docs(chunk)
+                chunk = []
+        if chunk:
+            indexed += index_search_docs(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} ISBNs from {scanned} cached searches'))
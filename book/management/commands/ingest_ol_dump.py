@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from book.utils.ol_offline import DUMP_KINDS, detect_dump_kind, ingest_dump
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Loads OpenLibrary bulk dumps (authors, works, editions) into the offline lookup index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dumps',
+            nargs='+',
+            help='Dump files (.txt or .txt.gz); load authors and works before editions',
+        )
+        parser.add_argument(
+            '--kind',
+            choices=DUMP_KINDS,
+            help='Dump kind, if it cannot be told from the file name',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Dump lines per transaction; progress is saved after each one',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Stop after reading this many lines of each dump (the next run resumes)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore saved progress and read each dump from the beginning',
+        )
+
+    def handle(self, *args, **options):
+        for path in options['dumps']:
+            if not os.path.exists(path):
+                raise CommandError(f'No such file: {path}')
+            kind = options['kind'] or detect_dump_kind(path)
+            if not kind:
+                raise CommandError(f'Cannot tell what kind of dump {path} is; pass --kind')
+
+            self.stdout.write(f'Ingesting {kind} from {path}...')
+            progress = ingest_dump(path, kind, chunk_size=options['chunk_size'],
+                                   restart=options['restart'], limit=options['limit'])
+            status = 'complete' if progress.completed else 'paused'
+            self.stdout.write(self.style.SUCCESS(
+                f'{path}: {status} after {progress.lines_done} lines, '
+                f'{progress.records_done} index rows written'
+            ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+from book.models import OpenLibraryCache
+from book.utils.ol_client import endpoint_type
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Reports OpenLibrary cache size and bytes saved by compression, per endpoint type'
+
+    def handle(self, *args, **options):
+        totals = {}
+        rows = (OpenLibraryCache.objects
+                .annotate(stored_size=Length('payload'))
+                .values_list('request_url', 'original_size', 'stored_size')
+                .iterator(chunk_size=1000))
+        for url, original_size, stored_size in rows:
+            entry = totals.setdefault(endpoint_type(url), {'entries': 0, 'original': 0, 'stored': 0})
+            entry['entries'] += 1
+            entry['original'] += original_size or 0
+            entry['stored'] += stored_size or 0
+
+        if not totals:
+            self.stdout.write('OpenLibrary cache is empty')
+            return
+
+        self.stdout.write(f'{"Endpoint":<22}{"Entries":>9}{"Original":>14}{"Stored":>14}{"Saved":>14}{"Ratio":>8}')
+        overall = {'entries': 0, 'original': 0, 'stored': 0}
+        for name in sorted(totals):
+            self._write_row(name, totals[name])
+            for key in overall:
+                overall[key] += totals[name][key]
+        self._write_row('TOTAL', overall)
+
+    def _write_row(self, name, entry):
+        saved = entry['original'] - entry['stored']
+        ratio = entry['stored'] / entry['original'] if entry['original'] else 0
+        self.stdout.write(
+            f'{name:<22}{entry["entries"]:>9}{entry["original"]:>14}'
+            f'{entry["stored"]:>14}{saved:>14}{ratio:>8.0%}'
+        )
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from book.models import OpenLibraryCache
+from book.utils.ol_client import max_staleness_hours
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Deletes expired OpenLibrary cache entries and evicts the oldest ones beyond a size budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-rows',
+            type=int,
+            default=getattr(settings, 'OL_CACHE_MAX_ROWS', None),
+            help='Evict least recently fetched entries beyond this many rows',
+        )
+        parser.add_argument(
+            '--max-bytes',
+            type=int,
+            default=getattr(settings, 'OL_CACHE_MAX_BYTES', None),
+            help='Evict least recently fetched entries until payloads fit in this many bytes',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Rows deleted per DELETE statement',
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='VACUUM the database afterwards to shrink the file',
+        )
+
+    def handle(self, *args, **options):
+        rows_before = OpenLibraryCache.objects.count()
+        bytes_before = OpenLibraryCache.total_bytes()
+        self.stdout.write(f'Cache holds {rows_before} entries ({bytes_before} bytes)')
+
+        # Entries inside the stale-while-revalidate window are still worth keeping
+        expired = OpenLibraryCache.prune_expired(grace_hours=max_staleness_hours(),
+                                                 chunk_size=options['chunk_size'])
+        self.stdout.write(f'Deleted {expired} expired entries')
+
+        if options['max_rows'] is not None or options['max_bytes'] is not None:
+            evicted = OpenLibraryCache.evict_to_limits(
+                max_rows=options['max_rows'],
+                max_bytes=options['max_bytes'],
+                chunk_size=options['chunk_size'],
+            )
+            self.stdout.write(f'Evicted {evicted} entries to stay within limits')
+
+        if options['vacuum']:
+            self.stdout.write('Running VACUUM...')
+            OpenLibraryCache.vacuum()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Cache now holds {OpenLibraryCache.objects.count()} entries '
+            f'({OpenLibraryCache.total_bytes()} bytes)'
+        ))
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.4 on 2026-10-17 10:12
+
+import json
+import zlib
+
+from django.db import migrations, models
+
+
+def compress_payloads(apps, schema_editor):
+    """Move each row's JSON response_data into the compressed payload column"""
+    OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for entry in OpenLibraryCache.objects.using(db_alias).only('request_url', 'response_data').iterator(chunk_size=500):
+        raw = json.dumps(entry.response_data, separators=(',', ':')).encode('utf-8')
+        entry.payload = zlib.compress(raw)
+        entry.original_size = len(raw)
+        batch.append(entry)
+        if len(batch) >= 500:
+            OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['payload', 'original_size'])
+            batch = []
+    if batch:
+        OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['payload', 'original_size'])
+
+
+def decompress_payloads(apps, schema_editor):
+    """Reverse of compress_payloads"""
+    OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for entry in OpenLibraryCache.objects.using(db_alias).only('request_url', 'payload').iterator(chunk_size=500):
+        entry.response_data = json.loads(zlib.decompress(bytes(entry.payload)).decode('utf-8'))
+        batch.append(entry)
+        if len(batch) >= 500:
+            OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['response_data'])
+            batch = []
+    if batch:
+        OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['response_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0012_reset_database'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openlibrarycache',
+            name='payload',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='openlibrarycache',
+            name='original_size',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='openlibrarycache',
+            name='response_data',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(compress_payloads, decompress_payloads,
+                             hints={'model_name': 'openlibrarycache'}),
+        migrations.RemoveField(
+            model_name='openlibrarycache',
+            name='response_data',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0013_openlibrarycache_compressed_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpenLibraryFetchLease',
+            fields=[
+                ('request_url', models.CharField(max_length=2000, primary_key=True, serialize=False)),
+                ('holder', models.CharField(max_length=255)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+    ]
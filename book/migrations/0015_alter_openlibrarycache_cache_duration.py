@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0014_openlibraryfetchlease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='openlibrarycache',
+            name='cache_duration',
+            field=models.FloatField(default=24),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.4 on 2026-10-17 15:40
+
+from django.db import migrations, models
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+import hashlib
+import re
+
+
+# Frozen copy of book.models.cache.canonical_url/cache_key as they were when this migration
+# was written, so that later changes to the live functions don't change what it does.
+CASE_INSENSITIVE_PARAMS = ('q', 'title', 'author', 'name')
+
+
+def canonical_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    params = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        value = re.sub(r'\s+', ' ', value).strip()
+        if name in CASE_INSENSITIVE_PARAMS:
+            value = value.lower()
+        params.append((name, value))
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ''))
+
+
+def cache_key(url):
+    return hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
+
+def assign_cache_keys(apps, schema_editor):
+    """Key every row by its canonical URL hash, keeping the freshest row when several collide"""
+    OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
+    db_alias = schema_editor.connection.alias
+    rows = (OpenLibraryCache.objects.using(db_alias)
+            .order_by('-last_updated')
+            .values_list('request_url', flat=True))
+    seen = set()
+    duplicates = []
+    batch = []
+    for url in rows.iterator(chunk_size=500):
+        key = cache_key(url)
+        if key in seen:
+            duplicates.append(url)
+            continue
+        seen.add(key)
+        batch.append(OpenLibraryCache(request_url=url, cache_key=key))
+        if len(batch) >= 500:
+            OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['cache_key'])
+            batch = []
+    if batch:
+        OpenLibraryCache.objects.using(db_alias).bulk_update(batch, ['cache_key'])
+    for start in range(0, len(duplicates), 500):
+        OpenLibraryCache.objects.using(db_alias).filter(
+            request_url__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0015_alter_openlibrarycache_cache_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='openlibrarycache',
+            name='cache_key',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(assign_cache_keys, migrations.RunPython.noop,
+                             hints={'model_name': 'openlibrarycache'}),
+        migrations.AlterField(
+            model_name='openlibrarycache',
+            name='cache_key',
+            field=models.CharField(max_length=64, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='openlibrarycache',
+            name='request_url',
+            field=models.CharField(max_length=2000),
+        ),
+    ]
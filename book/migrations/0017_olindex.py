@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-17 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0016_openlibrarycache_cache_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OLIndexAuthor',
+            fields=[
+                ('olid', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=500)),
+                ('name_search', models.CharField(db_index=True, max_length=500)),
+                ('record', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OLIndexEdition',
+            fields=[
+                ('isbn', models.CharField(max_length=13, primary_key=True, serialize=False)),
+                ('edition_olid', models.CharField(max_length=20)),
+                ('work_olid', models.CharField(db_index=True, max_length=20)),
+                ('publisher', models.CharField(blank=True, max_length=500)),
+                ('publish_date', models.CharField(blank=True, max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OLIndexIngestProgress',
+            fields=[
+                ('dump_path', models.CharField(max_length=1000, primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=20)),
+                ('lines_done', models.BigIntegerField(default=0)),
+                ('records_done', models.BigIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OLIndexWork',
+            fields=[
+                ('olid', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=1000)),
+                ('title_search', models.CharField(db_index=True, max_length=1000)),
+                ('author_olids', models.CharField(blank=True, max_length=1000)),
+                ('first_publish_year', models.IntegerField(null=True)),
+                ('record', models.BinaryField()),
+            ],
+        ),
+    ]
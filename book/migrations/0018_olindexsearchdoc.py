@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0017_olindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OLIndexSearchDoc',
+            fields=[
+                ('olid', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('doc', models.BinaryField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Fill surnames and author credits for rows ingested before they existed"""
+    OLIndexAuthor = apps.get_model('book', 'OLIndexAuthor')
+    OLIndexWork = apps.get_model('book', 'OLIndexWork')
+    OLIndexWorkAuthor = apps.get_model('book', 'OLIndexWorkAuthor')
+    OLIndexIngestProgress = apps.get_model('book', 'OLIndexIngestProgress')
+    db_alias = schema_editor.connection.alias
+
+    batch = []
+    for author in OLIndexAuthor.objects.using(db_alias).only('olid', 'name_search').iterator(chunk_size=5000):
+        author.surname_search = author.name_search.rsplit(' ', 1)[-1]
+        batch.append(author)
+        if len(batch) >= 5000:
+            OLIndexAuthor.objects.using(db_alias).bulk_update(batch, ['surname_search'])
+            batch = []
+    if batch:
+        OLIndexAuthor.objects.using(db_alias).bulk_update(batch, ['surname_search'])
+
+    credits = []
+    works = OLIndexWork.objects.using(db_alias).exclude(author_olids='').values_list('olid', 'author_olids')
+    for work_olid, author_olids in works.iterator(chunk_size=5000):
+        credits.extend(OLIndexWorkAuthor(author_olid=olid, work_olid=work_olid)
+                       for olid in dict.fromkeys(filter(None, author_olids.split(','))))
+        if len(credits) >= 5000:
+            OLIndexWorkAuthor.objects.using(db_alias).bulk_create(credits, ignore_conflicts=True)
+            credits = []
+    if credits:
+        OLIndexWorkAuthor.objects.using(db_alias).bulk_create(credits, ignore_conflicts=True)
+
+    # Unfinished ingests have no byte offset to resume from; they start over (rows are upserted)
+    OLIndexIngestProgress.objects.using(db_alias).filter(completed=False).update(lines_done=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0018_olindexsearchdoc'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='olindexauthor',
+            name='surname_search',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='olindexingestprogress',
+            name='bytes_done',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='OLIndexWorkAuthor',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('author_olid', models.CharField(max_length=20)),
+                ('work_olid', models.CharField(db_index=True, max_length=20)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('author_olid', 'work_olid'),
+                                                        name='olindex_work_author')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop,
+                             hints={'model_name': 'olindexworkauthor'}),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:10
+
+from django.db import connections, migrations
+from django.db.models.expressions import RawSQL
+from itertools import islice
+import json
+import zlib
+
+# Tables an install migrated before the cache moved to its own database still has in 'default'
+LEGACY_CACHE_TABLE = 'book_openlibrarycache'
+LEGACY_LEASE_TABLE = 'book_openlibraryfetchlease'
+CACHE_COLUMNS = ['cache_key', 'request_url', 'payload', 'original_size', 'last_updated', 'cache_duration']
+
+
+def legacy_entries(OpenLibraryCache, legacy, columns):
+    """
+    The leftover table's rows as CACHE_COLUMNS dicts.
+
+    A table from before migration 0016 is keyed by request_url and holds the response as
+    JSON (response_data, before 0013) or compressed (payload); its rows are keyed with the
+    live cache_key here, newest first so that the freshest of colliding URLs wins.
+    """
+    rows = OpenLibraryCache.objects.using('default')
+    if 'cache_key' in columns:
+        yield from rows.values(*CACHE_COLUMNS).iterator(chunk_size=500)
+        return
+    from book.models.cache import OpenLibraryCache as LiveCache, cache_key
+    data_column = 'payload' if 'payload' in columns else 'response_data'
+    rows = (rows.order_by('-last_updated')
+            .annotate(legacy_data=RawSQL(legacy.ops.quote_name(data_column), ()))
+            .values_list('request_url', 'legacy_data', 'last_updated', 'cache_duration'))
+    seen = set()
+    for url, data, last_updated, cache_duration in rows.iterator(chunk_size=500):
+        key = cache_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        if data_column == 'payload':
+            payload = bytes(data)
+            original_size = len(zlib.decompress(payload))
+        else:
+            payload, original_size = LiveCache.encode_payload(json.loads(data) if isinstance(data, str) else data)
+        yield {'cache_key': key, 'request_url': url, 'payload': payload, 'original_size': original_size,
+               'last_updated': last_updated, 'cache_duration': cache_duration}
+
+
+def move_legacy_cache(apps, schema_editor):
+    """
+    Copy cache rows left in the default database into this (the cache) database and
+    drop the old tables there.
+    """
+    if schema_editor.connection.alias == 'default':
+        return
+    legacy = connections['default']
+    tables = legacy.introspection.table_names()
+    if LEGACY_CACHE_TABLE not in tables:
+        return
+    with legacy.cursor() as cursor:
+        columns = [column.name for column in legacy.introspection.get_table_description(cursor, LEGACY_CACHE_TABLE)]
+
+    OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
+    db_alias = schema_editor.connection.alias
+    # using() reads the leftover table even though the router sends the model elsewhere
+    leftovers = legacy_entries(OpenLibraryCache, legacy, columns)
+    while True:
+        rows = list(islice(leftovers, 500))
+        if not rows:
+            break
+        # Entries already fetched into the new database are newer; keep those
+        existing = set(OpenLibraryCache.objects.using(db_alias)
+                       .filter(cache_key__in=[row['cache_key'] for row in rows])
+                       .values_list('cache_key', flat=True))
+        rows = [row for row in rows if row['cache_key'] not in existing]
+        created = OpenLibraryCache.objects.using(db_alias).bulk_create(
+            [OpenLibraryCache(**row) for row in rows])
+        # last_updated is auto_now, so bulk_create stamped the rows with the current time
+        for entry, row in zip(created, rows):
+            entry.last_updated = row['last_updated']
+        OpenLibraryCache.objects.using(db_alias).bulk_update(created, ['last_updated'])
+    with legacy.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {LEGACY_CACHE_TABLE}")
+        if LEGACY_LEASE_TABLE in tables:
+            cursor.execute(f"DROP TABLE {LEGACY_LEASE_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0019_olindex_seekable_lookups'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_legacy_cache, migrations.RunPython.noop,
+                             hints={'model_name': 'openlibrarycache'}),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+def move_search_isbns(apps, schema_editor):
+    """Move the ISBN rows indexed from search docs (no edition OLID) out of OLIndexEdition"""
+    OLIndexEdition = apps.get_model('book', 'OLIndexEdition')
+    OLIndexSearchIsbn = apps.get_model('book', 'OLIndexSearchIsbn')
+    db_alias = schema_editor.connection.alias
+
+    derived = OLIndexEdition.objects.using(db_alias).filter(edition_olid='')
+    batch = []
+    for isbn, work_olid in derived.values_list('isbn', 'work_olid').iterator(chunk_size=5000):
+        batch.append(OLIndexSearchIsbn(isbn=isbn, work_olid=work_olid))
+        if len(batch) >= 5000:
+            OLIndexSearchIsbn.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        OLIndexSearchIsbn.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+    derived.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0020_move_legacy_ol_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OLIndexSearchIsbn',
+            fields=[
+                ('isbn', models.CharField(max_length=13, primary_key=True, serialize=False)),
+                ('work_olid', models.CharField(db_index=True, max_length=20)),
+            ],
+        ),
+        migrations.RunPython(move_search_isbns, migrations.RunPython.noop,
+                             hints={'model_name': 'olindexsearchisbn'}),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:05
+
+from django.db import migrations
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+import hashlib
+import re
+
+
+# Frozen copy of book.models.cache.canonical_url/cache_key as they are now. Migration 0016
+# lowercased every free-text value, OLIDs and q= boolean operators included, so rows it
+# keyed under those rules are unreachable with these.
+CASE_INSENSITIVE_PARAMS = ('q', 'title', 'author', 'name')
+OL_IDENTIFIER = re.compile(r'^OL\d+[AMW]$')
+SEARCH_OPERATOR = re.compile(r'^(AND|OR|NOT)$')
+
+
+def canonical_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    params = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        value = re.sub(r'\s+', ' ', value).strip()
+        if name in CASE_INSENSITIVE_PARAMS and not OL_IDENTIFIER.match(value):
+            value = ' '.join(word if name == 'q' and SEARCH_OPERATOR.match(word) else word.lower()
+                             for word in value.split(' '))
+        params.append((name, value))
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ''))
+
+
+def cache_key(url):
+    return hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
+
+def rekey_cache(apps, schema_editor):
+    """Re-key every row by the current rules, keeping the freshest row when several collide"""
+    OpenLibraryCache = apps.get_model('book', 'OpenLibraryCache')
+    db_alias = schema_editor.connection.alias
+    rows = (OpenLibraryCache.objects.using(db_alias)
+            .order_by('-last_updated')
+            .values_list('cache_key', 'request_url'))
+    seen = set()
+    duplicates = []
+    moves = []
+    for old_key, url in rows.iterator(chunk_size=500):
+        key = cache_key(url)
+        if key in seen:
+            duplicates.append(old_key)
+            continue
+        seen.add(key)
+        if key != old_key:
+            moves.append((old_key, key))
+
+    for start in range(0, len(duplicates), 500):
+        OpenLibraryCache.objects.using(db_alias).filter(cache_key__in=duplicates[start:start + 500]).delete()
+    # A row's new key may still be another moving row's old one, so park them all under
+    # keys no hash can take ('x' is not a hex digit) before giving out the new ones
+    for start in range(0, len(moves), 500):
+        OpenLibraryCache.objects.using(db_alias).filter(
+            cache_key__in=[old_key for old_key, _ in moves[start:start + 500]]
+        ).update(cache_key=Concat(Value('x'), Substr('cache_key', 2)))
+    for old_key, key in moves:
+        OpenLibraryCache.objects.using(db_alias).filter(cache_key='x' + old_key[1:]).update(cache_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book', '0021_olindexsearchisbn'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_cache, migrations.RunPython.noop,
+                             hints={'model_name': 'openlibrarycache'}),
+    ]
@@ -2,11 +2,17 @@ from .work import Work
 from .edition import Edition
 from .copy import Copy
 from .author import Author
-from .cache import OpenLibraryCache
+from .cache import OpenLibraryCache, OpenLibraryFetchLease
+from .ol_index import (
+    OLIndexAuthor, OLIndexWork, OLIndexWorkAuthor, OLIndexEdition, OLIndexIngestProgress, OLIndexSearchDoc,
+    OLIndexSearchIsbn,
+)
 from .book import Book
 from .location import Location, Room, Bookcase, Shelf
 
 __all__ = [
-    'Work', 'Edition', 'Copy', 'Author', 'OpenLibraryCache',
+    'Work', 'Edition', 'Copy', 'Author', 'OpenLibraryCache', 'OpenLibraryFetchLease',
+    'OLIndexAuthor', 'OLIndexWork', 'OLIndexWorkAuthor', 'OLIndexEdition', 'OLIndexIngestProgress',
+    'OLIndexSearchDoc', 'OLIndexSearchIsbn',
     'Book', 'Location', 'Room', 'Bookcase', 'Shelf'
 ]
@@ -1,67 +1,302 @@
-from django.db import models
+from django.db import models, connections, router, transaction, IntegrityError
+from django.db.models.functions import Length
+import hashlib
 import json
+import re
+import zlib
 from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# Free-text search parameters OpenLibrary matches case-insensitively
+CASE_INSENSITIVE_PARAMS = ('q', 'title', 'author', 'name')
+
+OL_IDENTIFIER = re.compile(r'^OL\d+[AMW]$')
+
+# Solr boolean operators, which OpenLibrary's q= syntax only honours in capitals
+SEARCH_OPERATOR = re.compile(r'^(AND|OR|NOT)$')
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize an OpenLibrary URL so that requests meaning the same thing share a cache entry.
+
+    Lowercases the scheme and host, drops default ports and fragments, re-escapes the
+    path and query consistently, sorts query parameters, collapses whitespace in values
+    and lowercases free-text search terms. The result is still a fetchable URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parts.port}'
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~")
+    params = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        value = re.sub(r'\s+', ' ', value).strip()
+        # ...but an author=OL123A filter is an identifier, not a search term
+        if name in CASE_INSENSITIVE_PARAMS and not OL_IDENTIFIER.match(value):
+            # A q= query's boolean operators only work in capitals, so they keep them
+            value = ' '.join(word if name == 'q' and SEARCH_OPERATOR.match(word) else word.lower()
+                             for word in value.split(' '))
+        params.append((name, value))
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ''))
+
+def cache_key(url: str) -> str:
+    """Fixed-width primary key for a URL: SHA-256 of its canonical form"""
+    return hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
 class OpenLibraryCache(models.Model):
     """Cache for OpenLibrary API responses to reduce API calls"""
     
-    # The full URL of the API request
-    request_url = models.CharField(max_length=2000, primary_key=True)
+    # SHA-256 of the canonical request URL (see cache_key); keeps the PK index narrow
+    cache_key = models.CharField(max_length=64, primary_key=True)
+
+    # The URL of the API request as it was made, kept for display
+    request_url = models.CharField(max_length=2000)
     
-    # The response data stored as JSON
-    response_data = models.JSONField()
+    # The response data stored as zlib-compressed compact JSON (see response_data)
+    payload = models.BinaryField()
+
+    # Size of the uncompressed JSON, kept so we can report what compression saves
+    original_size = models.IntegerField(default=0)
     
     # When this cache entry was last updated
     last_updated = models.DateTimeField(auto_now=True)
     
-    # How long this cache entry should be considered valid (in hours)
-    # Different types of requests might have different cache durations
-    cache_duration = models.IntegerField(default=24)
+    # How long this cache entry should be considered valid (in hours, fractions allowed)
+    # Different types of requests have different cache durations; see OL_CACHE_TTL_POLICY
+    cache_duration = models.FloatField(default=24)
     
     class Meta:
         indexes = [
             models.Index(fields=['last_updated']),
         ]
     
+    @staticmethod
+    def encode_payload(response_data):
+        """Serialize response data to compressed compact JSON; returns (payload, uncompressed size)"""
+        raw = json.dumps(response_data, separators=(',', ':')).encode('utf-8')
+        return zlib.compress(raw), len(raw)
+
+    @staticmethod
+    def decode_payload(payload):
+        """Inverse of encode_payload"""
+        return json.loads(zlib.decompress(bytes(payload)).decode('utf-8'))
+
+    @property
+    def response_data(self):
+        """The decoded response data"""
+        return self.decode_payload(self.payload)
+
+    @property
+    def expires_at(self):
+        """When this cache entry stops being valid"""
+        return self.last_updated + timedelta(hours=self.cache_duration)
+
     @property
     def is_valid(self):
         """Check if the cache entry is still valid"""
-        expiry_time = self.last_updated + timedelta(hours=self.cache_duration)
-        return datetime.now().astimezone() < expiry_time
+        return datetime.now().astimezone() < self.expires_at
     
     @classmethod
-    def get_cached_response(cls, url: str) -> dict:
-        """Get a cached response if it exists and is valid"""
+    def get_cached_entry(cls, url: str, max_stale: float = 0, delete_expired: bool = True):
+        """
+        Get the cache entry for a URL if it exists and is valid.
+
+        With max_stale (hours), an expired entry is still returned while it is no more
+        than that far past its expiry; callers check is_valid to tell the two apart.
+        An entry older than that is deleted unless delete_expired is False.
+        """
         try:
-            cache_entry = cls.objects.get(request_url=url)
+            cache_entry = cls.objects.get(cache_key=cache_key(url))
             logger.debug(f"Found cache entry for {url}")
             
             if cache_entry.is_valid:
                 logger.debug(f"Cache hit for {url}")
-                return cache_entry.response_data
+                return cache_entry
+
+            if max_stale and datetime.now().astimezone() < cache_entry.expires_at + timedelta(hours=max_stale):
+                logger.debug(f"Stale cache hit for {url}")
+                return cache_entry
                 
             logger.debug(f"Cache expired for {url}")
-            # Delete expired cache entry
-            cache_entry.delete()
+            if delete_expired:
+                cache_entry.delete()
         except cls.DoesNotExist:
             logger.debug(f"No cache entry found for {url}")
         return None
+
+    @classmethod
+    def get_cached_response(cls, url: str) -> dict:
+        """Get a cached response if it exists and is valid"""
+        cache_entry = cls.get_cached_entry(url)
+        return cache_entry.response_data if cache_entry else None
     
     @classmethod
-    def cache_response(cls, url: str, response_data: dict, duration: int = 24):
+    def get_last_response(cls, url: str) -> dict:
+        """The cached response for a URL however long ago it expired, for when it can't be refetched"""
+        cache_entry = cls.objects.filter(cache_key=cache_key(url)).first()
+        return cache_entry.response_data if cache_entry else None
+
+    @classmethod
+    def cache_response(cls, url: str, response_data: dict, duration: float = 24):
         """Cache a response from the OpenLibrary API"""
         try:
+            payload, original_size = cls.encode_payload(response_data)
             cls.objects.update_or_create(
-                request_url=url,
+                cache_key=cache_key(url),
                 defaults={
-                    'response_data': response_data,
+                    'request_url': url,
+                    'payload': payload,
+                    'original_size': original_size,
                     'cache_duration': duration
                 }
             )
             logger.debug(f"Successfully cached response for {url}")
         except Exception as e:
-            logger.error(f"Failed to cache response for {url}: {e}") 
\ No newline at end of file
+            logger.error(f"Failed to cache response for {url}: {e}")
+
+    @classmethod
+    def cache_many(cls, entries):
+        """
+        Upsert several (url, response_data, duration) entries in one transaction.
+
+        One multi-row INSERT ... ON CONFLICT instead of a SELECT and a write per entry;
+        the last entry wins if a URL appears twice.
+        """
+        rows = {}
+        for url, response_data, duration in entries:
+            payload, original_size = cls.encode_payload(response_data)
+            key = cache_key(url)
+            rows[key] = cls(cache_key=key, request_url=url, payload=payload,
+                            original_size=original_size, cache_duration=duration)
+        with transaction.atomic(using=router.db_for_write(cls)):
+            cls.objects.bulk_create(
+                list(rows.values()), update_conflicts=True, unique_fields=['cache_key'],
+                update_fields=['request_url', 'payload', 'original_size', 'cache_duration', 'last_updated'])
+        logger.debug(f"Cached {len(rows)} responses in one batch")
+        return len(rows)
+
+    @classmethod
+    def _delete_in_chunks(cls, queryset, chunk_size):
+        """Delete the rows of queryset oldest-first, one short set-based DELETE per chunk"""
+        deleted = 0
+        while True:
+            keys = list(queryset.order_by('last_updated')
+                        .values_list('cache_key', flat=True)[:chunk_size])
+            if not keys:
+                return deleted
+            deleted += cls.objects.filter(cache_key__in=keys).delete()[0]
+
+    @classmethod
+    def prune_expired(cls, grace_hours: float = 0, chunk_size: int = 500) -> int:
+        """
+        Delete entries more than grace_hours past their expiry and return how many went.
+
+        Rows are grouped by cache_duration so each DELETE is a range scan on the
+        last_updated index rather than a per-row expiry calculation.
+        """
+        now = datetime.now().astimezone()
+        deleted = 0
+        durations = cls.objects.values_list('cache_duration', flat=True).distinct()
+        for duration in list(durations):
+            cutoff = now - timedelta(hours=duration + grace_hours)
+            expired = cls.objects.filter(cache_duration=duration, last_updated__lt=cutoff)
+            deleted += cls._delete_in_chunks(expired, chunk_size)
+        logger.info(f"Pruned {deleted} expired cache entries")
+        return deleted
+
+    @classmethod
+    def evict_to_limits(cls, max_rows: int = None, max_bytes: int = None,
+                        chunk_size: int = 500) -> int:
+        """
+        Evict the least recently fetched entries until the table fits max_rows and max_bytes.
+
+        last_updated is refreshed on every write, so this is LRU by fetch time; reads
+        deliberately don't write to the table.
+        """
+        deleted = 0
+        if max_rows is not None:
+            excess = cls.objects.count() - max_rows
+            while excess > 0:
+                keys = list(cls.objects.order_by('last_updated')
+                            .values_list('cache_key', flat=True)[:min(excess, chunk_size)])
+                removed = cls.objects.filter(cache_key__in=keys).delete()[0]
+                if not removed:
+                    break
+                deleted += removed
+                excess -= removed
+
+        if max_bytes is not None:
+            excess = cls.total_bytes() - max_bytes
+            while excess > 0:
+                oldest = (cls.objects.order_by('last_updated')
+                          .annotate(size=Length('payload'))
+                          .values_list('cache_key', 'size')[:chunk_size])
+                keys = []
+                for key, size in oldest:
+                    keys.append(key)
+                    excess -= size or 0
+                    if excess <= 0:
+                        break
+                if not keys:
+                    break
+                deleted += cls.objects.filter(cache_key__in=keys).delete()[0]
+
+        logger.info(f"Evicted {deleted} cache entries to stay within limits")
+        return deleted
+
+    @classmethod
+    def total_bytes(cls) -> int:
+        """Approximate size of the stored payloads"""
+        return cls.objects.aggregate(total=models.Sum(Length('payload')))['total'] or 0
+
+    @classmethod
+    def vacuum(cls):
+        """Return freed pages to the filesystem (SQLite only)"""
+        db_connection = connections[router.db_for_write(cls)]
+        # SQLite refuses to VACUUM inside a transaction
+        if db_connection.vendor != 'sqlite' or db_connection.in_atomic_block:
+            return
+        with db_connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+
+
+class OpenLibraryFetchLease(models.Model):
+    """
+    Short-lived claim on an uncached URL so that only one process fetches it.
+
+    Other processes that find a live lease wait for the cache row to appear instead
+    of sending the same request upstream.
+    """
+
+    request_url = models.CharField(max_length=2000, primary_key=True)
+
+    # Which process holds the lease (host:pid), for debugging
+    holder = models.CharField(max_length=255)
+
+    expires_at = models.DateTimeField()
+
+    @classmethod
+    def acquire(cls, url: str, holder: str, ttl_seconds: float) -> bool:
+        """Try to take the lease for url; returns False if another live holder has it"""
+        now = datetime.now().astimezone()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        # Take over a lease whose holder died or gave up
+        if cls.objects.filter(request_url=url, expires_at__lt=now).update(
+                holder=holder, expires_at=expires_at):
+            return True
+        try:
+            with transaction.atomic(using=router.db_for_write(cls)):
+                cls.objects.create(request_url=url, holder=holder, expires_at=expires_at)
+            return True
+        except IntegrityError:
+            return False
+
+    @classmethod
+    def release(cls, url: str, holder: str):
+        """Give up the lease if we still hold it"""
+        cls.objects.filter(request_url=url, holder=holder).delete()
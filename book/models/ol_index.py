@@ -0,0 +1,143 @@
+from django.db import models
+import re
+
+from .cache import OpenLibraryCache
+
+
+def search_form(text: str) -> str:
+    """Lowercased, whitespace-collapsed form of a name or title used for prefix lookups"""
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+class OLIndexAuthor(models.Model):
+    """An author record from the OpenLibrary authors dump"""
+
+    olid = models.CharField(max_length=20, primary_key=True)
+
+    name = models.CharField(max_length=500)
+
+    # search_form(name), for autocomplete-style prefix matching
+    name_search = models.CharField(max_length=500, db_index=True)
+
+    # Last word of name_search, so a surname finds the author through an index too
+    surname_search = models.CharField(max_length=500, db_index=True, blank=True, default='')
+
+    # The dump record, compressed the same way as OpenLibraryCache payloads
+    record = models.BinaryField()
+
+    @property
+    def record_data(self):
+        return OpenLibraryCache.decode_payload(self.record)
+
+
+class OLIndexWork(models.Model):
+    """A work record from the OpenLibrary works dump"""
+
+    olid = models.CharField(max_length=20, primary_key=True)
+
+    title = models.CharField(max_length=1000)
+
+    # search_form(title), for prefix matching
+    title_search = models.CharField(max_length=1000, db_index=True)
+
+    # Comma-separated author OLIDs in credit order (searched through OLIndexWorkAuthor)
+    author_olids = models.CharField(max_length=1000, blank=True)
+
+    first_publish_year = models.IntegerField(null=True)
+
+    record = models.BinaryField()
+
+    @property
+    def record_data(self):
+        return OpenLibraryCache.decode_payload(self.record)
+
+    @property
+    def author_olid_list(self):
+        return [olid for olid in self.author_olids.split(',') if olid]
+
+
+class OLIndexWorkAuthor(models.Model):
+    """One author credit of an OLIndexWork, so that an author's works are an index lookup"""
+
+    id = models.BigAutoField(primary_key=True)
+
+    author_olid = models.CharField(max_length=20)
+
+    work_olid = models.CharField(max_length=20, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author_olid', 'work_olid'], name='olindex_work_author'),
+        ]
+
+
+class OLIndexEdition(models.Model):
+    """
+    ISBN lookup row for a known edition, from the OpenLibrary editions dump or an edition record.
+
+    Only what search_by_isbn needs is kept; an edition with several ISBNs gets one row per ISBN.
+    ISBNs known only from search docs, with no edition to group them by, are OLIndexSearchIsbn rows.
+    """
+
+    isbn = models.CharField(max_length=13, primary_key=True)
+
+    edition_olid = models.CharField(max_length=20)
+
+    work_olid = models.CharField(max_length=20, db_index=True)
+
+    publisher = models.CharField(max_length=500, blank=True)
+
+    publish_date = models.CharField(max_length=100, blank=True)
+
+
+class OLIndexSearchIsbn(models.Model):
+    """
+    An ISBN listed in a cached search.json doc, mapped to the doc's work.
+
+    A search doc lists the ISBNs of every edition of its work without saying which ISBN
+    belongs to which edition, so these rows stay apart from OLIndexEdition.
+    """
+
+    isbn = models.CharField(max_length=13, primary_key=True)
+
+    work_olid = models.CharField(max_length=20, db_index=True)
+
+
+class OLIndexSearchDoc(models.Model):
+    """
+    The search.json doc of a work, kept for ISBNs resolved from the local index.
+
+    Filled from cached search responses and edition lookups (see ol_isbn), so that an
+    OLIndexEdition or OLIndexSearchIsbn hit can be turned into a Work without asking OpenLibrary.
+    """
+
+    olid = models.CharField(max_length=20, primary_key=True)
+
+    # The doc without its isbn list, compressed the same way as OpenLibraryCache payloads
+    doc = models.BinaryField()
+
+    updated = models.DateTimeField(auto_now=True)
+
+    @property
+    def doc_data(self):
+        return OpenLibraryCache.decode_payload(self.doc)
+
+
+class OLIndexIngestProgress(models.Model):
+    """How far ingest_ol_dump got through a dump file, so an interrupted run can resume"""
+
+    dump_path = models.CharField(max_length=1000, primary_key=True)
+
+    kind = models.CharField(max_length=20)
+
+    # Lines of the (decompressed) dump already committed
+    lines_done = models.BigIntegerField(default=0)
+
+    # Offset in the decompressed dump just past the last committed line, where a resumed run seeks to
+    bytes_done = models.BigIntegerField(default=0)
+
+    records_done = models.BigIntegerField(default=0)
+
+    completed = models.BooleanField(default=False)
+
+    updated = models.DateTimeField(auto_now=True)
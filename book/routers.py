@@ -0,0 +1,50 @@
+from django.conf import settings
+
+# Models kept in the OpenLibrary cache database rather than with the catalogue
+OL_CACHE_MODELS = {
+    'openlibrarycache', 'openlibraryfetchlease',
+    'olindexauthor', 'olindexwork', 'olindexworkauthor', 'olindexedition', 'olindexingestprogress', 'olindexsearchdoc',
+    'olindexsearchisbn',
+}
+
+def ol_cache_alias():
+    """The database alias holding OL_CACHE_MODELS ('default' if no separate one is configured)"""
+    alias = getattr(settings, 'OL_CACHE_DATABASE', 'ol_cache')
+    return alias if alias in settings.DATABASES else 'default'
+
+
+class OpenLibraryCacheRouter:
+    """
+    Keeps the OpenLibrary cache and offline index in their own database.
+
+    Cache churn then takes that file's write lock instead of the one catalogue writes
+    (WorkController, shelving) need. Migrate it with: manage.py migrate --database ol_cache
+    """
+
+    def _is_cache_model(self, model):
+        return model._meta.app_label == 'book' and model._meta.model_name in OL_CACHE_MODELS
+
+    def db_for_read(self, model, **hints):
+        if self._is_cache_model(model):
+            return ol_cache_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if self._is_cache_model(model):
+            return ol_cache_alias()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        cache_alias = ol_cache_alias()
+        if cache_alias == 'default':
+            return None
+        is_cache_model = app_label == 'book' and model_name in OL_CACHE_MODELS
+        if db == cache_alias:
+            # Only the cache tables (and django_migrations) live there
+            return is_cache_model
+        if is_cache_model:
+            return False
+        return None
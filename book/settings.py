@@ -101,9 +101,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Migration 0012 empties the cache table, which lives in ol_cache
+        'TEST': {'DEPENDENCIES': ['ol_cache']},
+    },
+    # OpenLibrary cache and offline index (see book/routers.py). WAL lets lookups read
+    # while a write is in progress, and losing the last few cache writes in a crash is fine.
+    'ol_cache': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'ol_cache.sqlite3',
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {'DEPENDENCIES': []},
+    },
 }
 
+DATABASE_ROUTERS = ['book.routers.OpenLibraryCacheRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -142,3 +158,155 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# OpenLibrary client
+# In-process memory tier in front of the OpenLibraryCache table (per worker process).
+# Entries never outlive their database row; OL_MEMORY_CACHE_TTL (seconds) caps them further.
+OL_MEMORY_CACHE_MAX_ENTRIES = 1000
+OL_MEMORY_CACHE_MAX_BYTES = 16 * 1024 * 1024
+OL_MEMORY_CACHE_TTL = 60 * 60
+
+# Every CachedOpenLibrary() in a process shares one HTTP session. The pool size should
+# be at least the number of threads per worker; timeouts are (connect, read) seconds.
+OL_HTTP_POOL_SIZE = 10
+OL_HTTP_TIMEOUT = (3.05, 10)
+
+# Stale-while-revalidate: expired cache entries are served immediately and refreshed on a
+# background pool, until they are more than OL_CACHE_MAX_STALENESS hours past expiry.
+OL_CACHE_STALE_WHILE_REVALIDATE = True
+OL_CACHE_MAX_STALENESS = 24 * 30
+OL_CACHE_REFRESH_WORKERS = 2
+
+# Size budget enforced by `manage.py prune_ol_cache` and the optional in-process sweeper
+# (None = unlimited). Set OL_CACHE_SWEEP_INTERVAL (seconds) to prune from a background thread.
+OL_CACHE_MAX_ROWS = None
+OL_CACHE_MAX_BYTES = None
+OL_CACHE_SWEEP_INTERVAL = None
+
+# Identical concurrent GETs within a process always share one upstream request. With
+# OL_CACHE_FETCH_LEASES, processes also claim a lease row so only one of them fetches a URL.
+OL_CACHE_FETCH_LEASES = False
+OL_CACHE_FETCH_LEASE_SECONDS = 10
+
+# Start every applicable step of the book search fallback cascade (author OLID, name,
+# simplified name, last name, title) at once and keep the highest-priority hit. Fallbacks
+# start speculatively, in the background rate-limit lane, once the first step has taken
+# OL_SEARCH_CASCADE_SPECULATION_DELAY seconds without settling the search. A speculative
+# step that gets no background token within OL_SEARCH_CASCADE_SPECULATION_MAX_WAIT seconds
+# is dropped and, if the cascade still needs it, rerun in the request's own lane.
+OL_PARALLEL_SEARCH_CASCADE = True
+OL_SEARCH_CASCADE_WORKERS = 8
+OL_SEARCH_CASCADE_SPECULATION_DELAY = 0.1
+OL_SEARCH_CASCADE_SPECULATION_MAX_WAIT = 0.5
+
+# Cache lifetime per OpenLibrary endpoint, in hours: the first regex matching the URL wins.
+# Empty results and 404s are cached too, for OL_CACHE_NEGATIVE_TTL hours.
+OL_CACHE_TTL_POLICY = [
+    (r'/authors/_autocomplete', 0.25),
+    (r'/search\.json', 6),
+    (r'/authors/OL\d+A(/works)?\.json', 24 * 14),
+    (r'/works/OL\d+W\.json', 24 * 14),
+    (r'/(isbn|books)/', 24 * 14),
+]
+OL_CACHE_DEFAULT_TTL = 24
+OL_CACHE_NEGATIVE_TTL = 1
+
+# Circuit breaker for OpenLibrary outages: opens when at least OL_CIRCUIT_MIN_REQUESTS
+# requests in the last OL_CIRCUIT_WINDOW_SECONDS failed at OL_CIRCUIT_FAILURE_RATE or more.
+# While open, lookups are served from cache or fail fast; the open period doubles per trip.
+OL_CIRCUIT_FAILURE_RATE = 0.5
+OL_CIRCUIT_MIN_REQUESTS = 5
+OL_CIRCUIT_WINDOW_SECONDS = 60
+OL_CIRCUIT_OPEN_SECONDS = 5
+OL_CIRCUIT_MAX_OPEN_SECONDS = 300
+
+# Answer lookups from the OpenLibrary dump index (see the ingest_ol_dump command) when the
+# cache misses, before going to the network. OL_OFFLINE_ONLY never goes to the network.
+OL_OFFLINE_RESOLVER = False
+OL_OFFLINE_ONLY = False
+
+# Ask search.json for only the document fields our views use (see SEARCH_DOC_FIELDS), which
+# keeps responses and cache rows small. Callers can still request full docs with fields=None.
+OL_SEARCH_FIELD_PROJECTION = True
+
+# Outbound request budget shared by all processes on this host (token bucket in a locked
+# state file). Background work (cache refreshes, prefetching) keeps its hands off the last
+# OL_RATE_LIMIT_INTERACTIVE_RESERVE tokens and yields to waiting interactive requests.
+# Set OL_RATE_LIMIT_PER_SECOND to None to disable.
+OL_RATE_LIMIT_PER_SECOND = 3
+OL_RATE_LIMIT_BURST = 10
+OL_RATE_LIMIT_INTERACTIVE_RESERVE = 2
+OL_RATE_LIMIT_STATE_FILE = None  # defaults to a file in the system temp directory
+# Longest a request waits for a token before giving up as OpenLibraryUnavailable, per lane
+OL_RATE_LIMIT_MAX_WAIT = {'interactive': 5, 'background': 60}
+
+# Queue OpenLibraryCache writes and upsert them in batches from a background thread, when
+# OL_CACHE_WRITE_BATCH_SIZE are waiting or every OL_CACHE_WRITE_FLUSH_SECONDS, instead of
+# writing inside the request. Anything still queued is flushed at shutdown. ISBN index
+# writes from edition lookups are likewise left to a background thread.
+OL_CACHE_WRITE_BEHIND = True
+OL_CACHE_WRITE_BATCH_SIZE = 100
+OL_CACHE_WRITE_FLUSH_SECONDS = 1.0
+
+# Resolve ISBNs through the small /isbn/{isbn}.json edition record and its work record,
+# falling back to search.json only if that fails. The author records of a multi-author
+# work are fetched at once, on up to OL_ISBN_AUTHOR_WORKERS threads.
+OL_ISBN_EDITION_LOOKUP = True
+OL_ISBN_AUTHOR_WORKERS = 4
+
+# /metrics/openlibrary is for staff, or a Prometheus scraper sending
+# "Authorization: Bearer <OL_METRICS_TOKEN>" (None: staff only).
+OL_METRICS_TOKEN = None
+
+# Hedge slow interactive GETs: if one hasn't answered after its endpoint's observed
+# OL_HEDGE_QUANTILE latency (OL_HEDGE_DEFAULT_DELAY seconds until OL_HEDGE_MIN_SAMPLES
+# have been timed), send a second and take whichever answers first. The budget allows
+# OL_HEDGE_BUDGET_RATIO hedges per request (at most 1), saving up to OL_HEDGE_BUDGET_BURST.
+OL_HEDGED_REQUESTS = False
+OL_HEDGE_QUANTILE = 0.9
+OL_HEDGE_MIN_SAMPLES = 20
+OL_HEDGE_DEFAULT_DELAY = 1.0
+OL_HEDGE_MIN_DELAY = 0.05
+OL_HEDGE_BUDGET_RATIO = 0.1
+OL_HEDGE_BUDGET_BURST = 5
+OL_HEDGE_WORKERS = 16
+
+# Remember the final results of the book search cascade per normalized title/author until
+# the earliest of the cached responses they were built from expires.
+OL_SEARCH_RESULT_MEMO = True
+OL_SEARCH_RESULT_MEMO_MAX_ENTRIES = 200
+
+# Once book candidates are shown, fetch the work and author records the confirmation step
+# will need into the cache in the background, on up to OL_PREFETCH_WORKERS threads.
+OL_PREFETCH = True
+OL_PREFETCH_WORKERS = 4
+
+# When the title page opens for a chosen author, page through their works list in the
+# background (OL_BIBLIOGRAPHY_PAGE_SIZE per request, up to OL_BIBLIOGRAPHY_MAX_WORKS) and
+# answer title autocomplete from those titles; a longer bibliography, or one without a
+# match, falls back to searching. The OL_BIBLIOGRAPHY_MAX_AUTHORS most recent
+# bibliographies are kept in memory for OL_BIBLIOGRAPHY_TTL seconds.
+OL_BIBLIOGRAPHY_PREFETCH = True
+OL_BIBLIOGRAPHY_PAGE_SIZE = 100
+OL_BIBLIOGRAPHY_MAX_WORKS = 2000
+OL_BIBLIOGRAPHY_MAX_AUTHORS = 50
+OL_BIBLIOGRAPHY_TTL = 60 * 60
+OL_BIBLIOGRAPHY_WORKERS = 2
+
+# Cache autocomplete results per query prefix and answer longer queries by filtering a
+# cached complete list. Entries live OL_AUTOCOMPLETE_CACHE_TTL seconds; local results are
+# also dropped whenever an Author, Work or Book changes.
+OL_AUTOCOMPLETE_CACHE = True
+OL_AUTOCOMPLETE_CACHE_TTL = 60
+OL_AUTOCOMPLETE_CACHE_MAX_ENTRIES = 500
+OL_AUTOCOMPLETE_CACHE_MAX_ITEMS = 200
+
+# Map every ISBN listed in a cached search.json doc to its work, and answer search_by_isbn
+# from that index before asking OpenLibrary. index_cached_isbns fills it from an existing cache.
+OL_ISBN_INDEX = True
+
+# Work.search_by_isbns searches the ISBNs it can't answer locally OL_ISBN_BATCH_SIZE to a
+# search.json OR-query, running up to OL_ISBN_BATCH_WORKERS queries at once.
+OL_ISBN_BATCH_SIZE = 20
+OL_ISBN_BATCH_WORKERS = 4
@@ -27,4 +27,35 @@ def live_server_url(live_server):
 def browser(driver, live_server_url):
     """Configure the browser with base URL."""
     driver.get(live_server_url)
-    return driver 
\ No newline at end of file
+    return driver
+
+
+@pytest.fixture(autouse=True)
+def reset_ol_client_state(settings, tmp_path):
+    """Keep process-wide OpenLibrary client state from leaking between tests."""
+    from book.utils.ol_circuit_breaker import circuit_breaker
+    from book.utils.ol_memory_cache import memory_cache, search_result_memo
+    from book.utils.autocomplete_cache import autocomplete_cache
+    from book.utils.ol_bibliography import bibliographies
+    from book.utils.ol_hedge import hedge_budget
+    from book.utils.ol_metrics import ol_metrics
+    from book.utils.ol_write_buffer import write_buffer
+    # A fresh, full token bucket per test, not shared with a running dev server
+    settings.OL_RATE_LIMIT_STATE_FILE = str(tmp_path / 'ol-ratelimit.json')
+    # Tests inspect the cache table right after a fetch; write-behind has its own tests
+    settings.OL_CACHE_WRITE_BEHIND = False
+    # Background fetches would outlive the test and its mocks; prefetching has its own tests
+    settings.OL_PREFETCH = False
+    settings.OL_BIBLIOGRAPHY_PREFETCH = False
+    memory_cache.clear()
+    search_result_memo.clear()
+    bibliographies.clear()
+    autocomplete_cache.clear()
+    circuit_breaker.reset()
+    ol_metrics.reset()
+    hedge_budget.reset()
+    yield
+    # Writes a test left queued would land after its database is gone
+    write_buffer.clear()
+    memory_cache.clear()
+    circuit_breaker.reset()
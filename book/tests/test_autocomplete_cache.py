@@ -0,0 +1,109 @@
+import pytest
+import time
+from book.models import Author
+from book.utils.autocomplete_cache import LOCAL_STAGES, PrefixCache
+
+AUTOCOMPLETE_URL = 'https://openlibrary.org/authors/_autocomplete'
+
+
+class TestPrefixCache:
+    def test_complete_prefix_is_narrowed(self):
+        cache = PrefixCache(max_entries=10, max_items=10)
+        cache.set('author_local', '', 'tol', [('tolkien', 'T'), ('tolstoy', 'L')], complete=True)
+
+        assert cache.get('author_local', '', 'Tolk') == [('tolkien', 'T')]
+        assert cache.get('author_local', '', 'tolkx') == []
+        assert cache.get('author_local', '', 'to') is None
+
+    def test_incomplete_prefix_is_not_narrowed(self):
+        cache = PrefixCache(max_entries=10, max_items=10)
+        cache.set('author_remote', '', 'to', [('tolkien', 'T')], complete=False)
+        cache.set('author_remote', '', 't', [('tolkien', 'T'), ('twain', 'M')], complete=True)
+
+        # The shorter complete list still answers for it
+        assert cache.get('author_remote', '', 'tol') == [('tolkien', 'T')]
+        assert cache.get('author_remote', '', 'to') == [('tolkien', 'T')]
+
+    def test_scopes_are_separate(self):
+        cache = PrefixCache(max_entries=10, max_items=10)
+        cache.set('title_local', 'OL1A', 'ho', [('hondo', 'Hondo')], complete=True)
+
+        assert cache.get('title_local', 'OL2A', 'hon') is None
+
+    def test_bounded(self, settings):
+        cache = PrefixCache(max_entries=2, max_items=1)
+        cache.set('author_local', '', 'a', [('ab', 1), ('ac', 2)], complete=True)
+        assert cache.get('author_local', '', 'a') is None
+
+        for query in ('x', 'y', 'z'):
+            cache.set('author_local', '', query, [], complete=True)
+        assert cache.get('author_local', '', 'x') is None
+        assert cache.get('author_local', '', 'z') == []
+
+    def test_entries_expire(self, settings):
+        settings.OL_AUTOCOMPLETE_CACHE_TTL = 0.05
+        cache = PrefixCache(max_entries=10, max_items=10)
+        cache.set('author_local', '', 'tol', [('tolkien', 'T')], complete=True)
+
+        time.sleep(0.1)
+        assert cache.get('author_local', '', 'tolk') is None
+
+    def test_clear_local_stages(self):
+        cache = PrefixCache(max_entries=10, max_items=10)
+        cache.set('author_local', '', 'tol', [], complete=True)
+        cache.set('author_remote', '', 'tol', [], complete=True)
+
+        cache.clear(LOCAL_STAGES)
+
+        assert cache.get('author_local', '', 'tol') is None
+        assert cache.get('author_remote', '', 'tol') == []
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestAutocompleteViews:
+    @pytest.fixture(autouse=True)
+    def enabled(self, settings):
+        settings.OL_AUTOCOMPLETE_CACHE = True
+
+    def test_local_authors_narrowed_without_query(self, client, django_assert_num_queries):
+        Author.objects.create(primary_name='J.R.R. Tolkien', search_name='tolkien', olid='OL1A')
+        Author.objects.create(primary_name='Leo Tolstoy', search_name='tolstoy', olid='OL2A')
+        assert len(client.get('/author-autocomplete', {'q': 'tol'}).json()) == 2
+
+        with django_assert_num_queries(0):
+            response = client.get('/author-autocomplete', {'q': 'tolk'})
+
+        assert [value.split(' ::: ')[1] for value in response.json()] == ['OL1A']
+
+    def test_author_change_invalidates(self, client):
+        Author.objects.create(primary_name='J.R.R. Tolkien', search_name='tolkien', olid='OL1A')
+        client.get('/author-autocomplete', {'q': 'tol'})
+
+        Author.objects.create(primary_name='Christopher Tolkien', search_name='christopher tolkien', olid='OL3A')
+
+        assert len(client.get('/author-autocomplete', {'q': 'tolk'}).json()) == 2
+
+    def test_remote_authors_narrowed_without_request(self, client, requests_mock):
+        requests_mock.get(AUTOCOMPLETE_URL, json=[
+            {'key': '/authors/OL1A', 'name': 'J.R.R. Tolkien', 'work_count': 500},
+            {'key': '/authors/OL2A', 'name': 'Leo Tolstoy', 'work_count': 900},
+        ])
+        client.get('/author-autocomplete', {'q': 'tol'})
+        calls = requests_mock.call_count
+
+        response = client.get('/author-autocomplete', {'q': 'tolst'})
+
+        assert [value.split(' ::: ')[1] for value in response.json()] == ['OL2A']
+        assert requests_mock.call_count == calls
+
+    def test_title_keystrokes_skip_local_lookup(self, client, requests_mock, django_assert_num_queries):
+        from book.utils.ol_bibliography import bibliographies
+        Author.objects.create(primary_name="Louis L'Amour", search_name="louis l'amour", olid='OL1A')
+        bibliographies.set('OL1A', [('Hondo', 'hondo', 'OL10W'), ('Hombre', 'hombre', 'OL11W')])
+        assert client.get('/author/OL1A/title-autocomplete', {'q': 'ho'}).json() == ['Hondo', 'Hombre']
+
+        with django_assert_num_queries(0):
+            response = client.get('/author/OL1A/title-autocomplete', {'q': 'hon'})
+
+        assert response.json() == ['Hondo']
+        assert not requests_mock.called
@@ -9,7 +9,7 @@ from book.tests.pages.book_page import BookPage
 from book.tests.pages.isbn_page import ISBNPage
 from urllib.parse import parse_qs, urlparse
 
-@pytest.mark.django_db
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
 class TestBasicBookEntry:
     def test_complete_book_entry_flow(self, browser, requests_mock):
         """Test the complete book entry flow from author search through shelving."""
@@ -220,7 +220,7 @@ class TestBasicBookEntry:
         assert 'added new work' in book_page.get_success_message().lower()
         assert 'modified test book' in book_page.get_success_message().lower()
 
-@pytest.mark.django_db
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
 class TestISBNEntry:
     def test_basic_isbn_entry(self, browser, requests_mock):
         """Test entering a book via ISBN lookup."""
@@ -275,7 +275,7 @@ class TestISBNEntry:
         assert 'added new work' in isbn_page.get_success_message().lower()
         assert 'test book' in isbn_page.get_success_message().lower()
 
-@pytest.mark.django_db
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
 class TestCollectionBookEntry:
     def test_add_double_book(self, browser, requests_mock):
         """Test adding a book that contains multiple works (like a Belmont Double)."""
@@ -572,7 +572,7 @@ class TestCollectionBookEntry:
         assert 'added new work' in book_page.get_success_message().lower()
         assert 'the flame of iridar and peril of the starmen' in book_page.get_success_message().lower()
 
-@pytest.mark.django_db
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
 class TestPenNameBookEntry:
     def test_book_search_olid_to_name_fallback(self, browser, requests_mock):
         """Test book search falls back from OLID to full author name."""
@@ -0,0 +1,85 @@
+import pytest
+from book.models import Author
+from book.utils.ol_bibliography import (
+    bibliographies, bibliography_titles, load_bibliography, prefetch_bibliography
+)
+from book.utils.ol_client import CachedOpenLibrary
+from book.utils.ol_memory_cache import memory_cache
+
+WORKS_URL = 'https://openlibrary.org/authors/OL1A/works.json'
+
+
+def _page(titles, start, size):
+    return {'size': size, 'entries': [{'key': f'/works/OL{start + i}W', 'title': title}
+                                      for i, title in enumerate(titles)]}
+
+
+@pytest.fixture
+def works_api(settings, requests_mock):
+    settings.OL_BIBLIOGRAPHY_PAGE_SIZE = 2
+    requests_mock.get(WORKS_URL + '?limit=2&offset=0', json=_page(['Hondo', 'The Sacketts'], 0, 5))
+    requests_mock.get(WORKS_URL + '?limit=2&offset=2', json=_page(['Last of the Breed', 'Hondo'], 2, 5))
+    requests_mock.get(WORKS_URL + '?limit=2&offset=4', json=_page(['Flint'], 4, 5))
+    return requests_mock
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestBibliography:
+    def test_pages_through_works(self, works_api):
+        titles = load_bibliography(CachedOpenLibrary(), 'OL1A')
+
+        assert [olid for _, _, olid in titles] == ['OL0W', 'OL1W', 'OL2W', 'OL3W', 'OL4W']
+        assert works_api.call_count == 3
+
+    def test_max_works_caps_paging(self, settings, works_api):
+        settings.OL_BIBLIOGRAPHY_MAX_WORKS = 3
+
+        assert len(load_bibliography(CachedOpenLibrary(), 'OL1A')) == 4
+        assert works_api.call_count == 2
+        # Flint is past the cap, so not even matches are trusted to be all there are
+        assert bibliographies.get('OL1A')[1] is False
+        assert bibliography_titles('OL1A', 'ho') is None
+
+    def test_titles_prefix_matches_first(self, works_api):
+        load_bibliography(CachedOpenLibrary(), 'OL1A')
+
+        assert bibliography_titles('OL1A', 'ho') == ['Hondo']
+        assert bibliography_titles('OL1A', 'THE') == ['The Sacketts', 'Last of the Breed']
+        assert bibliography_titles('OL2A', 'ho') is None
+        assert bibliography_titles('OL1A', 'dune') is None
+
+    def test_cleared_with_memory_cache(self, works_api):
+        load_bibliography(CachedOpenLibrary(), 'OL1A')
+        memory_cache.clear()
+
+        assert bibliography_titles('OL1A', 'ho') is None
+
+    def test_prefetch_disabled(self, works_api):
+        assert prefetch_bibliography(CachedOpenLibrary(), 'OL1A') is None
+        assert not works_api.called
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+def test_title_autocomplete_served_from_bibliography(settings, client, works_api):
+    settings.OL_BIBLIOGRAPHY_PREFETCH = True
+    Author.objects.create(primary_name="Louis L'Amour", search_name="louis l'amour", olid='OL1A')
+
+    prefetch_bibliography(CachedOpenLibrary(), 'OL1A').result(timeout=5)
+    calls = works_api.call_count
+    response = client.get('/author/OL1A/title-autocomplete', {'q': 'last of'})
+
+    assert response.json() == ['Last of the Breed']
+    assert works_api.call_count == calls
+    assert bibliographies.start_loading('OL1A') is False
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_title_autocomplete_searches_past_incomplete_bibliography(client, requests_mock):
+    Author.objects.create(primary_name="Louis L'Amour", search_name="louis l'amour", olid='OL1A')
+    bibliographies.set('OL1A', [('Hondo', 'hondo', 'OL10W')], complete=False)
+    requests_mock.get('https://openlibrary.org/search.json', json={'docs': [
+        {'key': '/works/OL12W', 'title': 'Flint', 'author_name': ["Louis L'Amour"], 'author_key': ['OL1A']}]})
+
+    response = client.get('/author/OL1A/title-autocomplete', {'q': 'flint'})
+
+    assert response.json() == ['Flint']
@@ -0,0 +1,300 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from django.core.management import call_command
+from book.models import OpenLibraryCache
+from book.models.cache import cache_key, canonical_url
+
+
+def _cache(url, data, hours_ago=0, duration=24):
+    OpenLibraryCache.cache_response(url, data, duration=duration)
+    OpenLibraryCache.objects.filter(request_url=url).update(
+        last_updated=datetime.now().astimezone() - timedelta(hours=hours_ago))
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestPruneOpenLibraryCache:
+    def test_prune_expired_respects_each_duration(self):
+        _cache('https://openlibrary.org/a.json', {'v': 1}, hours_ago=30, duration=24)
+        _cache('https://openlibrary.org/b.json', {'v': 2}, hours_ago=30, duration=48)
+        _cache('https://openlibrary.org/c.json', {'v': 3}, hours_ago=1, duration=24)
+
+        assert OpenLibraryCache.prune_expired(chunk_size=1) == 1
+        assert set(OpenLibraryCache.objects.values_list('request_url', flat=True)) == {
+            'https://openlibrary.org/b.json', 'https://openlibrary.org/c.json'}
+
+    def test_prune_expired_keeps_entries_within_grace(self):
+        _cache('https://openlibrary.org/a.json', {'v': 1}, hours_ago=30, duration=24)
+
+        assert OpenLibraryCache.prune_expired(grace_hours=12) == 0
+
+    def test_evict_to_row_limit_removes_oldest(self):
+        for i in range(5):
+            _cache(f'https://openlibrary.org/{i}.json', {'v': i}, hours_ago=5 - i)
+
+        assert OpenLibraryCache.evict_to_limits(max_rows=2, chunk_size=2) == 3
+        assert set(OpenLibraryCache.objects.values_list('request_url', flat=True)) == {
+            'https://openlibrary.org/3.json', 'https://openlibrary.org/4.json'}
+
+    def test_evict_to_byte_budget(self):
+        for i in range(4):
+            _cache(f'https://openlibrary.org/{i}.json', {'v': 'x' * 100}, hours_ago=4 - i)
+
+        OpenLibraryCache.evict_to_limits(max_bytes=250)
+
+        assert OpenLibraryCache.total_bytes() <= 250
+        assert OpenLibraryCache.objects.filter(request_url='https://openlibrary.org/3.json').exists()
+
+    def test_command_prunes_and_reports(self, settings):
+        settings.OL_CACHE_STALE_WHILE_REVALIDATE = False
+        _cache('https://openlibrary.org/a.json', {'v': 1}, hours_ago=30)
+        _cache('https://openlibrary.org/b.json', {'v': 2}, hours_ago=1)
+        out = StringIO()
+
+        call_command('prune_ol_cache', '--max-rows', '10', stdout=out)
+
+        assert 'Deleted 1 expired entries' in out.getvalue()
+        assert OpenLibraryCache.objects.count() == 1
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestCompressedPayload:
+    def test_round_trip_through_compressed_payload(self):
+        data = {'docs': [{'key': '/works/OL1W', 'isbn': ['9780000000000'] * 50}]}
+        OpenLibraryCache.cache_response('https://openlibrary.org/search.json?isbn=1', data)
+
+        entry = OpenLibraryCache.objects.get()
+        assert OpenLibraryCache.get_cached_response('https://openlibrary.org/search.json?isbn=1') == data
+        assert len(bytes(entry.payload)) < entry.original_size
+
+    def test_report_groups_savings_by_endpoint(self):
+        _cache('https://openlibrary.org/search.json?isbn=1', {'docs': ['x' * 500]})
+        _cache('https://openlibrary.org/authors/OL1A.json', {'name': 'Test Author'})
+        out = StringIO()
+
+        call_command('ol_cache_report', stdout=out)
+
+        assert 'isbn_search' in out.getvalue()
+        assert 'author ' in out.getvalue()
+        assert 'TOTAL' in out.getvalue()
+
+
+class TestCanonicalUrl:
+    def test_equivalent_urls_share_a_key(self):
+        variants = [
+            'https://openlibrary.org/authors/_autocomplete?q=J.R.R.%20Tolkien&limit=5',
+            'https://openlibrary.org/authors/_autocomplete?limit=5&q=j.r.r.+tolkien',
+            'HTTPS://OpenLibrary.org:443/authors/_autocomplete?q=J.R.R.  Tolkien &limit=5',
+        ]
+        assert len({canonical_url(url) for url in variants}) == 1
+        assert len(cache_key(variants[0])) == 64
+
+    def test_identifiers_keep_their_case(self):
+        assert canonical_url('https://openlibrary.org/authors/OL123A.json') == \
+            'https://openlibrary.org/authors/OL123A.json'
+        assert cache_key('https://openlibrary.org/search.json?isbn=123X') != \
+            cache_key('https://openlibrary.org/search.json?isbn=123x')
+
+    def test_search_operators_keep_their_case(self):
+        assert canonical_url('https://openlibrary.org/search.json?q=Dune OR Emma') == \
+            'https://openlibrary.org/search.json?q=dune+OR+emma'
+        assert canonical_url('https://openlibrary.org/search.json?title=Pride AND Prejudice') == \
+            'https://openlibrary.org/search.json?title=pride+and+prejudice'
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestCanonicalCacheKeys:
+    def test_lookup_matches_differently_spelled_url(self):
+        OpenLibraryCache.cache_response('https://openlibrary.org/search.json?title=Dune&author=Herbert', {'v': 1})
+
+        entry = OpenLibraryCache.get_cached_entry('https://openlibrary.org/search.json?author=herbert&title=dune')
+
+        assert entry.response_data == {'v': 1}
+
+    def test_rewrite_replaces_rather_than_duplicates(self):
+        OpenLibraryCache.cache_response('https://openlibrary.org/search.json?q=Dune', {'v': 1})
+        OpenLibraryCache.cache_response('https://openlibrary.org/search.json?q=dune', {'v': 2})
+
+        assert OpenLibraryCache.objects.count() == 1
+        assert OpenLibraryCache.get_cached_response('https://openlibrary.org/search.json?q=DUNE') == {'v': 2}
+
+
+class TestOpenLibraryCacheRouter:
+    def test_cache_models_use_their_own_database(self):
+        from django.db import router
+        from book.models import OLIndexWork, OpenLibraryFetchLease, Work
+
+        assert router.db_for_write(OpenLibraryCache) == 'ol_cache'
+        assert router.db_for_read(OpenLibraryFetchLease) == 'ol_cache'
+        assert router.db_for_read(OLIndexWork) == 'ol_cache'
+        assert router.db_for_write(Work) == 'default'
+
+    def test_migrations_split_between_databases(self):
+        from django.db import router
+
+        assert router.allow_migrate('ol_cache', 'book', model_name='openlibrarycache')
+        assert not router.allow_migrate('ol_cache', 'book', model_name='work')
+        assert not router.allow_migrate('ol_cache', 'auth', model_name='user')
+        assert not router.allow_migrate('default', 'book', model_name='openlibrarycache')
+        assert router.allow_migrate('default', 'book', model_name='work')
+
+    # Transactional: the migration drops a table in the default database
+    @pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+    def test_migration_moves_baseline_leftover_table(self):
+        import importlib
+        import json
+        from types import SimpleNamespace
+        from django.apps import apps
+        from django.db import connections
+        migration = importlib.import_module('book.migrations.0020_move_legacy_ol_cache')
+        legacy = connections['default']
+        url = 'https://openlibrary.org/search.json?title=The+Mustang+Herder&author=OL1A'
+        with legacy.cursor() as cursor:
+            # The table as the original 0005 migration created it
+            cursor.execute("CREATE TABLE book_openlibrarycache (request_url varchar(2000) NOT NULL PRIMARY KEY, "
+                           "response_data text NOT NULL, last_updated datetime NOT NULL, cache_duration integer NOT NULL)")
+            cursor.execute("INSERT INTO book_openlibrarycache VALUES (%s, %s, %s, %s)",
+                           [url, json.dumps({'numFound': 1}), '2026-10-01 10:00:00', 24])
+
+        try:
+            migration.move_legacy_cache(apps, SimpleNamespace(connection=connections['ol_cache']))
+            assert 'book_openlibrarycache' not in legacy.introspection.table_names()
+        finally:
+            with legacy.cursor() as cursor:
+                cursor.execute("DROP TABLE IF EXISTS book_openlibrarycache")
+
+        # Keyed by the live rules, which leave the author OLID's case alone
+        entry = OpenLibraryCache.objects.get(cache_key=cache_key(url))
+        assert entry.response_data == {'numFound': 1}
+        assert entry.last_updated == datetime(2026, 10, 1, 10, tzinfo=timezone.utc)
+
+    @pytest.mark.django_db(databases=['default', 'ol_cache'])
+    def test_migration_rekeys_rows_keyed_under_0016_rules(self):
+        import importlib
+        from types import SimpleNamespace
+        from django.apps import apps
+        from django.db import connections
+        old_rules = importlib.import_module('book.migrations.0016_openlibrarycache_cache_key')
+        migration = importlib.import_module('book.migrations.0022_rekey_openlibrarycache')
+        by_olid = 'https://openlibrary.org/search.json?title=X&author=OL1A'
+        by_operator = 'https://openlibrary.org/search.json?q=isbn:(1 OR 2)'
+        stale_twin = 'https://openlibrary.org/search.json?q=isbn:(1  OR 2)'
+        # The twin is a row for the same search under some other (older) key
+        for key, url, hours_ago in [(old_rules.cache_key(by_olid), by_olid, 0),
+                                    (old_rules.cache_key(by_operator), by_operator, 0),
+                                    ('0' * 64, stale_twin, 5)]:
+            payload, size = OpenLibraryCache.encode_payload({'url': url})
+            OpenLibraryCache.objects.create(cache_key=key, request_url=url, payload=payload, original_size=size)
+            OpenLibraryCache.objects.filter(cache_key=key).update(
+                last_updated=datetime.now().astimezone() - timedelta(hours=hours_ago))
+
+        migration.rekey_cache(apps, SimpleNamespace(connection=connections['ol_cache']))
+
+        assert OpenLibraryCache.get_cached_response(by_olid) == {'url': by_olid}
+        # The fresher of the two rows for the same search wins
+        assert OpenLibraryCache.get_cached_response(stale_twin) == {'url': by_operator}
+        assert OpenLibraryCache.objects.count() == 2
+
+    def test_falls_back_to_default_without_cache_database(self, settings):
+        from book.routers import ol_cache_alias
+        settings.OL_CACHE_DATABASE = 'missing'
+
+        assert ol_cache_alias() == 'default'
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_admin_rebuild_empties_cache(admin_client):
+    from book.models import OLIndexSearchDoc, OLIndexSearchIsbn
+    from book.utils.ol_isbn import index_search_docs
+    search = ('https://openlibrary.org/search.json?title=dune',
+              {'docs': [{'key': '/works/OL1W', 'title': 'Dune', 'isbn': ['0441013597']}]})
+    OpenLibraryCache.cache_response(*search)
+    index_search_docs([search])
+
+    response = admin_client.post('/admin/rebuild-cache/', {'confirm': 'yes'})
+
+    assert response.status_code == 302
+    assert OpenLibraryCache.objects.count() == 0
+    assert not OLIndexSearchIsbn.objects.exists()
+    assert not OLIndexSearchDoc.objects.exists()
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestCacheBundles:
+    def test_round_trip_keeps_data_and_age(self, tmp_path):
+        bundle = str(tmp_path / 'cache.jsonl.gz')
+        _cache('https://openlibrary.org/works/OL1W.json', {'title': 'Dune'}, hours_ago=5, duration=48)
+        _cache('https://openlibrary.org/search.json?isbn=000', {'docs': []})
+        fetched = OpenLibraryCache.objects.get(request_url='https://openlibrary.org/works/OL1W.json').last_updated
+
+        call_command('export_ol_cache', bundle, stdout=StringIO())
+        OpenLibraryCache.objects.all().delete()
+        out = StringIO()
+        call_command('import_ol_cache', bundle, stdout=out)
+
+        assert 'Imported 1 ' in out.getvalue()  # the empty search isn't exported
+        entry = OpenLibraryCache.get_cached_entry('https://openlibrary.org/works/OL1W.json')
+        assert entry.response_data == {'title': 'Dune'}
+        assert entry.cache_duration == 48
+        assert abs((entry.last_updated - fetched).total_seconds()) < 1
+
+    def test_fixture_bundle_imports_as_fresh(self, tmp_path):
+        bundle = str(tmp_path / 'cache.jsonl.gz')
+        _cache('https://openlibrary.org/works/OL1W.json', {'title': 'Dune'}, hours_ago=40, duration=48)
+        fetched = OpenLibraryCache.objects.get().last_updated
+
+        call_command('export_ol_cache', bundle, '--fixture', stdout=StringIO())
+        OpenLibraryCache.objects.all().delete()
+        call_command('import_ol_cache', bundle, stdout=StringIO())
+        assert (OpenLibraryCache.objects.get().last_updated - fetched).total_seconds() > 39 * 3600
+
+        OpenLibraryCache.objects.all().delete()
+        call_command('import_ol_cache', bundle, '--keep-age', stdout=StringIO())
+        assert abs((OpenLibraryCache.objects.get().last_updated - fetched).total_seconds()) < 1
+
+    def test_export_only_referenced_entries(self, tmp_path):
+        from book.models import Author
+        Author.objects.create(olid='OL1A', primary_name='Frank Herbert', search_name='frank herbert')
+        bundle = str(tmp_path / 'cache.jsonl.gz')
+        _cache('https://openlibrary.org/authors/OL1A.json', {'name': 'Frank Herbert'})
+        _cache('https://openlibrary.org/authors/OL2A.json', {'name': 'Someone Else'})
+        _cache('https://openlibrary.org/search.json?title=dune', {'docs': [{'key': '/works/OL9W', 'author_key': ['OL1A']}]})
+
+        call_command('export_ol_cache', bundle, '--referenced', stdout=StringIO())
+        OpenLibraryCache.objects.all().delete()
+        call_command('import_ol_cache', bundle, stdout=StringIO())
+
+        assert set(OpenLibraryCache.objects.values_list('request_url', flat=True)) == {
+            'https://openlibrary.org/authors/OL1A.json', 'https://openlibrary.org/search.json?title=dune'}
+
+    def test_import_keeps_existing_unless_replacing(self, tmp_path):
+        bundle = str(tmp_path / 'cache.jsonl.gz')
+        _cache('https://openlibrary.org/works/OL1W.json', {'v': 'bundled'})
+        call_command('export_ol_cache', bundle, stdout=StringIO())
+        _cache('https://openlibrary.org/works/OL1W.json', {'v': 'local'})
+
+        call_command('import_ol_cache', bundle, stdout=StringIO())
+        assert OpenLibraryCache.get_cached_response('https://openlibrary.org/works/OL1W.json') == {'v': 'local'}
+
+        call_command('import_ol_cache', bundle, '--replace', stdout=StringIO())
+        assert OpenLibraryCache.get_cached_response('https://openlibrary.org/works/OL1W.json') == {'v': 'bundled'}
+
+    def test_fresh_replace_restamps_expired_entry(self, tmp_path):
+        bundle = str(tmp_path / 'cache.jsonl.gz')
+        _cache('https://openlibrary.org/works/OL1W.json', {'v': 'bundled'})
+        call_command('export_ol_cache', bundle, '--fixture', stdout=StringIO())
+        _cache('https://openlibrary.org/works/OL1W.json', {'v': 'local'}, hours_ago=40, duration=24)
+
+        call_command('import_ol_cache', bundle, '--replace', stdout=StringIO())
+
+        assert OpenLibraryCache.get_cached_response('https://openlibrary.org/works/OL1W.json') == {'v': 'bundled'}
+
+    def test_rejects_other_files(self, tmp_path):
+        from django.core.management.base import CommandError
+        other = tmp_path / 'other.gz'
+        import gzip
+        with gzip.open(other, 'wt') as f:
+            f.write('{"something": "else"}\n')
+
+        with pytest.raises(CommandError):
+            call_command('import_ol_cache', str(other), stdout=StringIO())
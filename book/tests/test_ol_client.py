@@ -0,0 +1,722 @@
+import pytest
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from django.db import connection
+from book.models import OpenLibraryCache, OpenLibraryFetchLease
+from book.utils.ol_circuit_breaker import CircuitBreaker, circuit_breaker, parse_retry_after
+from book.utils.ol_client import CachedOpenLibrary, OpenLibraryUnavailable, PooledHTTPAdapter, cache_ttl_hours
+from book.utils.ol_memory_cache import MemoryCache, memory_cache
+from book.utils.ol_single_flight import SingleFlight
+from requests.exceptions import ConnectionError, HTTPError
+from urllib.parse import unquote_plus
+
+AUTHOR_URL = 'https://openlibrary.org/authors/OL123A.json'
+
+
+class TestMemoryCache:
+    def test_hit_returns_fresh_copy(self):
+        cache = MemoryCache(max_entries=10, max_bytes=10000, max_ttl=60)
+        cache.set(AUTHOR_URL, {'name': 'Test Author', 'alternate_names': []})
+
+        first = cache.get(AUTHOR_URL)
+        first['alternate_names'].append('Mutated')
+
+        assert cache.get(AUTHOR_URL) == {'name': 'Test Author', 'alternate_names': []}
+        assert cache.stats()['hits'] == 2
+
+    def test_evicts_least_recently_used(self):
+        cache = MemoryCache(max_entries=2, max_bytes=10000, max_ttl=60)
+        cache.set('a', {'v': 1})
+        cache.set('b', {'v': 2})
+        cache.get('a')
+        cache.set('c', {'v': 3})
+
+        assert cache.get('b') is None
+        assert cache.get('a') == {'v': 1}
+        assert cache.stats()['evictions'] == 1
+
+    def test_respects_byte_budget(self):
+        cache = MemoryCache(max_entries=10, max_bytes=30, max_ttl=60)
+        cache.set('a', {'v': 'x' * 10})
+        cache.set('b', {'v': 'y' * 10})
+
+        assert cache.get('a') is None
+        assert cache.stats()['bytes'] <= 30
+
+    def test_byte_budget_counts_encoded_bytes(self):
+        cache = MemoryCache(max_entries=10, max_bytes=30, max_ttl=60)
+        cache.set('a', {'v': 'é' * 12})
+
+        assert cache.get('a') is None
+        cache.set('b', {'v': 'Leguin'})
+        assert cache.stats()['bytes'] == len('{"v":"Leguin"}')
+
+    def test_expired_entries_are_not_served(self):
+        cache = MemoryCache(max_entries=10, max_bytes=10000, max_ttl=60)
+        cache.set('a', {'v': 1}, datetime.now().astimezone() - timedelta(seconds=1))
+
+        assert cache.get('a') is None
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestCachedOpenLibraryMemoryTier:
+    def test_database_hit_fills_memory_tier(self, requests_mock):
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Test Author'})
+        ol = CachedOpenLibrary()
+
+        assert ol.Author.get('OL123A') == {'name': 'Test Author'}
+        OpenLibraryCache.objects.all().delete()
+        assert ol.Author.get('OL123A') == {'name': 'Test Author'}
+        assert not requests_mock.called
+
+    def test_network_response_fills_memory_tier(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        ol = CachedOpenLibrary()
+        hits_before = memory_cache.stats()['hits']
+
+        ol.Author.get('OL123A')
+        ol.Author.get('OL123A')
+
+        assert requests_mock.call_count == 1
+        assert memory_cache.stats()['hits'] == hits_before + 1
+
+
+class TestSharedClient:
+    def test_default_construction_returns_shared_client(self):
+        assert CachedOpenLibrary() is CachedOpenLibrary()
+        assert CachedOpenLibrary().Work is CachedOpenLibrary().Work
+
+    def test_custom_configuration_builds_independent_client(self):
+        custom = CachedOpenLibrary(base_url='http://localhost:8080')
+
+        assert custom is not CachedOpenLibrary()
+        assert custom.base_url == 'http://localhost:8080'
+
+    def test_session_uses_pooled_adapter_with_timeout(self):
+        adapter = CachedOpenLibrary().session.get_adapter('https://openlibrary.org')
+
+        assert isinstance(adapter, PooledHTTPAdapter)
+        assert adapter.timeout is not None
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestStaleWhileRevalidate:
+    def _expire(self, hours_ago):
+        OpenLibraryCache.objects.filter(request_url=AUTHOR_URL).update(
+            last_updated=datetime.now().astimezone() - timedelta(hours=hours_ago))
+
+    def test_stale_entry_served_and_refreshed_in_background(self, settings, requests_mock):
+        settings.OL_CACHE_STALE_WHILE_REVALIDATE = True
+        settings.OL_CACHE_MAX_STALENESS = 48
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Old Name'})
+        self._expire(hours_ago=30)
+
+        with patch('book.utils.ol_client._refresh_executor') as executor:
+            assert CachedOpenLibrary().Author.get('OL123A') == {'name': 'Old Name'}
+
+        executor.submit.assert_called_once()
+        assert executor.submit.call_args[0][1] == AUTHOR_URL
+        assert not requests_mock.called
+
+    def test_entry_past_max_staleness_fetched_synchronously(self, settings, requests_mock):
+        settings.OL_CACHE_STALE_WHILE_REVALIDATE = True
+        settings.OL_CACHE_MAX_STALENESS = 48
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Old Name'})
+        self._expire(hours_ago=24 + 49)
+        requests_mock.get(AUTHOR_URL, json={'name': 'New Name'})
+
+        assert CachedOpenLibrary().Author.get('OL123A') == {'name': 'New Name'}
+        assert OpenLibraryCache.get_cached_response(AUTHOR_URL) == {'name': 'New Name'}
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch():
+            calls.append(1)
+            release.wait(1)
+            return 'result'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow_fetch)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ['result'] * 5
+        assert sum(shared for _, shared in results) == 4
+
+    def test_error_is_shared_with_waiters(self):
+        flight = SingleFlight()
+
+        def failing_fetch():
+            raise ValueError('upstream down')
+
+        with pytest.raises(ValueError):
+            flight.do('key', failing_fetch)
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+class TestRequestCoalescing:
+    def test_concurrent_lookups_send_one_upstream_request(self, requests_mock):
+        def slow_response(request, context):
+            time.sleep(0.2)
+            return {'name': 'Test Author'}
+        requests_mock.get(AUTHOR_URL, json=slow_response)
+
+        results = []
+
+        def lookup():
+            results.append(CachedOpenLibrary().Author.get('OL123A'))
+            connection.close()
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert requests_mock.call_count == 1
+        assert results == [{'name': 'Test Author'}] * 4
+
+    def test_lease_blocks_second_holder(self):
+        assert OpenLibraryFetchLease.acquire(AUTHOR_URL, 'host:1', 10)
+        assert not OpenLibraryFetchLease.acquire(AUTHOR_URL, 'host:2', 10)
+
+        OpenLibraryFetchLease.release(AUTHOR_URL, 'host:1')
+        assert OpenLibraryFetchLease.acquire(AUTHOR_URL, 'host:2', 10)
+
+    def test_waits_for_leased_fetch_from_other_process(self, settings, requests_mock):
+        settings.OL_CACHE_FETCH_LEASES = True
+        OpenLibraryFetchLease.acquire(AUTHOR_URL, 'other-host:1', 5)
+        threading.Timer(0.2, lambda: (
+            OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Test Author'}),
+            connection.close())).start()
+
+        assert CachedOpenLibrary().Author.get('OL123A') == {'name': 'Test Author'}
+        assert not requests_mock.called
+
+
+class TestCacheTTLPolicy:
+    def test_policy_maps_endpoints_to_ttls(self, settings):
+        settings.OL_CACHE_TTL_POLICY = [
+            (r'/authors/_autocomplete', 0.25),
+            (r'/search\.json', 6),
+            (r'/authors/OL\d+A\.json', 24 * 14),
+        ]
+        settings.OL_CACHE_DEFAULT_TTL = 24
+
+        assert cache_ttl_hours('https://openlibrary.org/authors/_autocomplete?q=tolk&limit=5', ['x']) == 0.25
+        assert cache_ttl_hours('https://openlibrary.org/search.json?title=Hobbit', {'docs': [1]}) == 6
+        assert cache_ttl_hours(AUTHOR_URL, {'name': 'Test Author'}) == 24 * 14
+        assert cache_ttl_hours('https://openlibrary.org/works/OL1W.json', {'title': 'x'}) == 24
+
+    def test_empty_results_get_negative_ttl(self, settings):
+        settings.OL_CACHE_NEGATIVE_TTL = 1
+
+        assert cache_ttl_hours('https://openlibrary.org/search.json?isbn=123', {'docs': []}) == 1
+        assert cache_ttl_hours('https://openlibrary.org/authors/_autocomplete?q=zzz&limit=5', []) == 1
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestNegativeCaching:
+    def test_not_found_is_remembered(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, status_code=404)
+        ol = CachedOpenLibrary()
+
+        for _ in range(2):
+            memory_cache.clear()
+            with pytest.raises(HTTPError):
+                ol.Author.get('OL123A')
+
+        assert requests_mock.call_count == 1
+
+    def test_empty_search_is_cached_briefly(self, settings, requests_mock):
+        settings.OL_CACHE_NEGATIVE_TTL = 1
+        settings.OL_ISBN_EDITION_LOOKUP = False
+        url = 'https://openlibrary.org/search.json?isbn=0000000000'
+        requests_mock.get(url, json={'num_found': 0, 'docs': []})
+
+        assert CachedOpenLibrary().Work.search_by_isbn('0000000000') is None
+        assert CachedOpenLibrary().Work.search_by_isbn('0000000000') is None
+
+        assert requests_mock.call_count == 1
+        assert OpenLibraryCache.objects.get().cache_duration == 1
+
+
+class TestCircuitBreaker:
+    def _breaker(self):
+        return CircuitBreaker(failure_rate=0.5, min_requests=4, window_seconds=60,
+                              open_seconds=0.1, max_open_seconds=1)
+
+    def test_opens_at_failure_rate(self):
+        breaker = self._breaker()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_success()
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+    def test_half_open_probe_closes_on_success(self):
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_failure()
+        time.sleep(0.15)
+
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # only one probe at a time
+        breaker.record_success()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_backs_off_exponentially(self):
+        breaker = self._breaker()
+        for _ in range(4):
+            breaker.record_failure()
+        time.sleep(0.15)
+        breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()['open_for_seconds'] > 0.1
+
+    def test_retry_after_opens_immediately(self):
+        breaker = self._breaker()
+
+        breaker.record_failure(retry_after=30)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()['open_for_seconds'] > 29
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestCircuitBreakerIntegration:
+    def test_open_circuit_fails_fast_without_network(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, exc=ConnectionError)
+        for _ in range(10):
+            circuit_breaker.record_failure()
+
+        with pytest.raises(OpenLibraryUnavailable):
+            CachedOpenLibrary().Author.get('OL123A')
+        assert not requests_mock.called
+
+    def test_open_circuit_still_serves_cache(self):
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Test Author'})
+        for _ in range(10):
+            circuit_breaker.record_failure()
+
+        assert CachedOpenLibrary().Author.get('OL123A') == {'name': 'Test Author'}
+
+    def test_open_circuit_falls_back_to_expired_entry(self, settings, requests_mock):
+        settings.OL_CACHE_STALE_WHILE_REVALIDATE = False
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Test Author'}, duration=24)
+        OpenLibraryCache.objects.update(last_updated=datetime.now().astimezone() - timedelta(hours=30))
+        for _ in range(10):
+            circuit_breaker.record_failure()
+
+        assert CachedOpenLibrary().Author.get('OL123A') == {'name': 'Test Author'}
+        assert not requests_mock.called
+        # Still there for the next failure
+        assert OpenLibraryCache.objects.count() == 1
+
+    def test_throttled_response_opens_circuit(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, status_code=429, headers={'Retry-After': '60'})
+
+        with pytest.raises(HTTPError):
+            CachedOpenLibrary().Author.get('OL123A')
+
+        assert circuit_breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestSearchFieldProjection:
+    SEARCH_URL = 'https://openlibrary.org/search.json'
+
+    def test_search_requests_only_used_fields(self, requests_mock):
+        requests_mock.get(self.SEARCH_URL, json={'docs': [{'key': '/works/OL1W', 'title': 'Dune'}]})
+
+        CachedOpenLibrary().Work.search(title='Dune')
+
+        fields = requests_mock.last_request.qs['fields'][0].split(',')
+        assert set(fields) == {'key', 'title', 'author_name', 'author_key', 'author_alternative_name',
+                               'publisher', 'first_publish_year', 'isbn'}
+
+    def test_full_docs_on_request(self, requests_mock):
+        requests_mock.get(self.SEARCH_URL, json={'docs': [{'key': '/works/OL1W', 'title': 'Dune'}]})
+
+        CachedOpenLibrary().Work.search(title='Dune', fields=None)
+
+        assert 'fields' not in requests_mock.last_request.qs
+
+    def test_isbn_search_is_projected(self, settings, requests_mock):
+        settings.OL_ISBN_EDITION_LOOKUP = False
+        requests_mock.get(self.SEARCH_URL, json={'docs': []})
+
+        CachedOpenLibrary().Work.search_by_isbn('0451528557')
+
+        assert 'fields' in requests_mock.last_request.qs
+
+    def test_projected_and_full_docs_cached_separately(self, requests_mock):
+        requests_mock.get(self.SEARCH_URL, json={'docs': [{'key': '/works/OL1W', 'title': 'Dune'}]})
+        ol = CachedOpenLibrary()
+
+        ol.Work.search(title='Dune')
+        ol.Work.search(title='Dune', fields=None)
+        ol.Work.search(title='Dune')
+
+        assert requests_mock.call_count == 2
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestWriteBehind:
+    @pytest.fixture(autouse=True)
+    def write_behind(self, settings):
+        from book.utils.ol_write_buffer import write_buffer
+        settings.OL_CACHE_WRITE_BEHIND = True
+        settings.OL_CACHE_WRITE_FLUSH_SECONDS = 60
+        write_buffer.flush()
+        yield write_buffer
+        write_buffer.flush()
+
+    def test_fetch_queues_write_instead_of_writing(self, write_behind, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        ol = CachedOpenLibrary()
+
+        ol.Author.get('OL123A')
+        assert not OpenLibraryCache.objects.exists()
+
+        memory_cache.clear()
+        assert ol.Author.get('OL123A') == {'name': 'Test Author'}  # served from the buffer
+        assert requests_mock.call_count == 1
+
+        assert write_behind.flush() == 1
+        assert OpenLibraryCache.get_cached_response(AUTHOR_URL) == {'name': 'Test Author'}
+        assert len(write_behind) == 0
+
+    def test_clear_discards_queued_writes(self, write_behind, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        CachedOpenLibrary().Author.get('OL123A')
+
+        assert write_behind.clear() == 1
+        assert write_behind.get(AUTHOR_URL) is None
+        assert write_behind.flush() == 0
+        assert not OpenLibraryCache.objects.exists()
+
+    def test_batch_upsert_replaces_existing_rows(self):
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Old'})
+
+        OpenLibraryCache.cache_many([
+            (AUTHOR_URL, {'name': 'New'}, 48),
+            ('https://openlibrary.org/works/OL1W.json', {'title': 'Dune'}, 24),
+        ])
+
+        entry = OpenLibraryCache.get_cached_entry(AUTHOR_URL)
+        assert entry.response_data == {'name': 'New'}
+        assert entry.cache_duration == 48
+        assert OpenLibraryCache.objects.count() == 2
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+def test_write_behind_flushes_when_batch_fills(settings):
+    from book.utils.ol_write_buffer import write_buffer
+    settings.OL_CACHE_WRITE_BATCH_SIZE = 2
+    settings.OL_CACHE_WRITE_FLUSH_SECONDS = 60
+
+    write_buffer.enqueue('https://openlibrary.org/works/OL1W.json', {'title': 'One'}, 24)
+    write_buffer.enqueue('https://openlibrary.org/works/OL2W.json', {'title': 'Two'}, 24)
+
+    deadline = time.monotonic() + 5
+    while OpenLibraryCache.objects.count() < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert OpenLibraryCache.objects.count() == 2
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestIsbnEditionLookup:
+    EDITION = {
+        'key': '/books/OL100M', 'title': 'The Dispossessed', 'publishers': ['Harper Voyager'],
+        'publish_date': '2003', 'isbn_13': ['9780451528551'], 'works': [{'key': '/works/OL10W'}],
+    }
+    WORK = {'key': '/works/OL10W', 'title': 'The Dispossessed', 'first_publish_date': 'May 1974',
+            'authors': [{'author': {'key': '/authors/OL1A'}, 'type': {'key': '/type/author_role'}}]}
+
+    @pytest.fixture
+    def edition_api(self, requests_mock):
+        requests_mock.get('https://openlibrary.org/isbn/0451528557.json', json=self.EDITION)
+        requests_mock.get('https://openlibrary.org/works/OL10W.json', json=self.WORK)
+        requests_mock.get('https://openlibrary.org/authors/OL1A.json', json={'name': 'Ursula K. Le Guin'})
+        requests_mock.get('https://openlibrary.org/search.json', json={'docs': []})
+        return requests_mock
+
+    def test_resolves_through_edition_and_work(self, edition_api):
+        work = CachedOpenLibrary().Work.search_by_isbn('0-451-52855-7')
+
+        assert work.identifiers['olid'] == ['OL10W']
+        assert work.title == 'The Dispossessed'
+        assert work.publisher == 'Harper Voyager'
+        assert work.publish_date == 1974
+        assert work.authors == [{'name': 'Ursula K. Le Guin', 'olid': 'OL1A'}]
+        assert not any(r.path == '/search.json' for r in edition_api.request_history)
+
+    def test_records_isbn_pair(self, edition_api):
+        from book.models import OLIndexEdition
+
+        CachedOpenLibrary().Work.search_by_isbn('0451528557')
+
+        assert set(OLIndexEdition.objects.filter(work_olid='OL10W').values_list('isbn', flat=True)) == {
+            '0451528557', '9780451528551'}
+
+    def test_keyless_edition_is_not_an_edition_row(self):
+        from book.models import OLIndexEdition, OLIndexSearchIsbn
+        from book.utils.ol_isbn import record_isbn_pair
+
+        record_isbn_pair('0451528557', {'key': '/works/OL10W', 'title': 'The Dispossessed', 'isbn': []})
+
+        assert not OLIndexEdition.objects.exists()
+        assert set(OLIndexSearchIsbn.objects.values_list('isbn', flat=True)) == {'0451528557', '9780451528551'}
+
+    def test_falls_back_to_search_for_unknown_edition(self, requests_mock):
+        requests_mock.get('https://openlibrary.org/isbn/0060512750.json', status_code=404)
+        requests_mock.get('https://openlibrary.org/search.json', json={'docs': [
+            {'key': '/works/OL5W', 'title': 'Found By Search', 'author_name': ['A'], 'author_key': ['OL5A']}]})
+
+        work = CachedOpenLibrary().Work.search_by_isbn('0060512750')
+
+        assert work.identifiers['olid'] == ['OL5W']
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+def test_edition_lookup_fetches_authors_in_pool_and_records_in_background(settings, requests_mock):
+    from book.models import OLIndexEdition
+    from book.utils.ol_isbn import edition_search_doc, record_isbn_pair
+    settings.OL_CACHE_WRITE_BEHIND = True
+    requests_mock.get('https://openlibrary.org/isbn/0451528557.json', json=TestIsbnEditionLookup.EDITION)
+    requests_mock.get('https://openlibrary.org/works/OL10W.json', json={
+        **TestIsbnEditionLookup.WORK,
+        'authors': [{'author': {'key': f'/authors/OL{n}A'}} for n in (1, 2)]})
+    fetched_on = []
+
+    def author(request, context):
+        fetched_on.append(threading.current_thread().name)
+        return {'name': 'An Author'}
+    requests_mock.get(re.compile(r'https://openlibrary.org/authors/OL\dA.json'), json=author)
+
+    doc = edition_search_doc(CachedOpenLibrary(), '0451528557')
+    assert doc['author_key'] == ['OL1A', 'OL2A']
+    assert len(fetched_on) == 2 and all(name.startswith('ol-isbn-author') for name in fetched_on)
+
+    record_isbn_pair('0451528557', doc).result(timeout=5)
+    assert OLIndexEdition.objects.filter(work_olid='OL10W').count() == 2
+
+
+def test_isbn_forms():
+    from book.utils.ol_isbn import isbn_forms
+    assert isbn_forms('0-451-52855-7') == {'0451528557', '9780451528551'}
+    assert isbn_forms('9780451528551') == {'0451528557', '9780451528551'}
+    assert isbn_forms('080442957X') == {'080442957X', '9780804429573'}
+    assert isbn_forms('9791234567896') == {'9791234567896'}
+    assert isbn_forms('12X4567890') == {'12X4567890'}
+
+
+def test_is_valid_isbn():
+    from book.utils.ol_isbn import is_valid_isbn
+    assert is_valid_isbn('080442957X') and is_valid_isbn('9780451528551')
+    assert not is_valid_isbn('0451528558')  # wrong check digit
+    assert not is_valid_isbn('12X4567890')
+    assert not is_valid_isbn('97804515285')
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+class TestPrefetch:
+    @pytest.fixture(autouse=True)
+    def prefetching(self, settings):
+        settings.OL_PREFETCH = True
+
+    def test_confirmation_records_are_warmed(self, requests_mock):
+        requests_mock.get('https://openlibrary.org/works/OL1W.json', json={'title': 'Prefetched'})
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        ol = CachedOpenLibrary()
+
+        for future in ol.prefetch_records(work_olids=['OL1W'], author_olids=['OL123A', '']):
+            future.result(timeout=5)
+        calls = requests_mock.call_count
+
+        assert ol.Author.get('OL123A') == {'name': 'Test Author'}
+        assert ol.get_ol_response('/works/OL1W.json').json() == {'title': 'Prefetched'}
+        assert requests_mock.call_count == calls == 2
+
+    def test_failed_prefetch_is_swallowed(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, status_code=500)
+
+        futures = CachedOpenLibrary().prefetch_records(author_olids=['OL123A'])
+
+        assert futures[0].result(timeout=5) is None
+
+    def test_disabled(self, settings, requests_mock):
+        settings.OL_PREFETCH = False
+
+        assert CachedOpenLibrary().prefetch_records(work_olids=['OL1W']) == []
+        assert not requests_mock.called
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_isbn_candidates_prefetch_confirmation_records(client):
+    book = MagicMock(title='Test Book', publisher='Signet', publish_date=1950,
+                     identifiers={'olid': ['OL1W']}, authors=[{'name': 'Test Author', 'olid': 'OL123A'}])
+    with patch('book.views.isbn_views.CachedOpenLibrary') as ol_class:
+        ol_class.return_value.Work.search_by_isbn.return_value = book
+
+        response = client.post('/isbn/', {'isbn': '0451528557'})
+
+    assert response.status_code == 200
+    ol_class.return_value.prefetch_records.assert_called_once_with(
+        work_olids=['OL1W'], author_olids=['OL123A'])
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestIsbnIndex:
+    SEARCH_URL = 'https://openlibrary.org/search.json'
+    SEARCH_RESPONSE = {'docs': [{'key': '/works/OL10W', 'title': 'The Dispossessed', 'author_name': ['Ursula K. Le Guin'],
+                                 'author_key': ['OL1A'], 'first_publish_year': 1974, 'publisher': ['Harper'],
+                                 'isbn': ['0451528557', '9780060512750']}]}
+
+    def test_searched_work_resolves_other_editions_offline(self, requests_mock):
+        from book.models import OLIndexEdition, OLIndexSearchIsbn
+        requests_mock.get(self.SEARCH_URL, json=self.SEARCH_RESPONSE)
+        ol = CachedOpenLibrary()
+        ol.Work.search(title='The Dispossessed', limit=2)
+        calls = requests_mock.call_count
+
+        # ISBN-13 form of an ISBN-10 the search listed
+        work = ol.Work.search_by_isbn('978-0-451-52855-1')
+
+        assert work.identifiers['olid'] == ['OL10W']
+        assert work.authors == [{'name': 'Ursula K. Le Guin', 'olid': 'OL1A'}]
+        assert requests_mock.call_count == calls
+        # The doc doesn't say which ISBNs share an edition, so none are recorded as editions
+        assert OLIndexSearchIsbn.objects.filter(work_olid='OL10W').count() == 4
+        assert not OLIndexEdition.objects.exists()
+
+    def test_richer_rows_are_kept(self):
+        from book.models import OLIndexEdition
+        from book.utils.ol_isbn import index_search_docs
+        OLIndexEdition.objects.create(isbn='0451528557', edition_olid='OL100M', work_olid='OL10W',
+                                      publisher='Signet')
+
+        index_search_docs([(self.SEARCH_URL + '?title=x', self.SEARCH_RESPONSE)])
+
+        assert OLIndexEdition.objects.get(isbn='0451528557').edition_olid == 'OL100M'
+        assert CachedOpenLibrary().Work.search_by_isbn('0451528557').publisher == 'Signet'
+
+    def test_command_indexes_existing_cache(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from book.utils.ol_isbn import indexed_search_doc
+        OpenLibraryCache.cache_response(self.SEARCH_URL + '?title=the+dispossessed', self.SEARCH_RESPONSE)
+        OpenLibraryCache.cache_response(AUTHOR_URL, {'name': 'Test Author'})
+        out = StringIO()
+
+        call_command('index_cached_isbns', stdout=out)
+
+        assert indexed_search_doc('9780060512750')['title'] == 'The Dispossessed'
+        assert 'from 1 cached searches' in out.getvalue()
+
+    def test_disabled(self, settings):
+        from book.models import OLIndexSearchIsbn
+        from book.utils.ol_isbn import index_search_docs
+        settings.OL_ISBN_INDEX = False
+
+        assert index_search_docs([(self.SEARCH_URL, self.SEARCH_RESPONSE)]) == 0
+        assert not OLIndexSearchIsbn.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+class TestIsbnBatch:
+    SEARCH_URL = 'https://openlibrary.org/search.json'
+    DOCS = [{'key': '/works/OL10W', 'title': 'The Dispossessed', 'author_name': ['Ursula K. Le Guin'],
+             'author_key': ['OL1A'], 'isbn': ['0451528557', '9780451528551']},
+            {'key': '/works/OL11W', 'title': 'The Lathe of Heaven', 'author_name': ['Ursula K. Le Guin'],
+             'author_key': ['OL1A'], 'isbn': ['006051275X']}]
+
+    @pytest.fixture
+    def search_api(self, requests_mock):
+        from book.utils.ol_isbn import isbn_forms
+
+        def search(request, context):
+            query = unquote_plus(request.url)
+            return {'docs': [doc for doc in self.DOCS
+                             if any(form in query for isbn in doc['isbn'] for form in isbn_forms(isbn))]}
+        requests_mock.get(self.SEARCH_URL, json=search)
+        return requests_mock
+
+    def test_one_query_for_the_stack(self, settings, search_api):
+        works = CachedOpenLibrary().Work.search_by_isbns(['0-451-52855-7', '9780060512750', '9780140328721'])
+
+        assert works['0-451-52855-7'].identifiers['olid'] == ['OL10W']
+        assert works['9780060512750'].title == 'The Lathe of Heaven'
+        assert works['9780140328721'] is None
+        assert search_api.call_count == 1
+        assert 'q=isbn:(9780451528551 OR 9780060512750 OR 9780140328721)' in unquote_plus(search_api.last_request.url)
+
+        # Each ISBN's own search is cached, hits and misses alike
+        settings.OL_ISBN_INDEX = False
+        settings.OL_ISBN_EDITION_LOOKUP = False
+        ol = CachedOpenLibrary()
+        assert ol.Work.search_by_isbn('9780060512750').identifiers['olid'] == ['OL11W']
+        assert ol.Work.search_by_isbn('9780140328721') is None
+        assert search_api.call_count == 1
+
+    def test_known_isbns_cost_no_request(self, search_api):
+        ol = CachedOpenLibrary()
+        ol.Work.search_by_isbns(['0451528557'])
+
+        works = ol.Work.search_by_isbns(['9780451528551', '0451528557', 'not an isbn'])
+
+        assert works['9780451528551'].identifiers['olid'] == ['OL10W']
+        assert works['not an isbn'] is None
+        assert search_api.call_count == 1
+
+    def test_queries_run_in_parallel_batches(self, settings, search_api):
+        settings.OL_ISBN_BATCH_SIZE = 1
+
+        works = CachedOpenLibrary().Work.search_by_isbns(['0451528557', '006051275X'])
+
+        assert [work.identifiers['olid'] for work in works.values()] == [['OL10W'], ['OL11W']]
+        assert search_api.call_count == 2
+
+    def test_invalid_isbns_are_not_searched(self, search_api):
+        works = CachedOpenLibrary().Work.search_by_isbns(['12X4567890', '0451528558', '0451528557'])
+
+        assert works['12X4567890'] is None and works['0451528558'] is None
+        assert 'q=isbn:(9780451528551)' in unquote_plus(search_api.last_request.url)
+
+    def test_misses_of_a_cut_off_response_are_not_cached(self, settings, requests_mock):
+        # More matches than the limit, so the ISBN that came back empty may only have been cut off
+        requests_mock.get(self.SEARCH_URL, json={'numFound': 5, 'docs': self.DOCS[:1]})
+        CachedOpenLibrary().Work.search_by_isbns(['0451528557', '9780140328721'])
+
+        from book.utils.ol_isbn_batch import cached_data
+        ol = CachedOpenLibrary()
+        assert cached_data(ol.isbn_search_url('0451528557'))['docs']
+        assert cached_data(ol.isbn_search_url('9780140328721')) is None
@@ -0,0 +1,139 @@
+import pytest
+import threading
+import time
+from requests import Response
+from book.utils.ol_client import CachedOpenLibrary
+from book.utils.ol_hedge import HedgeBudget, hedge_budget, hedge_delay, hedged_call
+from book.utils.ol_metrics import ol_metrics
+from book.utils.ol_rate_limit import BACKGROUND, ol_priority
+
+
+def _slow_first(first_delay, results):
+    """send() that returns (or raises) the next of results, sleeping first_delay on its first call"""
+    calls = []
+    lock = threading.Lock()
+
+    def send():
+        with lock:
+            calls.append(None)
+            call = len(calls)
+        if call == 1:
+            time.sleep(first_delay)
+        result = results[call - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return send, calls
+
+
+class TestHedgedCall:
+    def test_fast_primary_is_not_hedged(self):
+        send, calls = _slow_first(0, ['primary', 'hedge'])
+
+        assert hedged_call(send, 0.5, lambda: True) == ('primary', False, False)
+        assert len(calls) == 1
+
+    def test_slow_primary_loses_to_hedge(self):
+        send, calls = _slow_first(0.5, ['primary', 'hedge'])
+
+        assert hedged_call(send, 0.05, lambda: True) == ('hedge', True, True)
+        assert len(calls) == 2
+
+    def test_no_hedge_without_budget(self):
+        send, calls = _slow_first(0.1, ['primary', 'hedge'])
+
+        assert hedged_call(send, 0.02, lambda: False) == ('primary', False, False)
+        assert len(calls) == 1
+
+    def test_failed_hedge_waits_for_primary(self):
+        send, _ = _slow_first(0.2, ['primary', ValueError('hedge failed')])
+
+        assert hedged_call(send, 0.02, lambda: True) == ('primary', True, False)
+
+    def test_both_failing_raises(self):
+        send, _ = _slow_first(0.1, [ValueError('primary failed'), ValueError('hedge failed')])
+
+        with pytest.raises(ValueError, match='hedge failed'):
+            hedged_call(send, 0.02, lambda: True)
+
+
+class TestHedgeBudget:
+    def test_earns_ratio_per_request(self, settings):
+        settings.OL_HEDGE_BUDGET_RATIO = 0.25
+        budget = HedgeBudget()
+
+        for _ in range(3):
+            budget.earn()
+        assert not budget.try_spend()
+        budget.earn()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+    def test_never_more_than_one_hedge_per_request(self, settings):
+        settings.OL_HEDGE_BUDGET_RATIO = 5
+        budget = HedgeBudget()
+
+        for _ in range(3):
+            budget.earn()
+        assert sum(budget.try_spend() for _ in range(10)) == 3
+
+
+def test_delay_follows_observed_p90(settings):
+    settings.OL_HEDGE_MIN_SAMPLES = 10
+    settings.OL_HEDGE_DEFAULT_DELAY = 2.0
+    assert hedge_delay('work') == 2.0
+
+    for _ in range(9):
+        ol_metrics.record_upstream('work', 0.08, 200)
+    assert hedge_delay('work') == 2.0
+    ol_metrics.record_upstream('work', 3, 200)
+
+    assert hedge_delay('work') == 0.1
+    for _ in range(5):
+        ol_metrics.record_upstream('work', 0.4, 200)
+    assert hedge_delay('work') == 0.5
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestHedgedClient:
+    @pytest.fixture(autouse=True)
+    def hedging(self, settings):
+        settings.OL_HEDGED_REQUESTS = True
+        settings.OL_HEDGE_DEFAULT_DELAY = 0.05
+        settings.OL_HEDGE_BUDGET_RATIO = 1
+
+    @pytest.fixture
+    def slow_first_response(self, monkeypatch):
+        # requests_mock serialises requests across threads, so stand in for the session instead
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            response = Response()
+            response.status_code = 200
+            if len(calls) == 1:
+                time.sleep(0.5)
+                response._content = b'{"name": "Slow"}'
+            else:
+                response._content = b'{"name": "Fast"}'
+            return response
+        monkeypatch.setattr(CachedOpenLibrary().session, 'get', get)
+        return calls
+
+    def test_hedge_answers_slow_request(self, slow_first_response):
+        assert CachedOpenLibrary().Author.get('OL123A')['name'] == 'Fast'
+
+        assert len(slow_first_response) == 2
+        row = next(row for row in ol_metrics.summary() if row['endpoint'] == 'author')
+        assert (row['hedges_sent'], row['hedges_won']) == (1, 1)
+
+    def test_disabled_by_default(self, settings, slow_first_response):
+        settings.OL_HEDGED_REQUESTS = False
+
+        assert CachedOpenLibrary().Author.get('OL123A')['name'] == 'Slow'
+        assert len(slow_first_response) == 1
+
+    def test_background_requests_are_not_hedged(self, slow_first_response):
+        with ol_priority(BACKGROUND):
+            assert CachedOpenLibrary().Author.get('OL123A')['name'] == 'Slow'
+        assert hedge_budget.hedges == 0
@@ -0,0 +1,77 @@
+import pytest
+from book.models import OpenLibraryCache
+from book.utils.ol_client import CachedOpenLibrary
+from book.utils.ol_metrics import Histogram, ol_metrics
+
+AUTHOR_URL = 'https://openlibrary.org/authors/OL123A.json'
+
+
+def _sources(endpoint):
+    return next(row for row in ol_metrics.summary() if row['endpoint'] == endpoint)['sources']
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestOpenLibraryMetrics:
+    def test_lookups_counted_by_source(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        ol = CachedOpenLibrary()
+
+        ol.Author.get('OL123A')   # network
+        ol.Author.get('OL123A')   # memory
+        from book.utils.ol_memory_cache import memory_cache
+        memory_cache.clear()
+        ol.Author.get('OL123A')   # database
+
+        sources = _sources('author')
+        assert (sources['network'], sources['memory'], sources['database']) == (1, 1, 1)
+        row = ol_metrics.summary()[0]
+        assert row['upstream_requests'] == 1
+        assert row['hit_rate'] == pytest.approx(2 / 3)
+
+    def test_failed_fetch_counts_as_error(self, requests_mock):
+        requests_mock.get(AUTHOR_URL, status_code=500)
+
+        with pytest.raises(Exception):
+            CachedOpenLibrary().Author.get('OL123A')
+
+        assert _sources('author')['error'] == 1
+        assert 'libracents_ol_upstream_responses_total{endpoint="author",status="500"} 1' in \
+            ol_metrics.prometheus_lines()
+
+    def test_prometheus_endpoint(self, admin_client, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        CachedOpenLibrary().Author.get('OL123A')
+
+        response = admin_client.get('/metrics/openlibrary')
+
+        body = response.content.decode()
+        assert response['Content-Type'].startswith('text/plain')
+        assert 'libracents_ol_lookups_total{endpoint="author",source="network"} 1' in body
+        assert 'libracents_ol_upstream_seconds_count{endpoint="author"} 1' in body
+        assert 'libracents_ol_upstream_responses_total{endpoint="author",status="200"} 1' in body
+
+    def test_prometheus_endpoint_rejects_anonymous(self, client, settings):
+        settings.OL_METRICS_TOKEN = 'scrape-me'
+
+        assert client.get('/metrics/openlibrary').status_code == 302
+        assert client.get('/metrics/openlibrary', HTTP_AUTHORIZATION='Bearer wrong').status_code == 302
+        assert client.get('/metrics/openlibrary', HTTP_AUTHORIZATION='Bearer scrape-me').status_code == 200
+
+    def test_admin_summary_page(self, admin_client, requests_mock):
+        requests_mock.get(AUTHOR_URL, json={'name': 'Test Author'})
+        CachedOpenLibrary().Author.get('OL123A')
+
+        response = admin_client.get('/admin/ol-metrics/')
+
+        assert response.status_code == 200
+        assert b'author' in response.content
+
+
+def test_histogram_quantile():
+    histogram = Histogram(bounds=(0.1, 1))
+    for value in (0.05, 0.05, 0.5, 5):
+        histogram.observe(value)
+
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1
+    assert histogram.quantile(0.99) is None
@@ -0,0 +1,150 @@
+import gzip
+import json
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from book.models import OLIndexAuthor, OLIndexEdition, OLIndexIngestProgress, OLIndexWork
+from book.utils.ol_client import CachedOpenLibrary, OpenLibraryUnavailable
+from book.utils.ol_offline import ingest_dump, resolve_offline
+
+
+def _write_dump(path, records):
+    with gzip.open(path, 'wt', encoding='utf-8') as dump:
+        for record_type, key, record in records:
+            dump.write(f'{record_type}\t{key}\t1\t2024-01-01T00:00:00\t{json.dumps(record)}\n')
+    return str(path)
+
+
+@pytest.fixture
+def dumps(tmp_path):
+    authors = _write_dump(tmp_path / 'ol_dump_authors_2024-01-01.txt.gz', [
+        ('/type/author', '/authors/OL1A', {'key': '/authors/OL1A', 'name': 'Ursula K. Le Guin',
+                                           'birth_date': '1929', 'death_date': '2018'}),
+        ('/type/redirect', '/authors/OL9A', {'location': '/authors/OL1A'}),
+        ('/type/author', '/authors/OL2A', {'key': '/authors/OL2A', 'name': 'Frank Herbert'}),
+    ])
+    works = _write_dump(tmp_path / 'ol_dump_works_2024-01-01.txt.gz', [
+        ('/type/work', '/works/OL10W', {'key': '/works/OL10W', 'title': 'The Dispossessed',
+                                        'authors': [{'author': {'key': '/authors/OL1A'}}],
+                                        'first_publish_date': 'May 1974'}),
+        ('/type/work', '/works/OL11W', {'key': '/works/OL11W', 'title': 'Dune',
+                                        'authors': [{'author': {'key': '/authors/OL2A'}}]}),
+    ])
+    editions = _write_dump(tmp_path / 'ol_dump_editions_2024-01-01.txt.gz', [
+        ('/type/edition', '/books/OL100M', {'works': [{'key': '/works/OL10W'}],
+                                            'isbn_13': ['978-0-06-051275-0'],
+                                            'isbn_10': ['0060512750'],
+                                            'publishers': ['Harper Voyager']}),
+    ])
+    return authors, works, editions
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestIngestDump:
+    def test_command_loads_all_kinds(self, dumps):
+        out = StringIO()
+        call_command('ingest_ol_dump', *dumps, stdout=out)
+
+        assert set(OLIndexAuthor.objects.values_list('olid', flat=True)) == {'OL1A', 'OL2A'}
+        assert OLIndexWork.objects.get(olid='OL10W').first_publish_year == 1974
+        assert OLIndexWork.objects.get(olid='OL10W').author_olid_list == ['OL1A']
+        assert set(OLIndexEdition.objects.values_list('isbn', flat=True)) == {'9780060512750', '0060512750'}
+        assert 'complete' in out.getvalue()
+
+    def test_interrupted_ingest_resumes(self, dumps):
+        authors = dumps[0]
+
+        progress = ingest_dump(authors, 'authors', chunk_size=1, limit=1)
+        assert not progress.completed
+        assert OLIndexAuthor.objects.count() == 1
+
+        progress = ingest_dump(authors, 'authors', chunk_size=1)
+        assert progress.completed
+        assert progress.lines_done == 3
+        assert OLIndexAuthor.objects.count() == 2
+
+    def test_resume_seeks_past_committed_lines(self, dumps, tmp_path):
+        plain = tmp_path / 'ol_dump_authors_plain.txt'
+        with gzip.open(dumps[0], 'rb') as dump:
+            plain.write_bytes(dump.read())
+
+        progress = ingest_dump(str(plain), 'authors', chunk_size=1, limit=2)
+        assert progress.bytes_done == len(b''.join(plain.read_bytes().splitlines(keepends=True)[:2]))
+        # A line the first run read is never parsed again
+        OLIndexAuthor.objects.all().delete()
+
+        progress = ingest_dump(str(plain), 'authors', chunk_size=1)
+        assert progress.completed
+        assert progress.bytes_done == plain.stat().st_size
+        assert list(OLIndexAuthor.objects.values_list('olid', flat=True)) == ['OL2A']
+
+    def test_work_credits_are_indexed(self, dumps):
+        from book.models import OLIndexWorkAuthor
+        ingest_dump(dumps[1], 'works')
+
+        assert set(OLIndexWorkAuthor.objects.values_list('author_olid', 'work_olid')) == {
+            ('OL1A', 'OL10W'), ('OL2A', 'OL11W')}
+
+    def test_completed_dump_is_skipped(self, dumps):
+        ingest_dump(dumps[0], 'authors')
+        OLIndexAuthor.objects.all().delete()
+
+        ingest_dump(dumps[0], 'authors')
+        assert OLIndexAuthor.objects.count() == 0
+
+        ingest_dump(dumps[0], 'authors', restart=True)
+        assert OLIndexAuthor.objects.count() == 2
+        assert OLIndexIngestProgress.objects.count() == 1
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+class TestOfflineResolver:
+    @pytest.fixture(autouse=True)
+    def index(self, dumps):
+        call_command('ingest_ol_dump', *dumps, stdout=StringIO())
+
+    def test_resolves_records_and_searches(self):
+        assert resolve_offline('https://openlibrary.org/authors/OL2A.json')['name'] == 'Frank Herbert'
+        assert resolve_offline('https://openlibrary.org/works/OL11W.json')['title'] == 'Dune'
+
+        docs = resolve_offline('https://openlibrary.org/search.json?author=le+guin&title=the+disp')['docs']
+        assert [doc['key'] for doc in docs] == ['/works/OL10W']
+        assert docs[0]['author_name'] == ['Ursula K. Le Guin']
+
+        docs = resolve_offline('https://openlibrary.org/search.json?author=OL2A&title=dune')['docs']
+        assert docs[0]['author_key'] == ['OL2A']
+
+        assert resolve_offline('https://openlibrary.org/search.json?title=unknown') is None
+
+    def test_client_answers_from_index_without_network(self, settings, requests_mock):
+        settings.OL_OFFLINE_RESOLVER = True
+        ol = CachedOpenLibrary()
+
+        assert ol.Author.get('OL1A')['name'] == 'Ursula K. Le Guin'
+        assert ol.Author.search('ursula')[0]['key'] == '/authors/OL1A'
+        work = ol.Work.search_by_isbn('978-0-06-051275-0')
+        assert work.title == 'The Dispossessed'
+        assert work.publisher == 'Harper Voyager'
+        assert not requests_mock.called
+
+    def test_search_doc_isbns_are_not_edition_records(self):
+        from book.utils.ol_isbn import index_search_docs
+        index_search_docs([('https://openlibrary.org/search.json?title=dune', {'docs': [
+            {'key': '/works/OL11W', 'title': 'Dune', 'isbn': ['0441013597', '9780340960196']}]})])
+
+        assert resolve_offline('https://openlibrary.org/isbn/0441013597.json') is None
+        isbns = resolve_offline('https://openlibrary.org/isbn/0060512750.json')['isbn_10']
+        assert isbns == ['0060512750']
+
+    def test_index_miss_goes_to_network(self, settings, requests_mock):
+        settings.OL_OFFLINE_RESOLVER = True
+        requests_mock.get('https://openlibrary.org/authors/OL5A.json', json={'name': 'Remote'})
+
+        assert CachedOpenLibrary().Author.get('OL5A') == {'name': 'Remote'}
+
+    def test_offline_only_never_hits_network(self, settings, requests_mock):
+        settings.OL_OFFLINE_ONLY = True
+
+        with pytest.raises(OpenLibraryUnavailable):
+            CachedOpenLibrary().Author.get('OL5A')
+        assert not requests_mock.called
@@ -0,0 +1,91 @@
+import multiprocessing
+import pytest
+import time
+from book.utils.ol_client import CachedOpenLibrary, OpenLibraryUnavailable
+from book.utils.ol_rate_limit import (
+    BACKGROUND, INTERACTIVE, RateLimitTimeout, SharedTokenBucket, ol_priority, rate_limiter
+)
+
+
+@pytest.fixture
+def bucket(settings):
+    settings.OL_RATE_LIMIT_PER_SECOND = 10
+    settings.OL_RATE_LIMIT_BURST = 3
+    settings.OL_RATE_LIMIT_INTERACTIVE_RESERVE = 1
+    return SharedTokenBucket()
+
+
+def _drain(path, count):
+    from django.conf import settings
+    settings.OL_RATE_LIMIT_STATE_FILE = path
+    for _ in range(count):
+        rate_limiter.acquire(timeout=0)
+
+
+class TestSharedTokenBucket:
+    def test_burst_then_throttle(self, bucket):
+        for _ in range(3):
+            bucket.acquire(INTERACTIVE, timeout=0)
+
+        with pytest.raises(RateLimitTimeout):
+            bucket.acquire(INTERACTIVE, timeout=0)
+
+        started = time.monotonic()
+        bucket.acquire(INTERACTIVE, timeout=1)
+        assert time.monotonic() - started >= 0.05
+
+    def test_background_leaves_interactive_reserve(self, bucket):
+        bucket.acquire(BACKGROUND, timeout=0)
+        bucket.acquire(BACKGROUND, timeout=0)
+
+        with pytest.raises(RateLimitTimeout):
+            bucket.acquire(BACKGROUND, timeout=0)
+        bucket.acquire(INTERACTIVE, timeout=0)
+
+    def test_background_yields_to_waiting_interactive(self, bucket):
+        for _ in range(3):
+            bucket.acquire(INTERACTIVE, timeout=0)
+        with pytest.raises(RateLimitTimeout):
+            bucket.acquire(INTERACTIVE, timeout=0)
+
+        time.sleep(0.3)  # bucket refills past the reserve...
+        with pytest.raises(RateLimitTimeout):
+            bucket.acquire(BACKGROUND, timeout=0)  # ...but an interactive request is queued
+
+    def test_disabled_without_rate(self, settings):
+        settings.OL_RATE_LIMIT_PER_SECOND = None
+        bucket = SharedTokenBucket()
+        for _ in range(100):
+            bucket.acquire(timeout=0)
+
+    def test_budget_is_shared_between_processes(self, bucket, settings):
+        process = multiprocessing.get_context('fork').Process(
+            target=_drain, args=(settings.OL_RATE_LIMIT_STATE_FILE, 3))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+
+        with pytest.raises(RateLimitTimeout):
+            bucket.acquire(INTERACTIVE, timeout=0)
+
+    def test_priority_context(self):
+        from book.utils.ol_rate_limit import current_lane
+        assert current_lane() == INTERACTIVE
+        with ol_priority(BACKGROUND):
+            assert current_lane() == BACKGROUND
+        assert current_lane() == INTERACTIVE
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_client_gives_up_when_no_token(settings, requests_mock):
+    settings.OL_RATE_LIMIT_PER_SECOND = 0.01
+    settings.OL_RATE_LIMIT_BURST = 1
+    settings.OL_RATE_LIMIT_MAX_WAIT = {'interactive': 0}
+    requests_mock.get('https://openlibrary.org/authors/OL1A.json', json={'name': 'One'})
+    requests_mock.get('https://openlibrary.org/authors/OL2A.json', json={'name': 'Two'})
+    ol = CachedOpenLibrary()
+
+    assert ol.Author.get('OL1A') == {'name': 'One'}
+    with pytest.raises(OpenLibraryUnavailable):
+        ol.Author.get('OL2A')
+    assert requests_mock.call_count == 1
@@ -0,0 +1,214 @@
+import pytest
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from book.models import Author
+from book.views.book_views import _search_openlibrary, _plan_search_cascade
+
+
+def _work(olid, author_key):
+    return SimpleNamespace(title='The Mustang Herder', identifiers={'olid': [olid]},
+                           authors=[{'name': 'Max Brand'}], author_key=[author_key])
+
+
+def _fake_ol(results_by_author, delay=0):
+    """OpenLibrary stand-in whose Work.search answers by the author kwarg"""
+    ol = MagicMock()
+
+    def search(title=None, author=None, limit=1):
+        time.sleep(delay)
+        return results_by_author.get(author, [])
+    ol.Work.search.side_effect = search
+    return ol
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+@pytest.mark.parametrize('parallel', [True, False])
+class TestSearchCascade:
+    def test_plan_lists_steps_in_precedence_order(self, parallel):
+        steps = _plan_search_cascade('Title', 'OL1A', 'Max J. Brand (1892-1944)')
+
+        assert [name for name, _ in steps] == [
+            'author_olid', 'author_name', 'simplified_name', 'last_name', 'title']
+        assert steps[2][1]['author'] == 'Max Brand'
+
+    def test_highest_priority_hit_wins(self, settings, parallel):
+        settings.OL_PARALLEL_SEARCH_CASCADE = parallel
+        ol = _fake_ol({
+            'Max Brand': [_work('OL2W', 'OL1A')],
+            'Brand': [_work('OL3W', 'OL1A')],
+            None: [_work('OL4W', 'OL1A')],
+        })
+
+        results = _search_openlibrary(ol, 'The Mustang Herder', author_name='Max Brand')
+
+        assert [r.identifiers['olid'][0] for r in results] == ['OL2W']
+
+    def test_alternate_olid_recorded_from_olid_step(self, settings, parallel):
+        settings.OL_PARALLEL_SEARCH_CASCADE = parallel
+        author = Author.objects.create(primary_name='Max Brand', search_name='max brand', olid='OL1A')
+        ol = _fake_ol({'OL1A': [_work('OL2W', 'OL9A')]})
+
+        _search_openlibrary(ol, 'The Mustang Herder', author_olid='OL1A', author_name='Max Brand')
+
+        author.refresh_from_db()
+        assert author.alternate_olids == ['OL9A']
+
+    def test_falls_back_to_title_only(self, settings, parallel):
+        settings.OL_PARALLEL_SEARCH_CASCADE = parallel
+        ol = _fake_ol({None: [_work('OL4W', 'OL1A')]})
+
+        results = _search_openlibrary(ol, 'The Mustang Herder', author_name='Max Brand')
+
+        assert [r.identifiers['olid'][0] for r in results] == ['OL4W']
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_parallel_cascade_latency_is_slowest_step_not_sum(settings):
+    settings.OL_PARALLEL_SEARCH_CASCADE = True
+    ol = _fake_ol({None: [_work('OL4W', 'OL1A')]}, delay=0.2)
+
+    started = time.monotonic()
+    _search_openlibrary(ol, 'The Mustang Herder', author_name='Max J. Brand')
+
+    # Four misses and a hit; sequentially this would take a full second
+    assert time.monotonic() - started < 0.6
+
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_speculative_steps_run_in_background_lane(settings):
+    from book.utils.ol_rate_limit import current_lane
+    settings.OL_PARALLEL_SEARCH_CASCADE = True
+    lanes = {}
+    ol = MagicMock()
+
+    def search(title=None, author=None, limit=1):
+        lanes[author] = current_lane()
+        if author == 'OL1A':
+            # Long enough for the pool to pick up every fallback
+            time.sleep(0.2)
+        return []
+    ol.Work.search.side_effect = search
+
+    _search_openlibrary(ol, 'The Mustang Herder', author_olid='OL1A', author_name='Max Brand')
+
+    assert lanes.pop('OL1A') == 'interactive'
+    assert set(lanes.values()) == {'background'}
+
+
+
+@pytest.mark.django_db(databases=['default', 'ol_cache'])
+def test_quick_first_step_hit_sends_no_speculative_searches(settings):
+    settings.OL_PARALLEL_SEARCH_CASCADE = True
+    ol = _fake_ol({'OL1A': [_work('OL2W', 'OL1A')]})
+
+    _search_openlibrary(ol, 'The Mustang Herder', author_olid='OL1A', author_name='Max Brand')
+    time.sleep(0.2)
+
+    assert ol.Work.search.call_count == 1
+
+
+SEARCH_URL = 'https://openlibrary.org/search.json'
+DOC = {'key': '/works/OL4W', 'title': 'The Mustang Herder', 'author_name': ['Max Brand'],
+       'author_key': ['OL1A']}
+
+
+# Transactional: the speculative steps write the cache from pool threads
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+def test_speculation_starved_of_background_tokens_reruns_interactively(settings, requests_mock):
+    import json
+    from book.utils.ol_client import CachedOpenLibrary
+    settings.OL_PARALLEL_SEARCH_CASCADE = True
+    settings.OL_RATE_LIMIT_PER_SECOND = 3
+    settings.OL_RATE_LIMIT_MAX_WAIT = {'interactive': 5, 'background': 60}
+    # A busy interactive lane holding background traffic off for the whole test
+    with open(settings.OL_RATE_LIMIT_STATE_FILE, 'w') as state_file:
+        json.dump({'interactive_waiting_until': time.time() + 3600}, state_file)
+
+    def respond(request, context):
+        if request.qs.get('author') == ['max j. brand']:
+            # Slow enough for every fallback to start speculatively
+            time.sleep(0.3)
+        return {'docs': [DOC] if 'author' not in request.qs else []}
+    requests_mock.get(SEARCH_URL, json=respond)
+
+    started = time.monotonic()
+    results = _search_openlibrary(CachedOpenLibrary(), 'The Mustang Herder', author_name='Max J. Brand')
+
+    assert [r.identifiers['olid'][0] for r in results] == ['OL4W']
+    # Not the background lane's 60s wait
+    assert time.monotonic() - started < 3
+
+
+# Transactional: the cascade writes the cache from its pool threads too
+@pytest.mark.django_db(transaction=True, databases=['default', 'ol_cache'])
+@pytest.mark.parametrize('parallel', [True, False])
+class TestSearchResultMemo:
+    @pytest.fixture(autouse=True)
+    def search_api(self, settings, parallel, requests_mock):
+        settings.OL_PARALLEL_SEARCH_CASCADE = parallel
+        settings.OL_SEARCH_RESULT_MEMO = True
+
+        def respond(request, context):
+            return {'docs': [DOC] if 'author' not in request.qs else []}
+        requests_mock.get(SEARCH_URL, json=respond)
+        return requests_mock
+
+    def _search(self, title='The Mustang Herder', author_name='Max Brand'):
+        from book.utils.ol_client import CachedOpenLibrary
+        return _search_openlibrary(CachedOpenLibrary(), title, author_name=author_name)
+
+    def test_repeat_search_skips_the_cascade(self, search_api, monkeypatch):
+        first = self._search()
+        cascade = MagicMock(side_effect=AssertionError('cascade replayed'))
+        monkeypatch.setattr('book.views.book_views._run_search_cascade', cascade)
+
+        again = self._search(title='  the mustang   HERDER', author_name='max brand')
+
+        assert [r.identifiers['olid'][0] for r in again] == ['OL4W']
+        assert again is not first
+
+    def test_memo_hit_still_records_alternate_olids(self, search_api, monkeypatch):
+        from datetime import datetime, timedelta
+        from book.utils.ol_client import _note_expiry
+        ol = _fake_ol({None: [_work('OL4W', 'OL1A')]})
+        search = ol.Work.search.side_effect
+
+        def search_and_note_expiry(**kwargs):
+            # As the cached client does for every response it serves
+            _note_expiry(datetime.now().astimezone() + timedelta(hours=1))
+            return search(**kwargs)
+        ol.Work.search.side_effect = search_and_note_expiry
+        _search_openlibrary(ol, 'The Mustang Herder', author_olid='OL7A', author_name='Max Brand')
+        # Created after the cascade ran, so only the memo hit can record the result's author
+        author = Author.objects.create(primary_name='Max Brand', search_name='max brand', olid='OL7A')
+        monkeypatch.setattr('book.views.book_views._run_search_cascade',
+                            MagicMock(side_effect=AssertionError('cascade replayed')))
+
+        _search_openlibrary(ol, 'The Mustang Herder', author_olid='OL7A', author_name='Max Brand')
+
+        author.refresh_from_db()
+        assert author.alternate_olids == ['OL1A']
+
+    def test_clearing_the_memory_cache_drops_the_memo(self, search_api, monkeypatch):
+        from book.utils.ol_memory_cache import memory_cache
+        from book.views import book_views
+        self._search()
+        memory_cache.clear()
+        cascade = MagicMock(wraps=book_views._run_search_cascade)
+        monkeypatch.setattr('book.views.book_views._run_search_cascade', cascade)
+
+        self._search()
+
+        assert cascade.called
+
+    def test_memo_expires_with_its_earliest_source(self, settings, search_api):
+        from book.utils.ol_memory_cache import search_result_memo
+        from book.views.book_views import _search_memo_key
+        settings.OL_CACHE_NEGATIVE_TTL = 0
+
+        self._search()
+
+        # The empty author-name searches it passed through expired immediately
+        assert search_result_memo.get(_search_memo_key('The Mustang Herder', None, 'Max Brand')) is None
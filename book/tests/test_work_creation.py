@@ -10,6 +10,8 @@ import requests
 from book.views.book_views import get_title
 
 class TestWorkCreation(TestCase):
+    databases = {'default', 'ol_cache'}
+
     def setUp(self):
         self.factory = RequestFactory()
         # Create a test author
@@ -16,7 +16,7 @@ Including another URLconf
 #from django.contrib import admin
 from django.urls import path
 
-from .views import index, get_author, confirm_author, get_title, confirm_book, author_autocomplete, test_autocomplete, title_autocomplete, list, manage_locations, get_rooms, get_bookcases, get_shelves, assign_location, update_shelf_notes, shelve_books, get_shelf_details, get_book_by_isbn, reshelve_books, get_books_by_location, get_shelf_books, title_only_search, start_collection, cancel_collection
+from .views import index, get_author, confirm_author, get_title, confirm_book, author_autocomplete, test_autocomplete, title_autocomplete, list, manage_locations, get_rooms, get_bookcases, get_shelves, assign_location, update_shelf_notes, shelve_books, get_shelf_details, get_book_by_isbn, reshelve_books, get_books_by_location, get_shelf_books, title_only_search, start_collection, cancel_collection, openlibrary_metrics
 from .api_views import api_root
 from .admin import admin_site
 
@@ -48,4 +48,5 @@ urlpatterns = [
     path('title-only/', title_only_search, name='title_only'),
     path('start-collection/', start_collection, name='start_collection'),
     path('cancel-collection/', cancel_collection, name='cancel_collection'),
+    path('metrics/openlibrary', openlibrary_metrics, name='openlibrary_metrics'),
 ]
@@ -0,0 +1,112 @@
+"""
+Prefix-narrowing result cache for the autocomplete endpoints.
+
+Typeahead asks for "t", "to", "tol", "tolk"... and each answer is a subset of the one
+before. Results are cached per (stage, scope, query) as (match text, value) pairs along
+with whether the list was complete (not cut off by a limit). A longer query that extends
+a cached complete prefix is answered by filtering that list, with no database scan or
+OpenLibrary call.
+
+Local stages are cleared whenever an Author, Work or Book is saved or deleted in this
+process; every entry also expires after OL_AUTOCOMPLETE_CACHE_TTL seconds, which bounds
+how stale another worker's changes can look.
+"""
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from ..models import Author, Book, Work
+import threading
+import time
+
+# Stages whose results come from our own tables
+LOCAL_STAGES = ('author_local', 'title_local')
+
+
+def _fold(text):
+    return ' '.join((text or '').split()).casefold()
+
+
+class PrefixCache:
+    def __init__(self, max_entries, max_items):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self._entries = OrderedDict()  # (stage, scope, query) -> (items, complete, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, stage, scope, query):
+        """
+        Cached [(match text, value)] for query, or None.
+
+        An exact entry is returned as is; otherwise the longest cached complete prefix of
+        query is filtered down to the items whose match text contains query, and the
+        narrowed list is cached under query in turn.
+        """
+        query = _fold(query)
+        now = time.monotonic()
+        with self._lock:
+            for length in range(len(query), 0, -1):
+                key = (stage, scope, query[:length])
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                items, complete, expires_at = entry
+                if now >= expires_at:
+                    del self._entries[key]
+                    continue
+                if length == len(query):
+                    self._entries.move_to_end(key)
+                    return items
+                if complete:
+                    narrowed = [(text, value) for text, value in items if query in text]
+                    self._store((stage, scope, query), narrowed, True, expires_at)
+                    return narrowed
+            return None
+
+    def set(self, stage, scope, query, items, complete):
+        """
+        Cache items for query; complete means no limit cut the list short.
+
+        Lists longer than max_items aren't kept (a one-letter query can match most of the
+        catalogue), so the next keystroke queries for itself.
+        """
+        items = [(_fold(text), value) for text, value in items]
+        if len(items) > self.max_items:
+            return
+        expires_at = time.monotonic() + getattr(settings, 'OL_AUTOCOMPLETE_CACHE_TTL', 60)
+        with self._lock:
+            self._store((stage, scope, _fold(query)), items, complete, expires_at)
+
+    def _store(self, key, items, complete, expires_at):
+        self._entries.pop(key, None)
+        self._entries[key] = (items, complete, expires_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, stages=None):
+        """Drop every entry, or only those of the given stages"""
+        with self._lock:
+            if stages is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] in stages]:
+                del self._entries[key]
+
+
+# Shared by every request in this worker process
+autocomplete_cache = PrefixCache(
+    max_entries=getattr(settings, 'OL_AUTOCOMPLETE_CACHE_MAX_ENTRIES', 500),
+    max_items=getattr(settings, 'OL_AUTOCOMPLETE_CACHE_MAX_ITEMS', 200),
+)
+
+
+def autocomplete_cache_enabled():
+    return getattr(settings, 'OL_AUTOCOMPLETE_CACHE', False)
+
+
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Work)
+@receiver([post_save, post_delete], sender=Book)
+def clear_local_autocomplete(sender, **kwargs):
+    """Local autocomplete results may have changed with the catalogue"""
+    autocomplete_cache.clear(LOCAL_STAGES)
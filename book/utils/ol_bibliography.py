@@ -0,0 +1,160 @@
+"""
+In-memory title index of an author's works, for title autocomplete.
+
+Once the title page is showing a chosen author, prefetch_bibliography() pages through
+/authors/{olid}/works.json in the background (through the cache, in the background
+rate-limit lane) and keeps the titles in process memory. bibliography_titles() then
+answers each keystroke from that index instead of a search.json round trip, as long as
+the index holds the author's whole bibliography and something in it matches.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections
+from ..models.ol_index import search_form
+from .ol_memory_cache import memory_cache
+from .ol_rate_limit import BACKGROUND, ol_priority
+from urllib.parse import urlencode
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BibliographyIndex:
+    """
+    Bounded LRU of author OLID -> [(title, search form of title, work OLID)].
+
+    Each entry records whether it is the author's complete bibliography or was cut short
+    at OL_BIBLIOGRAPHY_MAX_WORKS. Entries last OL_BIBLIOGRAPHY_TTL seconds and are
+    dropped when memory_cache is cleared, like the responses they were built from.
+    """
+
+    def __init__(self, max_authors):
+        self.max_authors = max_authors
+        # olid -> (titles, complete, expires_at, memory_cache generation)
+        self._entries = OrderedDict()
+        self._loading = set()
+        self._lock = threading.Lock()
+
+    def get(self, olid):
+        """(titles, complete) for the author, or None if not loaded (or expired)"""
+        with self._lock:
+            entry = self._entries.get(olid)
+            if entry is None:
+                return None
+            titles, complete, expires_at, generation = entry
+            if generation != memory_cache.generation or time.monotonic() >= expires_at:
+                del self._entries[olid]
+                return None
+            self._entries.move_to_end(olid)
+            return titles, complete
+
+    def set(self, olid, titles, complete=True):
+        with self._lock:
+            self._entries.pop(olid, None)
+            self._entries[olid] = (titles, complete,
+                                   time.monotonic() + getattr(settings, 'OL_BIBLIOGRAPHY_TTL', 60 * 60),
+                                   memory_cache.generation)
+            while len(self._entries) > self.max_authors:
+                self._entries.popitem(last=False)
+
+    def start_loading(self, olid):
+        """Claim olid for loading; False if it is loaded or already being loaded"""
+        with self._lock:
+            if olid in self._loading:
+                return False
+            self._loading.add(olid)
+        if self.get(olid) is not None:
+            self.finish_loading(olid)
+            return False
+        return True
+
+    def finish_loading(self, olid):
+        with self._lock:
+            self._loading.discard(olid)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every request in this worker process
+bibliographies = BibliographyIndex(max_authors=getattr(settings, 'OL_BIBLIOGRAPHY_MAX_AUTHORS', 50))
+
+_bibliography_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_BIBLIOGRAPHY_WORKERS', 2),
+    thread_name_prefix='ol-bibliography',
+)
+
+
+def load_bibliography(ol, olid):
+    """
+    Fetch every page of an author's works list and store its titles in the index.
+
+    Stops after OL_BIBLIOGRAPHY_MAX_WORKS works, storing what it has as incomplete.
+    Raises whatever the requests raise.
+    """
+    page_size = getattr(settings, 'OL_BIBLIOGRAPHY_PAGE_SIZE', 100)
+    max_works = getattr(settings, 'OL_BIBLIOGRAPHY_MAX_WORKS', 2000)
+    titles = []
+    offset = 0
+    complete = False
+    while offset < max_works:
+        query = urlencode({'limit': page_size, 'offset': offset})
+        page = ol.get_ol_response(f'/authors/{olid}/works.json?{query}').json()
+        entries = page.get('entries') or []
+        for entry in entries:
+            if entry.get('title') and entry.get('key'):
+                titles.append((entry['title'], search_form(entry['title']), entry['key'].rsplit('/', 1)[-1]))
+        offset += len(entries)
+        if not entries or offset >= page.get('size', 0):
+            complete = True
+            break
+    bibliographies.set(olid, titles, complete)
+    logger.info(f"Loaded {len(titles)} titles for author {olid}{'' if complete else ' (incomplete)'}")
+    return titles
+
+
+def _load_in_background(ol, olid):
+    try:
+        with ol_priority(BACKGROUND):
+            load_bibliography(ol, olid)
+    except Exception as e:
+        logger.info(f"Could not load the bibliography of {olid}: {e}")
+    finally:
+        bibliographies.finish_loading(olid)
+        # Pool threads are not request threads, so Django never closes their connection
+        connections.close_all()
+
+
+def prefetch_bibliography(ol, olid):
+    """Start loading olid's bibliography in the background unless it is loaded or loading"""
+    if not olid or not getattr(settings, 'OL_BIBLIOGRAPHY_PREFETCH', False):
+        return None
+    if not bibliographies.start_loading(olid):
+        return None
+    try:
+        return _bibliography_executor.submit(_load_in_background, ol, olid)
+    except RuntimeError:
+        bibliographies.finish_loading(olid)
+        return None
+
+
+def bibliography_titles(olid, q, limit=10):
+    """
+    Titles of olid's works matching q, titles starting with it first.
+
+    None if the bibliography isn't loaded, isn't complete or has no match, so the caller
+    can fall back to searching.
+    """
+    entry = bibliographies.get(olid)
+    if entry is None or not entry[1]:
+        return None
+    titles = entry[0]
+    q = search_form(q)
+    prefix = [title for title, form, _ in titles if form.startswith(q)]
+    contains = [title for title, form, _ in titles if q in form and not form.startswith(q)]
+    # Works lists repeat titles across translations and re-issues
+    return list(dict.fromkeys(prefix + contains))[:limit] or None
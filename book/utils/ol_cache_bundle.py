@@ -0,0 +1,163 @@
+"""
+Portable bundles of OpenLibraryCache entries, for seeding a new install's cache.
+
+A bundle is gzip-compressed JSON lines: a header line identifying the format, then one
+line per entry with its URL, response data, fetch time and lifetime. Both sides stream,
+so bundles of any size are written and read in bounded memory.
+
+Imported entries normally keep their fetch time and age as they would have where they
+were fetched. A bundle exported as a fixture (warm caches shipped with an install,
+benchmark data) is instead stamped as fetched when it is imported, so it arrives with its
+full lifetime whenever that is.
+"""
+from datetime import datetime
+from django.db import router, transaction
+from ..models import Author, OpenLibraryCache, Work
+from ..models.cache import cache_key
+from .ol_client import endpoint_type, is_negative_result
+from .ol_isbn import index_search_docs
+import gzip
+import json
+import re
+
+BUNDLE_FORMAT = 'libracents-ol-cache'
+BUNDLE_VERSION = 1
+
+OLID_IN_URL = re.compile(r'/(?:authors|works)/(OL\d+[AW])')
+
+
+class BundleError(Exception):
+    """The file is not a cache bundle this version can read"""
+
+
+def local_olids():
+    """OLIDs of the Works and Authors in the local catalogue, including authors' alternates"""
+    olids = set(Work.objects.exclude(olid='').values_list('olid', flat=True))
+    for olid, alternates in Author.objects.values_list('olid', 'alternate_olids'):
+        olids.add(olid)
+        olids.update(alternates or [])
+    return olids
+
+
+def _referenced_olids(url, data):
+    """OLIDs an entry is about: the one in its URL, or the works and authors in its results"""
+    match = OLID_IN_URL.search(url)
+    if match:
+        return {match.group(1)}
+    docs = data if isinstance(data, list) else data.get('docs', []) if isinstance(data, dict) else []
+    olids = set()
+    for doc in docs:
+        if isinstance(doc, dict):
+            olids.add(doc.get('key', '').rsplit('/', 1)[-1])
+            olids.update(doc.get('author_key') or [])
+    return olids
+
+
+def export_entries(fileobj, referenced_only=False, endpoints=None, include_expired=False, fixture=False):
+    """
+    Write matching cache entries to fileobj as a bundle; returns how many were written.
+
+    A fixture bundle's entries are stamped as fetched at import time by default.
+    """
+    olids = local_olids() if referenced_only else None
+    written = 0
+    with gzip.open(fileobj, 'wt', encoding='utf-8') as bundle:
+        bundle.write(json.dumps({'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION,
+                                 'exported': datetime.now().astimezone().isoformat(),
+                                 'fixture': fixture}) + '\n')
+        for entry in OpenLibraryCache.objects.order_by('pk').iterator(chunk_size=500):
+            if endpoints and endpoint_type(entry.request_url) not in endpoints:
+                continue
+            if not include_expired and not entry.is_valid:
+                continue
+            data = entry.response_data
+            # Misses say more about the exporting install than about OpenLibrary
+            if is_negative_result(data):
+                continue
+            if olids is not None and not (_referenced_olids(entry.request_url, data) & olids):
+                continue
+            bundle.write(json.dumps({
+                'url': entry.request_url,
+                'data': data,
+                'last_updated': entry.last_updated.isoformat(),
+                'cache_duration': entry.cache_duration,
+            }, separators=(',', ':')) + '\n')
+            written += 1
+    return written
+
+
+def _read_header(bundle):
+    try:
+        header = json.loads(bundle.readline() or '{}')
+    except (OSError, ValueError) as e:
+        raise BundleError(f'Not a cache bundle: {e}')
+    if header.get('format') != BUNDLE_FORMAT:
+        raise BundleError('Not a cache bundle')
+    if header.get('version', 0) > BUNDLE_VERSION:
+        raise BundleError(f"Bundle version {header['version']} is newer than this install supports")
+    return header
+
+
+def _read_entries(bundle):
+    for line in bundle:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _write_chunk(entries, replace, as_fresh):
+    by_key = {}
+    for entry in entries:
+        payload, original_size = OpenLibraryCache.encode_payload(entry['data'])
+        key = cache_key(entry['url'])
+        # Keyed so that two spellings of one URL in a chunk don't collide in a single INSERT
+        by_key[key] = OpenLibraryCache(
+            cache_key=key, request_url=entry['url'],
+            payload=payload, original_size=original_size,
+            cache_duration=entry['cache_duration'],
+        )
+    rows = list(by_key.values())
+    with transaction.atomic(using=router.db_for_write(OpenLibraryCache)):
+        if replace:
+            created = OpenLibraryCache.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['cache_key'],
+                update_fields=['request_url', 'payload', 'original_size', 'cache_duration', 'last_updated'])
+        else:
+            existing = set(OpenLibraryCache.objects.filter(pk__in=[row.pk for row in rows])
+                           .values_list('pk', flat=True))
+            created = OpenLibraryCache.objects.bulk_create(
+                [row for row in rows if row.pk not in existing], ignore_conflicts=True)
+        # last_updated is auto_now, so bulk_create stamped the rows with the import time;
+        # unless they are to count as fresh, put back when each entry was really fetched
+        # so it ages as it would have
+        if not as_fresh:
+            fetched = {cache_key(entry['url']): datetime.fromisoformat(entry['last_updated'])
+                       for entry in entries}
+            for row in created:
+                row.last_updated = fetched[row.pk]
+            OpenLibraryCache.objects.bulk_update(created, ['last_updated'])
+    index_search_docs((entry['url'], entry['data']) for entry in entries)
+    return len(created)
+
+
+def import_entries(fileobj, replace=False, chunk_size=500, as_fresh=None):
+    """
+    Bulk-insert the entries of a bundle; returns how many were written.
+
+    Entries already in the cache are kept unless replace is set. With as_fresh, entries
+    are stamped as fetched now instead of keeping their original fetch time; by default
+    that is done for fixture bundles only.
+    """
+    imported = 0
+    chunk = []
+    with gzip.open(fileobj, 'rt', encoding='utf-8') as bundle:
+        header = _read_header(bundle)
+        if as_fresh is None:
+            as_fresh = header.get('fixture', False)
+        for entry in _read_entries(bundle):
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                imported += _write_chunk(chunk, replace, as_fresh)
+                chunk = []
+    if chunk:
+        imported += _write_chunk(chunk, replace, as_fresh)
+    return imported
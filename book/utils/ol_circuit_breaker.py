@@ -0,0 +1,148 @@
+"""
+Circuit breaker in front of OpenLibrary.
+
+While OpenLibrary is failing (or throttling us with 429s and Retry-After), requests fail
+fast as OpenLibraryUnavailable instead of piling up behind timeouts; see CircuitBreaker
+for the states. One breaker is shared by every CachedOpenLibrary instance in the process.
+"""
+from collections import deque
+from datetime import datetime
+from django.conf import settings
+from email.utils import parsedate_to_datetime
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to OpenLibrary while it is failing.
+
+    CLOSED: requests flow; outcomes over the last `window_seconds` are tracked, and once
+    at least `min_requests` have been seen with a failure rate of `failure_rate` or more
+    the circuit opens. OPEN: requests fail fast for an open period that doubles with each
+    consecutive trip (capped at `max_open_seconds`, and never shorter than a Retry-After
+    header). HALF_OPEN: after the open period one probe request is let through; success
+    closes the circuit, failure re-opens it with a longer backoff.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_rate, min_requests, window_seconds, open_seconds, max_open_seconds):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic time, succeeded)
+        self._consecutive_trips = 0
+        self._probe_in_flight = False
+        self.state = self.CLOSED
+        self.open_until = 0
+
+    def allow_request(self):
+        """Return True if a request may go upstream now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self.open_until:
+                logger.info("OpenLibrary circuit half-open, sending probe request")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                logger.info("OpenLibrary circuit closed after successful probe")
+                self.state = self.CLOSED
+                self._consecutive_trips = 0
+                self._outcomes.clear()
+            self._probe_in_flight = False
+            self._record(True)
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                self._trip(retry_after)
+                return
+            self._record(False)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_requests and
+                    failures / len(self._outcomes) >= self.failure_rate):
+                self._trip(retry_after)
+            elif retry_after and self.state == self.CLOSED:
+                # Explicit throttling: respect it even before the failure rate trips us
+                self._trip(retry_after)
+
+    def release_probe(self):
+        """Forget a probe that ended without telling us anything about OpenLibrary"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            return {
+                'state': self.state,
+                'recent_requests': len(self._outcomes),
+                'recent_failures': failures,
+                'consecutive_trips': self._consecutive_trips,
+                'open_for_seconds': max(0, self.open_until - time.monotonic()),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._outcomes.clear()
+            self._consecutive_trips = 0
+            self._probe_in_flight = False
+            self.open_until = 0
+
+    def _record(self, succeeded):
+        now = time.monotonic()
+        self._outcomes.append((now, succeeded))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def _trip(self, retry_after=None):
+        open_seconds = min(self.open_seconds * 2 ** self._consecutive_trips, self.max_open_seconds)
+        if retry_after:
+            open_seconds = max(open_seconds, retry_after)
+        self._consecutive_trips += 1
+        self.state = self.OPEN
+        self.open_until = time.monotonic() + open_seconds
+        self._outcomes.clear()
+        logger.warning(f"OpenLibrary circuit opened for {open_seconds:.0f}s")
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now().astimezone()).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+# Shared by every CachedOpenLibrary instance in this worker process
+circuit_breaker = CircuitBreaker(
+    failure_rate=getattr(settings, 'OL_CIRCUIT_FAILURE_RATE', 0.5),
+    min_requests=getattr(settings, 'OL_CIRCUIT_MIN_REQUESTS', 5),
+    window_seconds=getattr(settings, 'OL_CIRCUIT_WINDOW_SECONDS', 60),
+    open_seconds=getattr(settings, 'OL_CIRCUIT_OPEN_SECONDS', 5),
+    max_open_seconds=getattr(settings, 'OL_CIRCUIT_MAX_OPEN_SECONDS', 300),
+)
@@ -1,64 +1,585 @@
 from olclient2.openlibrary import OpenLibrary
-from ..models.cache import OpenLibraryCache
+from django.conf import settings
+from django.db import connections
+from requests import RequestException, Response
+from requests.adapters import HTTPAdapter
+from ..models.cache import OpenLibraryCache, OpenLibraryFetchLease, canonical_url
+from .ol_circuit_breaker import CircuitBreaker, circuit_breaker, parse_retry_after
+from .ol_isbn import edition_search_doc, index_search_docs, indexed_search_doc, normalize_isbn, record_isbn_pair
+from .ol_isbn_batch import search_isbns
+from .ol_memory_cache import memory_cache
+from .ol_single_flight import SingleFlight
+from .ol_offline import resolve_offline
+from .ol_metrics import ol_metrics
+from .ol_write_buffer import write_buffer
+from .ol_hedge import hedge_budget, hedge_delay, hedged_call, hedging_enabled
+from .ol_rate_limit import BACKGROUND, INTERACTIVE, RateLimitTimeout, current_lane, ol_priority, rate_limiter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+import contextvars
 import json
 import logging
-from urllib.parse import urlencode
+import os
+import socket
+import threading
+import time
+import re
+from urllib.parse import urlencode, urlsplit
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+def endpoint_type(url):
+    """Classify an OpenLibrary URL into the endpoint families we cache and report on"""
+    parts = urlsplit(url)
+    path = parts.path
+    if path.startswith('/authors/_autocomplete'):
+        return 'author_autocomplete'
+    if re.match(r'^/authors/OL\d+A/works\.json', path):
+        return 'author_works'
+    if re.match(r'^/authors/OL\d+A\.json$', path):
+        return 'author'
+    if re.match(r'^/works/OL\d+W\.json$', path):
+        return 'work'
+    if path.startswith('/isbn/') or path.startswith('/books/'):
+        return 'edition'
+    if path == '/search.json':
+        return 'isbn_search' if 'isbn=' in parts.query else 'work_search'
+    return 'other'
+
+
+class OpenLibraryUnavailable(Exception):
+    """Raised instead of calling OpenLibrary while the circuit breaker is open"""
+
+
+# Upstream statuses worth remembering as "no such thing" (e.g. a bad ISBN)
+NEGATIVE_CACHE_STATUSES = (404, 410)
+
+# Key marking a cached payload as a remembered upstream error rather than real data
+NEGATIVE_CACHE_MARKER = '__ol_negative_status__'
+
+
+def is_negative_result(response_data):
+    """True for responses that carry no data: empty autocomplete lists, searches without docs"""
+    if isinstance(response_data, list):
+        return not response_data
+    if isinstance(response_data, dict):
+        return NEGATIVE_CACHE_MARKER in response_data or (
+            'docs' in response_data and not response_data['docs'])
+    return False
+
+
+def cache_ttl_hours(url, response_data=None):
+    """
+    How long (hours) to cache a response for url.
+
+    Negative results use OL_CACHE_NEGATIVE_TTL; otherwise the first OL_CACHE_TTL_POLICY
+    pattern that matches the URL wins, falling back to OL_CACHE_DEFAULT_TTL.
+    """
+    if response_data is not None and is_negative_result(response_data):
+        return getattr(settings, 'OL_CACHE_NEGATIVE_TTL', 1)
+    for pattern, hours in getattr(settings, 'OL_CACHE_TTL_POLICY', []):
+        if re.search(pattern, url):
+            return hours
+    return getattr(settings, 'OL_CACHE_DEFAULT_TTL', 24)
+
+
+# The search.json fields our views actually read; docs are requested and cached with only these.
+# author_alternative_name is what _author_name_matches checks pen names against.
+SEARCH_DOC_FIELDS = ('key', 'title', 'author_name', 'author_key', 'author_alternative_name', 'publisher',
+                     'first_publish_year', 'isbn')
+
+# Projection for the search.json request the parent library builds inside CachedWork.search
+_search_fields = contextvars.ContextVar('ol_search_fields', default=None)
+
+def project_search_fields(url, fields):
+    """Add a fields= projection to a search.json URL that doesn't already choose its fields"""
+    parts = urlsplit(url)
+    if not fields or parts.path != '/search.json' or 'fields=' in parts.query:
+        return url
+    if not getattr(settings, 'OL_SEARCH_FIELD_PROJECTION', True):
+        return url
+    separator = '&' if parts.query else '?'
+    return f"{url}{separator}{urlencode({'fields': ','.join(fields)})}"
+
+
+# Expiry times of the cached responses read inside track_expiry()
+_read_expiries = contextvars.ContextVar('ol_read_expiries', default=None)
+
+
+@contextmanager
+def track_expiry():
+    """
+    Collect when each OpenLibrary response read inside the block expires.
+
+    Yields a list that fills with aware datetimes; a stale or fallback read counts as
+    already expired. Threads started inside the block report too if they run in a copy
+    of its context (contextvars.copy_context().run).
+    """
+    expiries = []
+    token = _read_expiries.set(expiries)
+    try:
+        yield expiries
+    finally:
+        _read_expiries.reset(token)
+
+
+def _note_expiry(expires_at):
+    expiries = _read_expiries.get()
+    if expiries is not None:
+        expiries.append(expires_at)
+
+
+# Background pool for stale-while-revalidate refreshes
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_CACHE_REFRESH_WORKERS', 2),
+    thread_name_prefix='ol-cache-refresh',
+)
+_refreshing_urls = set()
+_refresh_lock = threading.Lock()
+
+# Background pool for speculative prefetches, see CachedOpenLibrary.prefetch
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_PREFETCH_WORKERS', 4),
+    thread_name_prefix='ol-prefetch',
+)
+_prefetching_urls = set()
+_prefetch_lock = threading.Lock()
+
+
+def max_staleness_hours():
+    """How long past expiry a cache entry may still be served (0 unless stale-while-revalidate is on)"""
+    if getattr(settings, 'OL_CACHE_STALE_WHILE_REVALIDATE', False):
+        return getattr(settings, 'OL_CACHE_MAX_STALENESS', 24 * 30)
+    return 0
+
+
+def sweep_cache():
+    """Prune expired OpenLibraryCache rows and evict down to the configured size limits"""
+    OpenLibraryCache.prune_expired(grace_hours=max_staleness_hours())
+    max_rows = getattr(settings, 'OL_CACHE_MAX_ROWS', None)
+    max_bytes = getattr(settings, 'OL_CACHE_MAX_BYTES', None)
+    if max_rows is not None or max_bytes is not None:
+        OpenLibraryCache.evict_to_limits(max_rows=max_rows, max_bytes=max_bytes)
+
+
+class CacheSweeper(threading.Thread):
+    """Daemon thread that runs sweep_cache() every `interval` seconds"""
+
+    def __init__(self, interval):
+        super().__init__(name='ol-cache-sweeper', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                sweep_cache()
+            except Exception as e:
+                logger.warning(f"Cache sweep failed: {e}")
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        self._stopped.set()
+
+
+_sweeper = None
+
+
+def start_cache_sweeper():
+    """Start the periodic sweeper once per process if OL_CACHE_SWEEP_INTERVAL is set"""
+    global _sweeper
+    interval = getattr(settings, 'OL_CACHE_SWEEP_INTERVAL', None)
+    if not interval or _sweeper is not None:
+        return
+    _sweeper = CacheSweeper(interval)
+    _sweeper.start()
+
+
+# In-process coalescing of identical upstream GETs
+_inflight = SingleFlight()
+
+# Identifies this process in OpenLibraryFetchLease rows
+_lease_holder = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _negative_response(url, status_code):
+    """Rebuild the error response for a remembered upstream failure"""
+    response = Response()
+    response.status_code = status_code
+    response.url = url
+    response.reason = 'Not Found (cached)'
+    response._content = b'{}'
+    return response
+
+
+def _serve_cached(url, data):
+    """Return cached data as a response, re-raising remembered upstream errors"""
+    if isinstance(data, dict) and NEGATIVE_CACHE_MARKER in data:
+        logger.debug(f"Negative cache hit for {url}")
+        _negative_response(url, data[NEGATIVE_CACHE_MARKER]).raise_for_status()
+    return _cached_response(data)
+
+
+def _cached_response(data):
+    """Wrap cached data in a minimal object that quacks like a requests.Response"""
+    text = json.dumps(data)
+    # Decode on every call: coalesced callers share this object and may mutate the result
+    return type('Response', (), {
+        'json': lambda: json.loads(text),
+        'raise_for_status': lambda: None,
+        'status_code': 200,
+        'text': text
+    })
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps a pool of keep-alive connections and applies a default timeout"""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
 class CachedOpenLibrary(OpenLibrary):
-    """OpenLibrary client with caching support"""
-    
+    """
+    OpenLibrary client with caching support
+
+    Calling CachedOpenLibrary() with no arguments returns the process-wide client,
+    so every view and WorkController share one pooled HTTP session and one set of
+    CachedWork/CachedAuthor classes. Passing arguments (e.g. a different base_url)
+    builds an independent client.
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if args or kwargs or cls is not CachedOpenLibrary:
+            return super().__new__(cls)
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = super().__new__(cls)
+            return cls._shared_instance
+
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._cached_work_class = self._create_cached_work()
-        self._cached_author_class = self._create_cached_author()
+        # __init__ runs on every CachedOpenLibrary() call, even when __new__ hands back
+        # the already-configured shared instance
+        with self._shared_lock:
+            if getattr(self, '_initialized', False):
+                return
+            super().__init__(*args, **kwargs)
+            self._mount_pooled_adapter()
+            self._cached_work_class = self._create_cached_work()
+            self._cached_author_class = self._create_cached_author()
+            self._initialized = True
+        start_cache_sweeper()
+
+    def _mount_pooled_adapter(self):
+        """Reuse keep-alive connections to OpenLibrary across requests and threads"""
+        pool_size = getattr(settings, 'OL_HTTP_POOL_SIZE', 10)
+        adapter = PooledHTTPAdapter(
+            timeout=getattr(settings, 'OL_HTTP_TIMEOUT', (3.05, 10)),
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def _make_request(self, url, method='get', **kwargs):
         """Make a request with caching support"""
-        # Try to get cached response for GET requests
+        # Try to get cached response for GET requests, memory first, then the database
         if method.lower() == 'get':
-            cached_response = OpenLibraryCache.get_cached_response(url)
-            if cached_response:
+            url = project_search_fields(url, _search_fields.get())
+            # Equivalent spellings of a URL share one cache entry and one in-flight fetch
+            url = canonical_url(url)
+            endpoint = endpoint_type(url)
+            cached_response, expires_at = memory_cache.get_with_expiry(url)
+            if cached_response is not None:
+                logger.debug(f"Memory cache hit for {url}")
+                _note_expiry(expires_at)
+                ol_metrics.record_lookup(endpoint, 'memory')
+                return _serve_cached(url, cached_response)
+
+            # Fetched already, but still waiting in the write-behind buffer
+            cached_response = write_buffer.get(url)
+            if cached_response is not None:
+                _note_expiry(datetime.now().astimezone() + timedelta(hours=cache_ttl_hours(url, cached_response)))
+                ol_metrics.record_lookup(endpoint, 'memory')
+                return _serve_cached(url, cached_response)
+
+            # An expired entry is kept: it is what we serve if the refetch fails
+            cache_entry = OpenLibraryCache.get_cached_entry(url, max_stale=max_staleness_hours(),
+                                                            delete_expired=False)
+            if cache_entry:
+                cached_response = cache_entry.response_data
+                _note_expiry(cache_entry.expires_at)
+                if not cache_entry.is_valid:
+                    logger.debug(f"Serving stale cache entry for {url}, refreshing in background")
+                    self._schedule_refresh(url)
+                    ol_metrics.record_lookup(endpoint, 'stale')
+                    return _serve_cached(url, cached_response)
                 logger.debug(f"Cache hit for {url}")
                 logger.info("Cached response data: %s", cached_response)
-                return type('Response', (), {
-                    'json': lambda: cached_response,
-                    'raise_for_status': lambda: None,
-                    'status_code': 200,
-                    'text': json.dumps(cached_response)
-                })
+                memory_cache.set(url, cached_response, cache_entry.expires_at)
+                ol_metrics.record_lookup(endpoint, 'database')
+                return _serve_cached(url, cached_response)
+
+            if getattr(settings, 'OL_OFFLINE_RESOLVER', False) or getattr(settings, 'OL_OFFLINE_ONLY', False):
+                offline_data = resolve_offline(url)
+                if offline_data is not None:
+                    logger.debug(f"Offline index hit for {url}")
+                    ol_metrics.record_lookup(endpoint, 'offline')
+                    return _cached_response(offline_data)
+                if getattr(settings, 'OL_OFFLINE_ONLY', False):
+                    ol_metrics.record_lookup(endpoint, 'error')
+                    raise OpenLibraryUnavailable(f"{url} is not in the offline index")
         
         # Make the actual request
         try:
+            if method.lower() == 'get':
+                # Concurrent callers for the same URL share a single upstream request
+                response, shared = _inflight.do(url, lambda: self._fetch_and_cache(url, **kwargs))
+                if shared:
+                    logger.debug(f"Coalesced with in-flight request for {url}")
+                    # The leader noted the expiry in its own context
+                    _note_expiry(datetime.now().astimezone() + timedelta(hours=cache_ttl_hours(url)))
+                ol_metrics.record_lookup(endpoint, 'coalesced' if shared else 'network')
+                return response
+
             response = getattr(self.session, method.lower())(url, **kwargs)
             response.raise_for_status()
-            
-            # Cache successful GET responses
-            if method.lower() == 'get' and response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    logger.info("Raw response data before caching: %s", response_data)
-                    OpenLibraryCache.cache_response(url, response_data)
-                    logger.debug(f"Cached response for {url}")
-                except Exception as e:
-                    logger.warning(f"Failed to cache response for {url}: {e}")
-            
             return response
         except Exception as e:
             # If request fails, try to return cached version if available
             if method.lower() == 'get':
-                cached_response = OpenLibraryCache.get_cached_response(url)
-                if cached_response:
+                cached_response = OpenLibraryCache.get_last_response(url)
+                if cached_response and NEGATIVE_CACHE_MARKER not in cached_response:
                     logger.info(f"Request failed, using cached response for {url}")
-                    return type('Response', (), {
-                        'json': lambda: cached_response,
-                        'raise_for_status': lambda: None,
-                        'status_code': 200,
-                        'text': json.dumps(cached_response)
-                    })
+                    _note_expiry(datetime.now().astimezone())
+                    ol_metrics.record_lookup(endpoint, 'fallback')
+                    return _cached_response(cached_response)
+                ol_metrics.record_lookup(endpoint, 'error')
+            raise
+
+    def _fetch_and_cache(self, url, **kwargs):
+        """GET url upstream and cache the result, deferring to another process's fetch if leased"""
+        lease_held = False
+        if getattr(settings, 'OL_CACHE_FETCH_LEASES', False):
+            lease_seconds = getattr(settings, 'OL_CACHE_FETCH_LEASE_SECONDS', 10)
+            lease_held = OpenLibraryFetchLease.acquire(url, _lease_holder, lease_seconds)
+            if not lease_held:
+                cached_response = self._wait_for_leased_fetch(url, lease_seconds)
+                if cached_response is not None:
+                    return _serve_cached(url, cached_response)
+                logger.info(f"Leased fetch of {url} did not finish in time, fetching ourselves")
+
+        try:
+            response = self._guarded_get(url, **kwargs)
+            if response.status_code in NEGATIVE_CACHE_STATUSES:
+                self.cache_data(url, {NEGATIVE_CACHE_MARKER: response.status_code})
+            response.raise_for_status()
+            if response.status_code == 200:
+                self._cache_successful_response(url, response)
+            return response
+        finally:
+            if lease_held:
+                OpenLibraryFetchLease.release(url, _lease_holder)
+
+    def _guarded_get(self, url, **kwargs):
+        """
+        session.get through the circuit breaker and the shared rate limiter.
+
+        Fails fast while the circuit is open, waits for a token in the current
+        ol_priority lane, then records the outcome.
+        """
+        if not circuit_breaker.allow_request():
+            raise OpenLibraryUnavailable(f"OpenLibrary is unavailable, not requesting {url}")
+        try:
+            rate_limiter.acquire()
+        except RateLimitTimeout as e:
+            circuit_breaker.release_probe()
+            raise OpenLibraryUnavailable(str(e)) from e
+        try:
+            response = self._send_get(url, **kwargs)
+        except RequestException:
+            circuit_breaker.record_failure()
             raise
+        except BaseException:
+            # Tells us nothing about OpenLibrary, but don't leave a half-open probe dangling
+            circuit_breaker.release_probe()
+            raise
+        if response.status_code == 429 or response.status_code >= 500:
+            circuit_breaker.record_failure(parse_retry_after(response.headers.get('Retry-After')))
+        else:
+            circuit_breaker.record_success()
+        return response
+
+    def _send_get(self, url, **kwargs):
+        """
+        session.get, hedged when OL_HEDGED_REQUESTS is on.
+
+        Only interactive requests on a closed circuit are hedged; a hedge also needs a
+        free rate-limit token and room in the hedge budget, or the original is awaited.
+        """
+        if not hedging_enabled() or current_lane() != INTERACTIVE or circuit_breaker.state != CircuitBreaker.CLOSED:
+            return self._timed_get(url, **kwargs)
+
+        def may_hedge():
+            if not hedge_budget.try_spend():
+                return False
+            try:
+                rate_limiter.acquire(INTERACTIVE, timeout=0)
+            except RateLimitTimeout:
+                hedge_budget.refund()
+                return False
+            return True
+
+        endpoint = endpoint_type(url)
+        hedge_budget.earn()
+        response, hedged, hedge_won = hedged_call(
+            lambda: self._timed_get(url, **kwargs), hedge_delay(endpoint), may_hedge)
+        if hedged:
+            logger.debug(f"Hedged slow request for {url}{' (hedge answered first)' if hedge_won else ''}")
+            ol_metrics.record_hedge(endpoint, hedge_won)
+        return response
+
+    def _timed_get(self, url, **kwargs):
+        """One upstream session.get, with its latency and status recorded in ol_metrics"""
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, **kwargs)
+        except RequestException:
+            ol_metrics.record_upstream(endpoint_type(url), time.monotonic() - started, 'error')
+            raise
+        ol_metrics.record_upstream(endpoint_type(url), time.monotonic() - started, response.status_code)
+        return response
+
+    def _wait_for_leased_fetch(self, url, timeout):
+        """Poll the cache table while another process fetches url"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.1)
+            cache_entry = OpenLibraryCache.get_cached_entry(url)
+            if cache_entry:
+                memory_cache.set(url, cache_entry.response_data, cache_entry.expires_at)
+                _note_expiry(cache_entry.expires_at)
+                return cache_entry.response_data
+        return None
+
+    def _cache_successful_response(self, url, response):
+        """Store a successful GET response in the database and memory tiers"""
+        try:
+            response_data = response.json()
+            logger.info("Raw response data before caching: %s", response_data)
+            self.cache_data(url, response_data)
+        except Exception as e:
+            logger.warning(f"Failed to cache response for {url}: {e}")
+
+    def cache_data(self, url, response_data):
+        """
+        Write response data to both cache tiers with the TTL policy for its endpoint.
+
+        With OL_CACHE_WRITE_BEHIND the database write is queued rather than made here.
+        Search responses also feed the local ISBN index (ol_isbn.index_search_docs).
+        """
+        duration = cache_ttl_hours(url, response_data)
+        _note_expiry(datetime.now().astimezone() + timedelta(hours=duration))
+        if write_buffer.enabled():
+            write_buffer.enqueue(url, response_data, duration)
+        else:
+            OpenLibraryCache.cache_response(url, response_data, duration=duration)
+            index_search_docs([(url, response_data)])
+        memory_cache.set(url, response_data,
+                         datetime.now().astimezone() + timedelta(hours=duration))
+        logger.debug(f"Cached response for {url} for {duration} hours")
+
+    def _schedule_refresh(self, url):
+        """Refetch a stale cache entry on the background pool, at most once per URL at a time"""
+        with _refresh_lock:
+            if url in _refreshing_urls:
+                return
+            _refreshing_urls.add(url)
+        try:
+            _refresh_executor.submit(self._refresh, url)
+        except RuntimeError:
+            # Executor is shutting down with the process; the next reader refreshes instead
+            with _refresh_lock:
+                _refreshing_urls.discard(url)
+
+    def _refresh(self, url):
+        """Background task: fetch url and overwrite its cache entry"""
+        try:
+            with ol_priority(BACKGROUND):
+                _inflight.do(url, lambda: self._fetch_and_cache(url))
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {url}: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing_urls.discard(url)
+            # Pool threads are not request threads, so Django never closes their connection
+            connections.close_all()
+
+    def prefetch(self, paths):
+        """
+        Warm the cache for OpenLibrary paths (e.g. '/works/OL1W.json') in the background.
+
+        For requests we can predict, like the record fetches of the confirmation step once
+        candidates are on screen. Fetches run in the background lane; a real request for
+        the same URL that arrives mid-fetch joins it rather than fetching again. Returns
+        the futures of the fetches started (none with OL_PREFETCH off).
+        """
+        if not getattr(settings, 'OL_PREFETCH', False):
+            return []
+        futures = []
+        for path in dict.fromkeys(paths):
+            url = canonical_url(self.base_url + path)
+            with _prefetch_lock:
+                if url in _prefetching_urls:
+                    continue
+                _prefetching_urls.add(url)
+            try:
+                futures.append(_prefetch_executor.submit(self._prefetch, url))
+            except RuntimeError:
+                with _prefetch_lock:
+                    _prefetching_urls.discard(url)
+        return futures
+
+    def prefetch_records(self, work_olids=(), author_olids=()):
+        """Prefetch the work and author records WorkController reads when a book is confirmed"""
+        return self.prefetch([f'/works/{olid}.json' for olid in work_olids if olid] +
+                             [f'/authors/{olid}.json' for olid in author_olids if olid])
+
+    def _prefetch(self, url):
+        """Background task: GET url through the cache tiers, discarding the response"""
+        try:
+            with ol_priority(BACKGROUND):
+                self._make_request(url)
+        except Exception as e:
+            logger.info(f"Prefetch of {url} failed: {e}")
+        finally:
+            with _prefetch_lock:
+                _prefetching_urls.discard(url)
+            connections.close_all()
+
+    def search_doc_url(self, query):
+        """The search.json URL for an encoded query, asking only for SEARCH_DOC_FIELDS"""
+        return canonical_url(project_search_fields(f"{self.base_url}/search.json?{query}", SEARCH_DOC_FIELDS))
+
+    def isbn_search_url(self, isbn):
+        """The search.json URL search_by_isbn falls back to for a normalized isbn"""
+        return self.search_doc_url(f'isbn={isbn}')
+
+    def search_doc_response(self, query):
+        """GET search_doc_url(query) through the cache tiers"""
+        return self._make_request(self.search_doc_url(query))
 
     def _create_cached_work(self):
         """Create a cached version of the Work class"""
@@ -67,9 +588,15 @@ class CachedOpenLibrary(OpenLibrary):
         
         class CachedWork(original_work):
             @classmethod
-            def search(cls, **kwargs):
-                """Search for works with caching support"""
+            def search(cls, fields=SEARCH_DOC_FIELDS, **kwargs):
+                """
+                Search for works with caching support.
+
+                Only the given search.json fields are requested and cached; pass
+                fields=None for full documents.
+                """
                 logger.debug(f"Searching OpenLibrary with exact kwargs: {kwargs}")
+                token = _search_fields.set(fields)
                 try:
                     # Use parent's search which will use our cached _make_request
                     results = super().search(**kwargs)
@@ -83,15 +610,39 @@ class CachedOpenLibrary(OpenLibrary):
                 except Exception as e:
                     logger.error(f"Search failed: {e}")
                     raise
+                finally:
+                    _search_fields.reset(token)
 
             @classmethod
             def search_by_isbn(cls, isbn):
-                """Search for a work using an ISBN with caching support"""
-                # Clean ISBN
-                isbn = isbn.replace('-', '').strip()
+                """
+                Look up the work for an ISBN with caching support.
+
+                Answers from the local ISBN index when it can, then goes through the
+                compact edition record (see ol_isbn) and only falls back to search.json
+                when that fails.
+                """
+                isbn = normalize_isbn(isbn)
+
+                # Another edition of a work we have already seen in a search
+                doc = indexed_search_doc(isbn)
+                if doc:
+                    logger.debug(f"ISBN {isbn} resolved from the local index")
+                    ol_metrics.record_lookup('isbn_search', 'database')
+                    return cls._work_from_doc(doc)
+
+                if getattr(settings, 'OL_ISBN_EDITION_LOOKUP', True):
+                    try:
+                        doc = edition_search_doc(ol_instance, isbn)
+                    except Exception as e:
+                        logger.info(f"Edition lookup for ISBN {isbn} failed, falling back to search: {e}")
+                        doc = None
+                    if doc:
+                        record_isbn_pair(isbn, doc)
+                        return cls._work_from_doc(doc)
                 
                 # Use search API with ISBN
-                url = f"{ol_instance.base_url}/search.json?isbn={isbn}"
+                url = ol_instance.isbn_search_url(isbn)
                 
                 logger.debug(f"Making cached ISBN search request to {url}")
                 try:
@@ -102,35 +653,51 @@ class CachedOpenLibrary(OpenLibrary):
                         return None
                         
                     # Get first matching work
-                    doc = data['docs'][0]
-                    
-                    # Create Work object
-                    work = cls(doc['key'].split('/')[-1])
-                    work.title = doc['title']
-                    work.publish_date = doc.get('first_publish_year')
-                    work.publisher = doc.get('publisher', [''])[0] if doc.get('publisher') else ''
-                    
-                    # Create author objects as dictionaries with name and optional olid
-                    work.authors = []
-                    for i, name in enumerate(doc.get('author_name', [])):
-                        author = {'name': name}
-                        if 'author_key' in doc and i < len(doc['author_key']):
-                            author['olid'] = doc['author_key'][i]
-                        work.authors.append(author)
-                        
-                    # Add identifiers
-                    work.identifiers = {'olid': [doc['key'].split('/')[-1]]}
-                    if 'isbn' in doc:
-                        for isbn in doc['isbn']:
-                            key = 'isbn_13' if len(isbn) == 13 else 'isbn_10'
-                            if key not in work.identifiers:
-                                work.identifiers[key] = []
-                            work.identifiers[key].append(isbn)
-                    
-                    return work
+                    return cls._work_from_doc(data['docs'][0])
                 except Exception as e:
                     logger.error(f"ISBN search failed: {e}")
                     raise
+
+            @classmethod
+            def search_by_isbns(cls, isbns):
+                """
+                Look up the works for many ISBNs at once; returns {isbn: Work or None}.
+
+                Malformed ISBNs, or ones with a wrong check digit, are None without a
+                lookup; see ol_isbn_batch for how the rest are found. Keys are the ISBNs
+                as passed. Raises whatever a failed query raises.
+                """
+                wanted = {isbn: normalize_isbn(isbn) for isbn in isbns}
+                docs = search_isbns(ol_instance, wanted.values())
+                return {isbn: cls._work_from_doc(docs[normalized]) if normalized in docs else None
+                        for isbn, normalized in wanted.items()}
+
+            @classmethod
+            def _work_from_doc(cls, doc):
+                """Build a Work from a search.json doc"""
+                work = cls(doc['key'].split('/')[-1])
+                work.title = doc['title']
+                work.publish_date = doc.get('first_publish_year')
+                work.publisher = doc.get('publisher', [''])[0] if doc.get('publisher') else ''
+                
+                # Create author objects as dictionaries with name and optional olid
+                work.authors = []
+                for i, name in enumerate(doc.get('author_name', [])):
+                    author = {'name': name}
+                    if 'author_key' in doc and i < len(doc['author_key']):
+                        author['olid'] = doc['author_key'][i]
+                    work.authors.append(author)
+                    
+                # Add identifiers
+                work.identifiers = {'olid': [doc['key'].split('/')[-1]]}
+                if 'isbn' in doc:
+                    for isbn in doc['isbn']:
+                        key = 'isbn_13' if len(isbn) == 13 else 'isbn_10'
+                        if key not in work.identifiers:
+                            work.identifiers[key] = []
+                        work.identifiers[key].append(isbn)
+                
+                return work
         
         return CachedWork
 
@@ -143,7 +710,8 @@ class CachedOpenLibrary(OpenLibrary):
             @classmethod
             def search(cls, q, limit=5):
                 """Search for authors with caching support"""
-                url = f"{ol_instance.base_url}/authors/_autocomplete?q={q}&limit={limit}"
+                query = urlencode({'q': q, 'limit': limit})
+                url = f"{ol_instance.base_url}/authors/_autocomplete?{query}"
                 
                 logger.debug(f"Making cached author search request to {url}")
                 try:
@@ -0,0 +1,110 @@
+"""
+Hedged GETs to cut OpenLibrary's slow tail.
+
+With OL_HEDGED_REQUESTS on, an interactive GET that hasn't answered by its endpoint's
+observed p90 latency gets a second, identical request, and whichever answers first wins.
+Hedges are paid for out of a budget that earns OL_HEDGE_BUDGET_RATIO of a hedge per
+request sent, so they add at most that fraction to upstream traffic (and the ratio is
+capped at 1, so hedging never more than doubles it).
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from django.conf import settings
+from .ol_metrics import ol_metrics
+import threading
+
+
+class HedgeBudget:
+    """Earns `ratio` of a hedge per primary request, saving up at most `burst`; each hedge spends one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._credit = 0.0
+            self.primaries = 0
+            self.hedges = 0
+
+    def earn(self):
+        ratio = min(max(getattr(settings, 'OL_HEDGE_BUDGET_RATIO', 0.1), 0.0), 1.0)
+        burst = getattr(settings, 'OL_HEDGE_BUDGET_BURST', 5)
+        with self._lock:
+            self.primaries += 1
+            self._credit = min(self._credit + ratio, burst)
+
+    def try_spend(self):
+        """Take one hedge from the budget; False if it can't afford one"""
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            self.hedges += 1
+            return True
+
+    def refund(self):
+        """Give back a hedge that was paid for but not sent"""
+        with self._lock:
+            self._credit += 1
+            self.hedges -= 1
+
+
+# Shared by every CachedOpenLibrary instance in this worker process
+hedge_budget = HedgeBudget()
+
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_HEDGE_WORKERS', 16),
+    thread_name_prefix='ol-hedge',
+)
+
+
+def hedging_enabled():
+    return getattr(settings, 'OL_HEDGED_REQUESTS', False)
+
+
+def hedge_delay(endpoint):
+    """
+    Seconds to give a request to endpoint before hedging it.
+
+    The OL_HEDGE_QUANTILE of its upstream latency once OL_HEDGE_MIN_SAMPLES requests have
+    been timed (to histogram bucket resolution), OL_HEDGE_DEFAULT_DELAY until then.
+    """
+    delay = ol_metrics.latency_quantile(
+        endpoint,
+        getattr(settings, 'OL_HEDGE_QUANTILE', 0.9),
+        min_count=getattr(settings, 'OL_HEDGE_MIN_SAMPLES', 20),
+    )
+    if delay is None:
+        delay = getattr(settings, 'OL_HEDGE_DEFAULT_DELAY', 1.0)
+    return max(delay, getattr(settings, 'OL_HEDGE_MIN_DELAY', 0.05))
+
+
+def hedged_call(send, delay, may_hedge):
+    """
+    Run send(), and a second send() if the first hasn't returned after delay seconds and
+    may_hedge() agrees; return the result of whichever finishes first.
+
+    An attempt that raises only loses to one that succeeds: if both fail, the first
+    failure is raised. The slower attempt is left to finish in the background.
+    Returns (result, hedged, hedge_won).
+    """
+    primary = _hedge_executor.submit(send)
+    try:
+        return primary.result(timeout=delay), False, False
+    except TimeoutError:
+        pass
+    if not may_hedge():
+        return primary.result(), False, False
+
+    hedge = _hedge_executor.submit(send)
+    pending = {primary, hedge}
+    failed = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in (primary, hedge):
+            if future not in done:
+                continue
+            if future.exception() is None:
+                return future.result(), True, future is hedge
+            failed = failed or future
+    return failed.result(), True, False
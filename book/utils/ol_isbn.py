@@ -0,0 +1,274 @@
+"""
+ISBN helpers, the edition-record route for ISBN lookups and the local ISBN index.
+
+/isbn/{isbn}.json returns one small edition record; following its works key to the work
+record (and that to its authors) gives everything search_by_isbn needs, in a fraction of
+the bytes of a search.json response. Every ISBN-10/13 pair resolved this way is remembered
+in OLIndexEdition.
+
+Search responses feed the same lookup: each search.json doc lists the ISBNs of every
+edition of its work, so caching one maps all of them to the work in OLIndexSearchIsbn
+(and keeps the doc in OLIndexSearchDoc), and a later scan of another edition resolves
+without the network.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, router, transaction
+from ..models.cache import OpenLibraryCache
+from ..models.ol_index import OLIndexEdition, OLIndexSearchDoc, OLIndexSearchIsbn
+from urllib.parse import urlsplit
+import contextvars
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Fetches the author records of a multi-author work at once, see edition_search_doc
+_author_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_ISBN_AUTHOR_WORKERS', 4),
+    thread_name_prefix='ol-isbn-author',
+)
+
+# One writer, so deferred index writes never contend with each other, see record_isbn_pair
+_index_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ol-isbn-index')
+
+
+def normalize_isbn(isbn):
+    """Digits (and a trailing X) only, uppercased"""
+    return re.sub(r'[^0-9X]', '', (isbn or '').upper())
+
+
+ISBN10_FORMAT = re.compile(r'\d{9}[\dX]')
+ISBN13_FORMAT = re.compile(r'\d{13}')
+
+
+def is_valid_isbn(isbn):
+    """Whether a normalized isbn is a well-formed ISBN-10 or ISBN-13 with the right check digit"""
+    if ISBN10_FORMAT.fullmatch(isbn):
+        return sum((10 if d == 'X' else int(d)) * (10 - i) for i, d in enumerate(isbn)) % 11 == 0
+    if ISBN13_FORMAT.fullmatch(isbn):
+        return sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(isbn)) % 10 == 0
+    return False
+
+
+def isbn10_to_13(isbn10):
+    digits = '978' + isbn10[:9]
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+
+def isbn13_to_10(isbn13):
+    """The ISBN-10 form of a 978- ISBN-13, or None (979- ISBNs have no ISBN-10)"""
+    if not isbn13.startswith('978'):
+        return None
+    digits = isbn13[3:12]
+    check = (11 - sum(int(d) * (10 - i) for i, d in enumerate(digits)) % 11) % 11
+    return digits + ('X' if check == 10 else str(check))
+
+
+def isbn_forms(isbn):
+    """Both the ISBN-10 and ISBN-13 forms of isbn, where they exist (just isbn if it is malformed)"""
+    isbn = normalize_isbn(isbn)
+    if ISBN10_FORMAT.fullmatch(isbn):
+        return {isbn, isbn10_to_13(isbn)}
+    if ISBN13_FORMAT.fullmatch(isbn):
+        return {isbn, isbn13_to_10(isbn)} - {None}
+    return {isbn} if isbn else set()
+
+
+def _olid(key):
+    return key.rsplit('/', 1)[-1]
+
+
+def _fetch_author(ol, key):
+    try:
+        return ol.Author.get(_olid(key))
+    except Exception as e:
+        logger.info(f"Skipping author {key}: {e}")
+        return {}
+
+
+def _fetch_author_pooled(ol, key):
+    try:
+        return _fetch_author(ol, key)
+    finally:
+        # Pool threads are not request threads, so Django never closes their connection
+        connections.close_all()
+
+
+def edition_search_doc(ol, isbn):
+    """
+    Resolve isbn through its edition record into a search.json-style doc, or None.
+
+    ol is the CachedOpenLibrary instance; every record is fetched through its cache.
+    Raises whatever the requests raise (a 404 for unknown ISBNs, for one).
+    """
+    edition = ol.get_ol_response(f'/isbn/{isbn}.json').json()
+    works = edition.get('works') or []
+    if not works or not works[0].get('key'):
+        return None
+    work_olid = _olid(works[0]['key'])
+    work = ol.get_ol_response(f'/works/{work_olid}.json').json()
+
+    author_keys = [(credit.get('author') or {}).get('key') or credit.get('key')
+                   for credit in work.get('authors', [])]
+    if not any(author_keys):
+        author_keys = [author.get('key') for author in edition.get('authors', [])]
+    author_keys = list(dict.fromkeys(filter(None, author_keys)))
+    if len(author_keys) > 1:
+        # Each fetch runs in a copy of this context, so it keeps the caller's priority lane
+        futures = [_author_executor.submit(contextvars.copy_context().run, _fetch_author_pooled, ol, key)
+                   for key in author_keys]
+        authors = [future.result() for future in futures]
+    else:
+        authors = [_fetch_author(ol, key) for key in author_keys]
+    names, olids = [], []
+    for key, author in zip(author_keys, authors):
+        if author.get('name'):
+            names.append(author['name'])
+            olids.append(_olid(key))
+
+    year = re.search(r'\d{4}', work.get('first_publish_date') or edition.get('publish_date') or '')
+    isbns = [normalize_isbn(value) for value in edition.get('isbn_13', []) + edition.get('isbn_10', [])]
+    return {
+        'key': f'/works/{work_olid}',
+        'title': work.get('title') or edition.get('title', ''),
+        'author_name': names,
+        'author_key': olids,
+        'publisher': (edition.get('publishers') or [])[:1],
+        'first_publish_year': int(year.group()) if year else None,
+        'isbn': isbns or [normalize_isbn(isbn)],
+        'edition_key': [_olid(edition.get('key', ''))] if edition.get('key') else [],
+        'publish_date': edition.get('publish_date', ''),
+    }
+
+
+def isbn_index_enabled():
+    return getattr(settings, 'OL_ISBN_INDEX', False)
+
+
+def _doc_row(doc):
+    """An OLIndexSearchDoc for a search doc, less its (often long) isbn list"""
+    payload, _ = OpenLibraryCache.encode_payload({k: v for k, v in doc.items() if k != 'isbn'})
+    return OLIndexSearchDoc(olid=_olid(doc['key']), doc=payload)
+
+
+def _save_docs(rows):
+    OLIndexSearchDoc.objects.bulk_create(rows, update_conflicts=True, unique_fields=['olid'],
+                                         update_fields=['doc', 'updated'], batch_size=500)
+
+
+def index_search_docs(entries):
+    """
+    Map the ISBNs in cached search.json responses to their works.
+
+    entries are (url, response data) pairs, as they are written to OpenLibraryCache;
+    anything that isn't a search with docs is skipped. The mappings go to
+    OLIndexSearchIsbn; an ISBN's OLIndexEdition row, if it has one, is still preferred
+    on lookup since it says more. Returns how many ISBN forms were offered to the index.
+    """
+    if not isbn_index_enabled():
+        return 0
+    isbns, docs = {}, {}
+    for url, data in entries:
+        if urlsplit(url).path != '/search.json' or not isinstance(data, dict):
+            continue
+        for doc in data.get('docs') or []:
+            if not isinstance(doc, dict) or not doc.get('key', '').startswith('/works/') or not doc.get('isbn'):
+                continue
+            work_olid = _olid(doc['key'])
+            docs[work_olid] = _doc_row(doc)
+            for isbn in doc['isbn']:
+                for form in isbn_forms(isbn):
+                    if len(form) in (10, 13):
+                        isbns.setdefault(form, OLIndexSearchIsbn(isbn=form, work_olid=work_olid))
+    if not isbns:
+        return 0
+    try:
+        with transaction.atomic(using=router.db_for_write(OLIndexSearchIsbn)):
+            _save_search_isbns(list(isbns.values()))
+            _save_docs(list(docs.values()))
+    except Exception as e:
+        logger.error(f"Failed to index ISBNs of {len(docs)} works: {e}")
+        return 0
+    return len(isbns)
+
+
+def _save_search_isbns(rows):
+    # The newest search wins, e.g. after OpenLibrary merges a work into another
+    OLIndexSearchIsbn.objects.bulk_create(rows, update_conflicts=True, unique_fields=['isbn'],
+                                          update_fields=['work_olid'], batch_size=500)
+
+
+def indexed_search_docs(isbns):
+    """{isbn: search doc of its work} for each of isbns the local index knows, in three queries"""
+    if not isbn_index_enabled():
+        return {}
+    isbns = {normalize_isbn(isbn) for isbn in isbns} - {''}
+    # isbn -> (work olid, publisher); an edition row knows the publisher, a search doc row doesn't
+    works = {isbn: (row.work_olid, '') for isbn, row in OLIndexSearchIsbn.objects.in_bulk(isbns).items()}
+    works.update({isbn: (row.work_olid, row.publisher) for isbn, row in OLIndexEdition.objects.in_bulk(isbns).items()})
+    rows = OLIndexSearchDoc.objects.in_bulk({work_olid for work_olid, _ in works.values()})
+    docs = {}
+    for isbn, (work_olid, publisher) in works.items():
+        row = rows.get(work_olid)
+        if not row:
+            continue
+        doc = row.doc_data
+        doc['isbn'] = sorted(isbn_forms(isbn))
+        if publisher:
+            doc['publisher'] = [publisher]
+        docs[isbn] = doc
+    return docs
+
+
+def indexed_search_doc(isbn):
+    """The search doc of the work isbn belongs to, from the local index, or None"""
+    return indexed_search_docs([isbn]).get(normalize_isbn(isbn))
+
+
+def record_isbn_pair(isbn, doc):
+    """
+    Remember every ISBN form of a resolved edition against its work in OLIndexEdition
+    (OLIndexSearchIsbn if the edition record had no key to group them by).
+
+    With OL_CACHE_WRITE_BEHIND on the write is left to a background thread and its
+    future returned; otherwise it is done before returning None.
+    """
+    if getattr(settings, 'OL_CACHE_WRITE_BEHIND', False):
+        try:
+            return _index_writer.submit(_record_isbn_pair_pooled, isbn, doc)
+        except RuntimeError:
+            pass  # Interpreter shutting down
+    _record_isbn_pair(isbn, doc)
+
+
+def _record_isbn_pair_pooled(isbn, doc):
+    try:
+        _record_isbn_pair(isbn, doc)
+    finally:
+        connections.close_all()
+
+
+def _record_isbn_pair(isbn, doc):
+    forms = set()
+    for value in [isbn] + doc.get('isbn', []):
+        forms |= isbn_forms(value)
+    edition_olid = (doc.get('edition_key') or [''])[0]
+    work_olid = _olid(doc['key'])
+    try:
+        with transaction.atomic(using=router.db_for_write(OLIndexEdition)):
+            if edition_olid:
+                OLIndexEdition.objects.bulk_create(
+                    [OLIndexEdition(isbn=form, edition_olid=edition_olid, work_olid=work_olid,
+                                    publisher=(doc.get('publisher') or [''])[0][:500],
+                                    publish_date=doc.get('publish_date', '')[:100])
+                     for form in sorted(forms)],
+                    update_conflicts=True, unique_fields=['isbn'],
+                    update_fields=['edition_olid', 'work_olid', 'publisher', 'publish_date'])
+            else:
+                _save_search_isbns([OLIndexSearchIsbn(isbn=form, work_olid=work_olid) for form in sorted(forms)])
+            if isbn_index_enabled():
+                _save_docs([_doc_row(doc)])
+    except Exception as e:
+        logger.error(f"Failed to record ISBNs {sorted(forms)}: {e}")
@@ -0,0 +1,112 @@
+"""
+Batched ISBN lookups, for when a whole stack of books is scanned at once.
+
+search_isbns() answers what it can from the local ISBN index and the cache tiers, then
+searches for the rest OL_ISBN_BATCH_SIZE to a search.json OR-query, running up to
+OL_ISBN_BATCH_WORKERS queries at once. Each ISBN's answer is cached under the URL
+search_by_isbn would search for it alone, so a later single lookup costs no request.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections
+from ..models.cache import OpenLibraryCache, canonical_url
+from .ol_isbn import indexed_search_docs, is_valid_isbn, isbn10_to_13, isbn_forms, normalize_isbn
+from .ol_memory_cache import memory_cache
+from .ol_metrics import ol_metrics
+from .ol_write_buffer import write_buffer
+from urllib.parse import urlencode
+import contextvars
+import logging
+
+logger = logging.getLogger(__name__)
+
+_isbn_batch_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_ISBN_BATCH_WORKERS', 4),
+    thread_name_prefix='ol-isbn-batch',
+)
+
+
+def cached_data(url):
+    """Response data for url from the memory, write-behind or database tier, without any request"""
+    url = canonical_url(url)
+    data = memory_cache.get(url)
+    if data is None:
+        data = write_buffer.get(url)
+    if data is None:
+        data = OpenLibraryCache.get_cached_response(url)
+    return data
+
+
+def search_isbn_batch(ol, isbns):
+    """
+    Resolve normalized isbns with one search.json OR-query; returns {isbn: doc}.
+
+    ol is the CachedOpenLibrary instance. isbns must be valid (see is_valid_isbn). Every
+    ISBN's answer is also cached under its own search URL, as if search_by_isbn had
+    searched for it alone; misses only when the response held every match, so a limit
+    can't pass off a hit as a miss.
+    """
+    # q= is lowercased like any search text, so ISBN-10s (which may end in X) go as ISBN-13s
+    terms = [isbn10_to_13(isbn) if len(isbn) == 10 else isbn for isbn in isbns]
+    # An ISBN can be listed under more than one work
+    limit = 2 * len(isbns)
+    query = urlencode({'q': f"isbn:({' OR '.join(terms)})", 'limit': limit})
+    data = ol.search_doc_response(query).json()
+    docs = {}
+    for doc in data.get('docs') or []:
+        listed = {normalize_isbn(value) for value in doc.get('isbn') or []}
+        for isbn in isbns:
+            if isbn_forms(isbn) & listed:
+                docs.setdefault(isbn, doc)
+    complete = data.get('numFound', 0) <= limit
+    for isbn in isbns:
+        if isbn not in docs and not complete:
+            continue
+        found = [docs[isbn]] if isbn in docs else []
+        ol.cache_data(ol.isbn_search_url(isbn), {'numFound': len(found), 'start': 0, 'docs': found})
+    return docs
+
+
+def _search_isbn_batch_pooled(ol, isbns):
+    try:
+        return search_isbn_batch(ol, isbns)
+    finally:
+        # Pool threads are not request threads, so Django never closes their connection
+        connections.close_all()
+
+
+def search_isbns(ol, isbns):
+    """
+    {isbn: search doc of its work} for the normalized isbns that can be found.
+
+    Invalid ISBNs are skipped without a lookup. Raises whatever a failed query raises.
+    """
+    valid = [isbn for isbn in dict.fromkeys(isbns) if is_valid_isbn(isbn)]
+    docs = indexed_search_docs(valid)
+    for _ in docs:
+        ol_metrics.record_lookup('isbn_search', 'database')
+
+    pending = []
+    for isbn in valid:
+        if isbn in docs:
+            continue
+        cached = cached_data(ol.isbn_search_url(isbn))
+        if isinstance(cached, dict) and 'docs' in cached:
+            ol_metrics.record_lookup('isbn_search', 'database')
+            if cached['docs']:
+                docs[isbn] = cached['docs'][0]
+        else:
+            pending.append(isbn)
+
+    size = max(getattr(settings, 'OL_ISBN_BATCH_SIZE', 20), 1)
+    batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+    logger.debug(f"Searching {len(pending)} of {len(valid)} ISBNs in {len(batches)} queries")
+    if len(batches) == 1:
+        docs.update(search_isbn_batch(ol, batches[0]))
+    elif batches:
+        # Each query runs in a copy of this context, so it keeps the caller's priority lane
+        futures = [_isbn_batch_executor.submit(contextvars.copy_context().run, _search_isbn_batch_pooled, ol, batch)
+                   for batch in batches]
+        for future in futures:
+            docs.update(future.result())
+    return docs
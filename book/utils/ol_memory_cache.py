@@ -0,0 +1,167 @@
+"""
+In-process caches in front of the OpenLibraryCache table.
+
+MemoryCache holds raw OpenLibrary responses; ResultMemo holds results computed from them
+(such as a whole search cascade) and forgets them whenever memory_cache is cleared. Both
+are per worker process and bounded.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from django.conf import settings
+import copy
+import json
+import threading
+import time
+
+
+class MemoryCache:
+    """
+    Bounded, TTL-aware LRU cache of OpenLibrary responses held in process memory.
+
+    Sits in front of the OpenLibraryCache table so that the same author/work JSON
+    requested several times during one entry flow only costs a database round trip
+    the first time. Entries are stored as compact UTF-8 JSON and decoded on every hit,
+    because callers mutate the dicts they get back (e.g. Author.get pops 'key').
+    """
+
+    def __init__(self, max_entries, max_bytes, max_ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()  # url -> (payload, expires_at)
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by clear(), so results derived from the cleared entries can tell
+        self.generation = 0
+
+    def get(self, url):
+        """Return the decoded response for url, or None if absent or expired"""
+        return self.get_with_expiry(url)[0]
+
+    def get_with_expiry(self, url):
+        """Return (decoded response, aware datetime it expires), or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            payload, expires_at = entry
+            now = time.monotonic()
+            if now >= expires_at:
+                self._remove(url)
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(url)
+            self.hits += 1
+        return json.loads(payload), datetime.now().astimezone() + timedelta(seconds=expires_at - now)
+
+    def set(self, url, data, expires_at=None):
+        """Store a response; expires_at (an aware datetime) bounds how long it is served"""
+        payload = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+        ttl = self.max_ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now().astimezone()).total_seconds())
+        if ttl <= 0:
+            return
+        with self._lock:
+            if url in self._entries:
+                self._remove(url)
+            self._entries[url] = (payload, time.monotonic() + ttl)
+            self.total_bytes += len(payload)
+            while (len(self._entries) > self.max_entries or
+                   self.total_bytes > self.max_bytes):
+                oldest_url = next(iter(self._entries))
+                self._remove(oldest_url)
+                self.evictions += 1
+
+    def invalidate(self, url):
+        """Drop a single entry"""
+        with self._lock:
+            if url in self._entries:
+                self._remove(url)
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.generation += 1
+
+    def stats(self):
+        """Return a snapshot of size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, url):
+        payload, _ = self._entries.pop(url)
+        self.total_bytes -= len(payload)
+
+
+# Shared by every CachedOpenLibrary instance in this worker process
+memory_cache = MemoryCache(
+    max_entries=getattr(settings, 'OL_MEMORY_CACHE_MAX_ENTRIES', 1000),
+    max_bytes=getattr(settings, 'OL_MEMORY_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+    max_ttl=getattr(settings, 'OL_MEMORY_CACHE_TTL', 60 * 60),
+)
+
+
+class ResultMemo:
+    """
+    Bounded LRU of results computed from OpenLibrary responses, e.g. a whole search cascade.
+
+    Each result is kept until the earliest expiry of the responses it was built from and
+    dropped when memory_cache is cleared. Results are objects rather than JSON, so hits
+    hand back deep copies.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (result, expires_at, memory_cache generation)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the result for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            result, expires_at, generation = entry
+            if generation != memory_cache.generation or datetime.now().astimezone() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(result)
+
+    def set(self, key, result, expires_at):
+        if expires_at <= datetime.now().astimezone():
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (copy.deepcopy(result), expires_at, memory_cache.generation)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Composite results of the book search cascade, see book_views._search_openlibrary
+search_result_memo = ResultMemo(
+    max_entries=getattr(settings, 'OL_SEARCH_RESULT_MEMO_MAX_ENTRIES', 200),
+)
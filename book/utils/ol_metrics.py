@@ -0,0 +1,148 @@
+"""
+Counters and latency histograms for CachedOpenLibrary.
+
+Every lookup is counted by endpoint type (see ol_client.endpoint_type) and by where it was
+answered from; every upstream request records its latency and status. The numbers are per
+process, like the memory cache they sit beside, so with several workers each one reports
+its own share.
+"""
+from bisect import bisect_left
+import threading
+
+# Where a lookup was answered from
+SOURCES = ('memory', 'database', 'stale', 'offline', 'network', 'coalesced', 'fallback', 'error')
+
+# Upstream latency histogram bucket bounds, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty or past the last bound)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class OLMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.lookups = {}     # (endpoint, source) -> count
+            self.responses = {}   # (endpoint, status) -> count
+            self.latency = {}     # endpoint -> Histogram
+            self.hedges = {}      # (endpoint, 'sent' | 'won') -> count
+
+    def record_lookup(self, endpoint, source):
+        with self._lock:
+            key = (endpoint, source)
+            self.lookups[key] = self.lookups.get(key, 0) + 1
+
+    def record_upstream(self, endpoint, seconds, status):
+        """status is the HTTP status code, or 'error' when no response came back"""
+        with self._lock:
+            key = (endpoint, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+            self.latency.setdefault(endpoint, Histogram()).observe(seconds)
+
+    def record_hedge(self, endpoint, won):
+        """A hedged request was sent for endpoint; won if it answered before the original"""
+        with self._lock:
+            for outcome in ('sent', 'won') if won else ('sent',):
+                key = (endpoint, outcome)
+                self.hedges[key] = self.hedges.get(key, 0) + 1
+
+    def latency_quantile(self, endpoint, q, min_count=1):
+        """Histogram.quantile of endpoint's upstream latency, or None with fewer than min_count samples"""
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None or histogram.count < max(min_count, 1):
+                return None
+            return histogram.quantile(q)
+
+    def summary(self):
+        """Per-endpoint lookups by source, hit rate and upstream latency, for the admin page"""
+        with self._lock:
+            endpoints = sorted({endpoint for endpoint, _ in self.lookups} | set(self.latency)
+                               | {endpoint for endpoint, _ in self.hedges})
+            rows = []
+            for endpoint in endpoints:
+                by_source = {source: self.lookups.get((endpoint, source), 0) for source in SOURCES}
+                total = sum(by_source.values())
+                upstream = by_source['network'] + by_source['error']
+                histogram = self.latency.get(endpoint)
+                rows.append({
+                    'endpoint': endpoint,
+                    'total': total,
+                    'sources': by_source,
+                    'hit_rate': (total - upstream) / total if total else None,
+                    'upstream_requests': histogram.count if histogram else 0,
+                    'mean_seconds': histogram.total / histogram.count if histogram and histogram.count else None,
+                    'p50_seconds': histogram.quantile(0.5) if histogram else None,
+                    'p90_seconds': histogram.quantile(0.9) if histogram else None,
+                    'hedges_sent': self.hedges.get((endpoint, 'sent'), 0),
+                    'hedges_won': self.hedges.get((endpoint, 'won'), 0),
+                })
+            return rows
+
+    def prometheus_lines(self):
+        """The counters and histograms in Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP libracents_ol_lookups_total OpenLibrary lookups by endpoint and where they were answered from',
+                '# TYPE libracents_ol_lookups_total counter',
+            ]
+            for (endpoint, source), count in sorted(self.lookups.items()):
+                lines.append(f'libracents_ol_lookups_total{{endpoint="{endpoint}",source="{source}"}} {count}')
+
+            lines += [
+                '# HELP libracents_ol_upstream_responses_total Upstream OpenLibrary responses by status',
+                '# TYPE libracents_ol_upstream_responses_total counter',
+            ]
+            for (endpoint, status), count in sorted(self.responses.items()):
+                lines.append(f'libracents_ol_upstream_responses_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP libracents_ol_hedged_requests_total Hedged OpenLibrary requests sent, and how many answered first',
+                '# TYPE libracents_ol_hedged_requests_total counter',
+            ]
+            for (endpoint, outcome), count in sorted(self.hedges.items()):
+                lines.append(f'libracents_ol_hedged_requests_total{{endpoint="{endpoint}",outcome="{outcome}"}} {count}')
+
+            lines += [
+                '# HELP libracents_ol_upstream_seconds Upstream OpenLibrary request latency',
+                '# TYPE libracents_ol_upstream_seconds histogram',
+            ]
+            for endpoint, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'libracents_ol_upstream_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'libracents_ol_upstream_seconds_sum{{endpoint="{endpoint}"}} {histogram.total}')
+                lines.append(f'libracents_ol_upstream_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+            return lines
+
+
+ol_metrics = OLMetrics()
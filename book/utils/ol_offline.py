@@ -0,0 +1,326 @@
+"""
+Offline lookups against the OpenLibrary bulk dumps.
+
+ingest_dump() streams an authors/works/editions dump (.txt or .txt.gz) into the OLIndex*
+tables in fixed-size chunks, recording progress so an interrupted run picks up where it
+stopped. resolve_offline() answers the OpenLibrary URLs CachedOpenLibrary makes from those
+tables, in the same JSON shape the API returns.
+
+Every lookup is an index seek: name and title prefixes are matched as ranges rather than
+LIKE patterns (which SQLite can only answer by scanning), and works are found by author
+through OLIndexWorkAuthor rather than by searching the comma-separated author_olids.
+"""
+from django.db import router, transaction
+from ..models.cache import OpenLibraryCache
+from ..models.ol_index import (
+    OLIndexAuthor, OLIndexWork, OLIndexWorkAuthor, OLIndexEdition, OLIndexIngestProgress, search_form
+)
+from django.db.models import Q
+from urllib.parse import parse_qsl, urlsplit
+import gzip
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DUMP_KINDS = ('authors', 'works', 'editions')
+
+AUTHOR_PATH = re.compile(r'^/authors/(OL\d+A)\.json$')
+WORK_PATH = re.compile(r'^/works/(OL\d+W)\.json$')
+ISBN_PATH = re.compile(r'^/isbn/([0-9Xx]+)\.json$')
+AUTHOR_OLID = re.compile(r'^OL\d+A$')
+
+# Authors considered when a search names an author rather than giving an OLID
+MAX_AUTHOR_MATCHES = 50
+
+# Sorts after any character a search form can end in, to turn a prefix into a range
+PREFIX_END = '\uffff'
+
+
+def detect_dump_kind(path):
+    """Guess the dump kind from a file name like ol_dump_works_2024-09-30.txt.gz"""
+    name = os.path.basename(path)
+    for kind in DUMP_KINDS:
+        if kind in name:
+            return kind
+    return None
+
+
+def _olid(key):
+    return key.rsplit('/', 1)[-1]
+
+
+def _author_rows(olid, record):
+    name = record.get('name') or record.get('personal_name')
+    if not name:
+        return
+    payload, _ = OpenLibraryCache.encode_payload(record)
+    name_search = search_form(name)
+    yield OLIndexAuthor(olid=olid, name=name[:500], name_search=name_search[:500],
+                        surname_search=name_search.rsplit(' ', 1)[-1][:500], record=payload)
+
+
+def _work_rows(olid, record):
+    title = record.get('title')
+    if not title:
+        return
+    author_olids = []
+    for credit in record.get('authors', []):
+        key = (credit.get('author') or {}).get('key') or credit.get('key')
+        if key:
+            author_olids.append(_olid(key))
+    year = re.search(r'\d{4}', record.get('first_publish_date', ''))
+    payload, _ = OpenLibraryCache.encode_payload(record)
+    yield OLIndexWork(olid=olid, title=title[:1000], title_search=search_form(title)[:1000],
+                      author_olids=','.join(author_olids)[:1000],
+                      first_publish_year=int(year.group()) if year else None,
+                      record=payload)
+
+
+def _edition_rows(olid, record):
+    works = record.get('works') or []
+    if not works or not works[0].get('key'):
+        return
+    publishers = record.get('publishers') or ['']
+    for isbn in record.get('isbn_13', []) + record.get('isbn_10', []):
+        isbn = re.sub(r'[^0-9X]', '', isbn.upper())
+        if len(isbn) not in (10, 13):
+            continue
+        yield OLIndexEdition(isbn=isbn, edition_olid=olid, work_olid=_olid(works[0]['key']),
+                             publisher=publishers[0][:500],
+                             publish_date=record.get('publish_date', '')[:100])
+
+
+def _save_work_credits(works):
+    """Replace the OLIndexWorkAuthor rows of works with their current author credits"""
+    OLIndexWorkAuthor.objects.filter(work_olid__in=[work.olid for work in works]).delete()
+    OLIndexWorkAuthor.objects.bulk_create(
+        [OLIndexWorkAuthor(author_olid=olid, work_olid=work.olid)
+         for work in works for olid in dict.fromkeys(work.author_olid_list)],
+        ignore_conflicts=True)
+
+
+# kind -> (dump record type, model, row builder, fields refreshed on re-ingest, chunk follow-up)
+INGESTERS = {
+    'authors': ('/type/author', OLIndexAuthor, _author_rows,
+                ['name', 'name_search', 'surname_search', 'record'], None),
+    'works': ('/type/work', OLIndexWork, _work_rows,
+              ['title', 'title_search', 'author_olids', 'first_publish_year', 'record'], _save_work_credits),
+    'editions': ('/type/edition', OLIndexEdition, _edition_rows,
+                 ['edition_olid', 'work_olid', 'publisher', 'publish_date'], None),
+}
+
+
+def _open_dump(path):
+    # Binary, so the byte offset of every line is known
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _commit_chunk(model, rows, update_fields, follow_up, progress, lines_done, bytes_done, completed=False):
+    """Write one chunk and advance the progress row in the same transaction"""
+    with transaction.atomic(using=router.db_for_write(model)):
+        if rows:
+            model.objects.bulk_create(rows, update_conflicts=True,
+                                      unique_fields=[model._meta.pk.name],
+                                      update_fields=update_fields)
+            if follow_up:
+                follow_up(rows)
+        progress.lines_done = lines_done
+        progress.bytes_done = bytes_done
+        progress.records_done += len(rows)
+        progress.completed = completed
+        progress.save()
+
+
+def ingest_dump(path, kind, chunk_size=5000, restart=False, limit=None):
+    """
+    Stream a dump file into the offline index, chunk_size lines per transaction.
+
+    Resumes by seeking straight past the last committed line unless restart is set. For
+    a plain .txt dump that is instant; a .txt.gz still has to be decompressed up to that
+    point (gzip can't seek), though without parsing any of it, so decompress very large
+    dumps first if they'll be ingested over several runs. limit caps the number of lines
+    read in this run. Returns the OLIndexIngestProgress row.
+    """
+    record_type, model, build_rows, update_fields, follow_up = INGESTERS[kind]
+    progress, _ = OLIndexIngestProgress.objects.get_or_create(
+        dump_path=os.path.abspath(path), defaults={'kind': kind})
+    if restart:
+        progress.lines_done = progress.bytes_done = progress.records_done = 0
+        progress.completed = False
+    if progress.completed:
+        return progress
+
+    start = progress.lines_done
+    rows = {}
+    line_no = start
+    offset = progress.bytes_done
+    completed = True
+    with _open_dump(path) as dump:
+        dump.seek(offset)
+        for raw_line in dump:
+            line_no += 1
+            offset += len(raw_line)
+            line = raw_line.decode('utf-8', errors='replace')
+            columns = line.rstrip('\n').split('\t', 4)
+            if len(columns) == 5 and columns[0] == record_type:
+                try:
+                    record = json.loads(columns[4])
+                except ValueError:
+                    logger.warning("Skipping unparseable %s record on line %d", kind, line_no)
+                else:
+                    # Keyed by PK so a chunk never upserts the same row twice
+                    for row in build_rows(_olid(columns[1]), record):
+                        rows[row.pk] = row
+            if line_no % chunk_size == 0:
+                _commit_chunk(model, list(rows.values()), update_fields, follow_up, progress, line_no, offset)
+                rows = {}
+            if limit and line_no - start >= limit:
+                completed = False
+                break
+    _commit_chunk(model, list(rows.values()), update_fields, follow_up, progress, line_no, offset, completed)
+    return progress
+
+
+def _author_names(olids):
+    return dict(OLIndexAuthor.objects.filter(olid__in=olids).values_list('olid', 'name'))
+
+
+def _search_doc(work, names):
+    """Shape an OLIndexWork like a search.json doc"""
+    author_olids = work.author_olid_list
+    return {
+        'key': f'/works/{work.olid}',
+        'title': work.title,
+        'author_name': [names[olid] for olid in author_olids if olid in names],
+        'author_key': [olid for olid in author_olids if olid in names],
+        'first_publish_year': work.first_publish_year,
+    }
+
+
+def _search_results(docs):
+    return {'numFound': len(docs), 'start': 0, 'docs': docs}
+
+
+def _edition(isbn):
+    """The OLIndexEdition row for isbn, or None; rows without an edition OLID are never grouped"""
+    return (OLIndexEdition.objects.filter(isbn=re.sub(r'[^0-9X]', '', isbn.upper()))
+            .exclude(edition_olid='').first())
+
+
+def _edition_record(isbn):
+    """An /isbn/{isbn}.json-style edition record rebuilt from OLIndexEdition rows"""
+    edition = _edition(isbn)
+    if not edition:
+        return None
+    isbns = OLIndexEdition.objects.filter(edition_olid=edition.edition_olid).values_list('isbn', flat=True)
+    return {
+        'key': f'/books/{edition.edition_olid}',
+        'works': [{'key': f'/works/{edition.work_olid}'}],
+        'publishers': [edition.publisher] if edition.publisher else [],
+        'publish_date': edition.publish_date,
+        'isbn_13': [value for value in isbns if len(value) == 13],
+        'isbn_10': [value for value in isbns if len(value) == 10],
+    }
+
+
+def _isbn_search(isbn):
+    edition = _edition(isbn)
+    if not edition:
+        return None
+    work = OLIndexWork.objects.filter(olid=edition.work_olid).first()
+    if not work:
+        return None
+    doc = _search_doc(work, _author_names(work.author_olid_list))
+    doc['publisher'] = [edition.publisher] if edition.publisher else []
+    doc['isbn'] = list(OLIndexEdition.objects.filter(edition_olid=edition.edition_olid)
+                       .values_list('isbn', flat=True))
+    return _search_results([doc])
+
+
+def _prefix(field, text):
+    """Q for field starting with text, as a range an index can seek to"""
+    return Q(**{f'{field}__gte': text, f'{field}__lt': text + PREFIX_END})
+
+
+def _author_olids(author):
+    """
+    OLIDs of the authors a search's author= means: the OLID itself, or authors whose name
+    contains it and either starts with it or has a surname starting with its last word
+    """
+    if AUTHOR_OLID.match(author):
+        return [author]
+    name = search_form(author)
+    if not name:
+        return []
+    candidates = (OLIndexAuthor.objects
+                  .filter(_prefix('name_search', name) | _prefix('surname_search', name.rsplit(' ', 1)[-1]))
+                  .values_list('olid', 'name_search')[:MAX_AUTHOR_MATCHES * 4])
+    return [olid for olid, name_search in candidates if name in name_search][:MAX_AUTHOR_MATCHES]
+
+
+def _work_search(title, author, limit):
+    works = OLIndexWork.objects.all()
+    if title:
+        works = works.filter(_prefix('title_search', search_form(title)))
+    if author:
+        credited = OLIndexWorkAuthor.objects.filter(author_olid__in=_author_olids(author))
+        works = works.filter(olid__in=credited.values('work_olid'))
+    works = list(works.order_by('title_search')[:limit])
+    if not works:
+        return None
+    names = _author_names({olid for work in works for olid in work.author_olid_list})
+    return _search_results([_search_doc(work, names) for work in works])
+
+
+def _author_autocomplete(q, limit):
+    authors = list(OLIndexAuthor.objects.filter(_prefix('name_search', search_form(q)))
+                   .order_by('name_search')[:limit])
+    if not authors:
+        return None
+    docs = []
+    for author in authors:
+        record = author.record_data
+        doc = {'key': f'/authors/{author.olid}', 'name': author.name}
+        for field in ('birth_date', 'death_date', 'alternate_names'):
+            if field in record:
+                doc[field] = record[field]
+        docs.append(doc)
+    return docs
+
+
+def resolve_offline(url):
+    """
+    Answer an OpenLibrary GET from the offline index, or return None if it can't.
+
+    Handles author, work and edition-by-ISBN records, ISBN search, title/author search
+    and author autocomplete; anything else (and anything not in the index) returns None.
+    """
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    limit = int(params['limit']) if params.get('limit', '').isdigit() else 10
+
+    match = AUTHOR_PATH.match(parts.path)
+    if match:
+        author = OLIndexAuthor.objects.filter(olid=match.group(1)).first()
+        return author.record_data if author else None
+    match = WORK_PATH.match(parts.path)
+    if match:
+        work = OLIndexWork.objects.filter(olid=match.group(1)).first()
+        return work.record_data if work else None
+    match = ISBN_PATH.match(parts.path)
+    if match:
+        return _edition_record(match.group(1))
+    if parts.path == '/authors/_autocomplete' and params.get('q'):
+        return _author_autocomplete(params['q'], limit)
+    if parts.path == '/search.json':
+        if params.get('isbn'):
+            return _isbn_search(params['isbn'])
+        title = params.get('title') or params.get('q')
+        if title or params.get('author'):
+            return _work_search(title, params.get('author'), limit)
+    return None
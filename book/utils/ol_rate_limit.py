@@ -0,0 +1,151 @@
+"""
+Outbound rate limiting for OpenLibrary, shared by every process on the host.
+
+The token bucket lives in a small JSON state file guarded by an exclusive flock, so gunicorn
+workers and management commands draw from the same budget. Requests run in one of two lanes:
+interactive (the default, for views) and background (refreshes, prefetching, batch jobs).
+Background requests leave OL_RATE_LIMIT_INTERACTIVE_RESERVE tokens untouched and stand aside
+while an interactive request is waiting, so a user never queues behind a batch job.
+"""
+from contextlib import contextmanager
+from django.conf import settings
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: the bucket is only shared between threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_lane = contextvars.ContextVar('ol_request_lane', default=INTERACTIVE)
+# Overrides OL_RATE_LIMIT_MAX_WAIT for the requests inside an ol_priority block
+_max_wait = contextvars.ContextVar('ol_request_max_wait', default=None)
+
+@contextmanager
+def ol_priority(lane, max_wait=None):
+    """
+    Run the OpenLibrary requests made inside the block in the given lane, each waiting
+    at most max_wait seconds for a token (default: the lane's OL_RATE_LIMIT_MAX_WAIT).
+    """
+    token = _lane.set(lane)
+    wait_token = _max_wait.set(max_wait)
+    try:
+        yield
+    finally:
+        _max_wait.reset(wait_token)
+        _lane.reset(token)
+
+def current_lane():
+    return _lane.get()
+
+
+class RateLimitTimeout(Exception):
+    """No token became available within the lane's wait limit"""
+
+
+class SharedTokenBucket:
+    """Token bucket whose state is kept in a file so that separate processes share it"""
+
+    # How long an interactive waiter holds background traffic off after its last check
+    INTERACTIVE_HOLD_SECONDS = 0.5
+
+    def __init__(self):
+        self._local_lock = threading.Lock()
+        self._local_state = {}
+
+    @staticmethod
+    def _config():
+        return {
+            'rate': getattr(settings, 'OL_RATE_LIMIT_PER_SECOND', None),
+            'burst': getattr(settings, 'OL_RATE_LIMIT_BURST', 10),
+            'reserve': getattr(settings, 'OL_RATE_LIMIT_INTERACTIVE_RESERVE', 2),
+            'path': getattr(settings, 'OL_RATE_LIMIT_STATE_FILE', None)
+                    or os.path.join(tempfile.gettempdir(), 'libracents-ol-ratelimit.json'),
+        }
+
+    @contextmanager
+    def _locked_state(self, path):
+        """Yield the bucket state dict under an exclusive lock; changes to it are written back"""
+        if fcntl is None:
+            with self._local_lock:
+                yield self._local_state
+            return
+        with open(path, 'a+') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state_file.seek(0)
+                try:
+                    state = json.loads(state_file.read() or '{}')
+                except ValueError:
+                    state = {}
+                yield state
+                state_file.seek(0)
+                state_file.truncate()
+                state_file.write(json.dumps(state))
+                state_file.flush()
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+    def _try_take(self, lane, config):
+        """Take a token if the lane may have one; otherwise return seconds until it might"""
+        rate, burst = config['rate'], config['burst']
+        with self._locked_state(config['path']) as state:
+            now = time.time()
+            elapsed = max(0.0, now - state.get('updated', now))
+            tokens = min(burst, state.get('tokens', burst) + elapsed * rate)
+            state['updated'] = now
+
+            floor = 1
+            if lane == BACKGROUND:
+                if now < state.get('interactive_waiting_until', 0):
+                    state['tokens'] = tokens
+                    return self.INTERACTIVE_HOLD_SECONDS
+                floor += min(config['reserve'], burst - 1)
+
+            if tokens >= floor:
+                state['tokens'] = tokens - 1
+                return 0
+            state['tokens'] = tokens
+            wait = (floor - tokens) / rate
+            if lane == INTERACTIVE:
+                state['interactive_waiting_until'] = now + wait + self.INTERACTIVE_HOLD_SECONDS
+            return wait
+
+    def acquire(self, lane=None, timeout=None):
+        """
+        Block until a token is available for lane (default: the current ol_priority lane).
+
+        Raises RateLimitTimeout if that takes longer than timeout seconds. Does nothing when
+        OL_RATE_LIMIT_PER_SECOND is unset.
+        """
+        config = self._config()
+        if not config['rate']:
+            return
+        lane = lane or current_lane()
+        if timeout is None:
+            timeout = _max_wait.get()
+        if timeout is None:
+            timeout = getattr(settings, 'OL_RATE_LIMIT_MAX_WAIT', {}).get(lane, 30)
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._try_take(lane, config)
+            if not wait:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RateLimitTimeout(f"No OpenLibrary request token for the {lane} lane within {timeout}s")
+            logger.debug(f"Rate limited ({lane}), waiting {wait:.2f}s")
+            time.sleep(min(wait, remaining, 0.25))
+
+
+rate_limiter = SharedTokenBucket()
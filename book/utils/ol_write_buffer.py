@@ -0,0 +1,108 @@
+"""
+Write-behind buffer for OpenLibraryCache.
+
+Request threads hand finished responses to the buffer and move on; a background thread
+upserts them in batches, when OL_CACHE_WRITE_BATCH_SIZE entries are waiting or every
+OL_CACHE_WRITE_FLUSH_SECONDS, and once more at interpreter exit. Entries still waiting
+are visible through get(), so this process never refetches what it is about to store.
+"""
+from collections import OrderedDict
+from django.conf import settings
+from django.db import connections
+from ..models.cache import OpenLibraryCache, canonical_url
+from .ol_isbn import index_search_docs
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWriteBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # canonical url -> (url, response_data, duration); re-enqueueing a URL replaces it
+        self._pending = OrderedDict()
+        self._wake = threading.Event()
+        self._thread = None
+        self._flush_lock = threading.Lock()
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'OL_CACHE_WRITE_BEHIND', False)
+
+    def enqueue(self, url, response_data, duration):
+        """Queue a cache write and return without touching the database"""
+        with self._lock:
+            key = canonical_url(url)
+            self._pending.pop(key, None)
+            self._pending[key] = (url, response_data, duration)
+            full = len(self._pending) >= getattr(settings, 'OL_CACHE_WRITE_BATCH_SIZE', 100)
+            self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def get(self, url):
+        """Response data waiting to be written for url, or None"""
+        with self._lock:
+            entry = self._pending.get(canonical_url(url))
+        return entry[1] if entry else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything queued so far in one transaction; returns how many entries were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending.values())
+                if not batch:
+                    return 0
+            try:
+                written = OpenLibraryCache.cache_many(batch)
+                index_search_docs((url, response_data) for url, response_data, _ in batch)
+            except Exception as e:
+                # It's only a cache: drop the batch rather than retry forever
+                logger.error(f"Failed to flush {len(batch)} cache writes: {e}")
+                written = 0
+            with self._lock:
+                for url, response_data, _ in batch:
+                    key = canonical_url(url)
+                    # Leave entries that were re-enqueued with newer data during the write
+                    if key in self._pending and self._pending[key][1] is response_data:
+                        del self._pending[key]
+            return written
+
+    def clear(self):
+        """Discard everything queued without writing it; returns how many entries were dropped"""
+        # Waits out a flush in progress, so nothing queued before the clear lands after it
+        with self._flush_lock:
+            with self._lock:
+                dropped = len(self._pending)
+                self._pending.clear()
+        return dropped
+
+    def _ensure_flusher(self):
+        """Start the flusher thread on first use (called with _lock held)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='ol-cache-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(getattr(settings, 'OL_CACHE_WRITE_FLUSH_SECONDS', 1.0))
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                # Not a request thread, so Django never closes its connections for us
+                connections.close_all()
+
+
+write_buffer = CacheWriteBuffer()
+
+@atexit.register
+def _flush_at_exit():
+    if len(write_buffer):
+        write_buffer.flush()
@@ -22,6 +22,7 @@ from .autocomplete_views import (
     test_autocomplete
 )
 from .list_views import list
+from .metrics_views import openlibrary_metrics
 
 def index(request):
     return render(request, 'index.html')
@@ -49,5 +50,6 @@ __all__ = [
     'get_books_by_location',
     'get_shelf_books',
     'title_only_search',
-    'start_collection'
+    'start_collection',
+    'openlibrary_metrics'
 ]
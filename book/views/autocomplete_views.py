@@ -1,13 +1,42 @@
 import logging
 from django.http import HttpResponseBadRequest, JsonResponse
 from ..models import Author, Book
-from ..utils.ol_client import CachedOpenLibrary
+from ..utils.autocomplete_cache import autocomplete_cache, autocomplete_cache_enabled
+from ..utils.ol_bibliography import bibliography_titles, prefetch_bibliography
+from ..utils.ol_client import CachedOpenLibrary, OpenLibraryUnavailable
 
 logger = logging.getLogger(__name__)
 
 # Constant used for separating values in autocomplete
 DIVIDER = " ::: "
 
+def _cached_or_fetch(stage, scope, query, fetch):
+    """
+    Values for query from the prefix-narrowing autocomplete cache, or from fetch().
+
+    fetch returns ([(match text, value)], complete), complete meaning no limit cut the
+    list short; the values are returned either way.
+    """
+    if not autocomplete_cache_enabled():
+        return [value for _, value in fetch()[0]]
+    cached = autocomplete_cache.get(stage, scope, query)
+    if cached is None:
+        items, complete = fetch()
+        autocomplete_cache.set(stage, scope, query, items, complete)
+        cached = items
+    return [value for _, value in cached]
+
+def _local_author_matches(search_str):
+    """(search name, display value) for every local Author whose search name contains search_str"""
+    results = []
+    for author in Author.objects.filter(search_name__contains=search_str):
+        # Add any distinguishing details to local results
+        display_name = author.primary_name
+        if hasattr(author, 'birth_date') and hasattr(author, 'death_date'):
+            display_name += f" ({author.birth_date}-{author.death_date})"
+        results.append((author.search_name, display_name + DIVIDER + author.olid))
+    return results
+
 def author_autocomplete(request):
     """ Return a list of autocomplete suggestions for authors """
     # TODO: Sort authors by number of books by them in the local library
@@ -17,21 +46,23 @@ def author_autocomplete(request):
     search_str = request.GET['q']
     
     # first, look for local results
-    author_qs = Author.objects.filter(search_name__contains=search_str)
-    if author_qs:
-        # Add any distinguishing details to local results
-        results = []
-        for author in author_qs:
-            display_name = author.primary_name
-            if hasattr(author, 'birth_date') and hasattr(author, 'death_date'):
-                display_name += f" ({author.birth_date}-{author.death_date})"
-            results.append(display_name + DIVIDER + author.olid)
-        return JsonResponse(results, safe=False)
+    local_results = _cached_or_fetch('author_local', '', search_str, lambda: (_local_author_matches(search_str), True))
+    if local_results:
+        return JsonResponse(local_results, safe=False)
 
     # otherwise, do an OpenLibrary API search
     RESULTS_LIMIT = 5
     ol = CachedOpenLibrary()
-    authors = ol.Author.search(search_str, RESULTS_LIMIT)
+    def search_openlibrary():
+        authors = ol.Author.search(search_str, RESULTS_LIMIT)
+        matches = [(' '.join([author.get('name', '')] + author.get('alternate_names', [])), author)
+                   for author in authors]
+        return matches, len(authors) < RESULTS_LIMIT
+    try:
+        authors = _cached_or_fetch('author_remote', '', search_str, search_openlibrary)
+    except OpenLibraryUnavailable:
+        logger.warning("OpenLibrary unavailable, no remote author suggestions for %s", search_str)
+        return JsonResponse([], safe=False)
     
     # Sort authors by our ranking criteria
     def rank_author(author):
@@ -81,21 +112,30 @@ def title_autocomplete(request, oid):
 
     # first attempt local lookup
     title = request.GET['q']
-    author = Author.objects.get(olid=oid)
-    book_qs = Book.objects.filter(author=author, search_name__contains=title)
-    if book_qs:
-        book = book_qs[0]
-        logger.info("Successful local lookup of book candidate %s (%s) on %s", 
-                   book.title, book.olid, title)
+    def local_lookup():
+        author = Author.objects.get(olid=oid)
+        book_qs = Book.objects.filter(author=author, search_name__contains=title)
         # We're using the DIVIDER as a kludge to pass these two values together in a single value
-        return JsonResponse(
-            [book.title + DIVIDER + book.olid for book in book_qs],
-            safe=False
-        )
+        return [(book.search_name, book.title + DIVIDER + book.olid) for book in book_qs], True
+    local_results = _cached_or_fetch('title_local', oid, title, local_lookup)
+    if local_results:
+        logger.info("Successful local lookup of book candidate %s on %s", local_results[0], title)
+        return JsonResponse(local_results, safe=False)
+
+    # then the author's prefetched bibliography, if it has arrived whole and has a match
+    titles = bibliography_titles(oid, title)
+    if titles is not None:
+        logger.info("Served title autocomplete for %s from the bibliography of %s", title, oid)
+        return JsonResponse(titles, safe=False)
 
     # then try to do OpenLibrary API lookup
-    ol = CachedOpenLibrary()    
-    result = ol.Work.search(author=oid, title=title)
+    ol = CachedOpenLibrary()
+    prefetch_bibliography(ol, oid)
+    try:
+        result = ol.Work.search(author=oid, title=title)
+    except OpenLibraryUnavailable:
+        logger.warning("OpenLibrary unavailable, no remote title suggestions for %s", title)
+        return JsonResponse({})
     if not result:
         logger.warning("Failed to lookup title autocomplete for author oid %s and title %s", 
                       oid, title)
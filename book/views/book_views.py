@@ -1,19 +1,33 @@
 import logging
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.db import connections
 from django.http import HttpResponseRedirect, HttpResponseBadRequest, JsonResponse, HttpResponseServerError
 from django.shortcuts import render
 from ..forms import TitleForm, TitleGivenAuthorForm, ConfirmBook, TitleOnlyForm, AuthorForm
 from ..models import Author, Work, Edition, Copy, Location, Shelf
-from ..utils.ol_client import CachedOpenLibrary
+from ..utils.ol_bibliography import prefetch_bibliography
+from ..utils.ol_client import CachedOpenLibrary, OpenLibraryUnavailable, track_expiry
+from ..utils.ol_memory_cache import search_result_memo
+from ..utils.ol_rate_limit import BACKGROUND, RateLimitTimeout, ol_priority
 from .autocomplete_views import DIVIDER
 from ..controllers.work_controller import WorkController
+import contextvars
 import json
 import re
+import threading
 from ..utils.author_utils import format_primary_name
 from django import forms
 
 logger = logging.getLogger(__name__)
 
+# Runs the speculative steps of the `_search_openlibrary` fallback cascade
+_search_cascade_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'OL_SEARCH_CASCADE_WORKERS', 8),
+    thread_name_prefix='ol-search-cascade',
+)
+
 def get_title(request):
     """ Do a lookup of a book by title, with a particular author potentially already set """
     try:
@@ -78,6 +92,9 @@ def get_title(request):
                             alternate_names=author_details.get('alternate_names', [])
                         )
                 
+                # Load the author's works in the background for title autocomplete
+                prefetch_bibliography(CachedOpenLibrary(), a_olid)
+
                 form = TitleGivenAuthorForm({
                     'author_olid': a_olid, 
                     'author_name': author_name,
@@ -497,6 +514,8 @@ def _handle_book_search(request):
         logger.info("Form data: %s", form.data)
         forms.append(form)
 
+    _prefetch_confirmation(ol, forms)
+
     # Add locations to context for the template
     context['locations'] = Location.objects.all()
     context['forms'] = forms
@@ -508,6 +527,13 @@ def _handle_book_search(request):
 
     return render(request, template, context)
 
+def _prefetch_confirmation(ol, forms):
+    """Warm the records the confirmation POST will read while the operator picks a candidate"""
+    ol.prefetch_records(
+        work_olids=[form.data.get('work_olid') for form in forms],
+        author_olids=[olid for form in forms for olid in form.data.get('author_olids', '').split(',')],
+    )
+
 def _work_to_dict(work):
     """Convert a CachedWork object to a dictionary with the fields we need"""
     # Get alternate names from both the root level and author data
@@ -525,9 +551,186 @@ def _work_to_dict(work):
         'title': getattr(work, 'title', '')
     }
 
+def _plan_search_cascade(title, author_olid=None, author_name=None):
+    """
+    List the (step, search kwargs) pairs `_search_openlibrary` may need, in precedence order.
+
+    Which steps apply depends only on the inputs, never on earlier results, so they can
+    all be started up front.
+    """
+    steps = []
+    if author_olid:
+        steps.append(('author_olid', {'author': author_olid, 'title': title, 'limit': 2}))
+    if author_name:
+        # Strip dates and other parenthetical information before searching
+        clean_name = re.sub(r'\s*\([^)]*\)', '', author_name).strip()
+        steps.append(('author_name', {'author': clean_name, 'title': title, 'limit': 2}))
+        if ' ' in clean_name:
+            # Split name and check if we have what looks like a middle initial
+            name_parts = clean_name.split()
+            if len(name_parts) > 2 and len(name_parts[1]) <= 2:
+                simplified_name = f"{name_parts[0]} {name_parts[-1]}"
+                steps.append(('simplified_name', {'author': simplified_name, 'title': title, 'limit': 2}))
+            # Get the last word as the last name
+            steps.append(('last_name', {'author': clean_name.split()[-1], 'title': title, 'limit': 2}))
+    steps.append(('title', {'title': title, 'limit': 2}))
+    return steps
+
+class _SpeculativeStep:
+    """
+    A fallback step of the parallel cascade, run by whichever claims it first: a pool
+    thread speculating on it, or the cascade once it turns out to need it.
+    """
+
+    def __init__(self, ol, kwargs, settled):
+        self.ol = ol
+        self.kwargs = kwargs
+        self.settled = settled
+        self.future = None
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    def _claim(self):
+        with self._lock:
+            claimed, self._claimed = self._claimed, True
+        return not claimed
+
+    def speculate(self, delay, max_wait):
+        """
+        Pool task: after delay, run the step in the background lane unless the cascade got
+        there first. Gives up if no background token comes within max_wait seconds.
+        """
+        try:
+            if self.settled.wait(delay) or not self._claim():
+                return None
+            with ol_priority(BACKGROUND, max_wait=max_wait):
+                return self.ol.Work.search(**self.kwargs)
+        finally:
+            # Pool threads are not request threads, so Django never closes their connection
+            connections.close_all()
+
+    def result(self, timeout):
+        """
+        The step's results. One no pool thread has started yet is run here, in the
+        caller's lane, as is one that gave up waiting for a background rate-limit token
+        or hasn't answered within timeout seconds (a rerun joins its request if that is
+        already on the wire).
+        """
+        if self._claim():
+            return self.ol.Work.search(**self.kwargs)
+        try:
+            return self.future.result(timeout=timeout)
+        except TimeoutError:
+            logger.info("Speculative search %s is slow, searching in the caller's lane", self.kwargs)
+        except OpenLibraryUnavailable as e:
+            if not isinstance(e.__cause__, RateLimitTimeout):
+                raise
+            logger.info("Speculative search %s got no background token, searching in the caller's lane", self.kwargs)
+        return self.ol.Work.search(**self.kwargs)
+
+def _start_search_cascade(ol, steps):
+    """
+    Return a mapping of step name to a zero-argument callable yielding that step's results,
+    plus a callable to run once the cascade is done with them.
+
+    In parallel mode the first step runs on the calling thread as usual, and any
+    fallback step it hasn't settled within OL_SEARCH_CASCADE_SPECULATION_DELAY seconds
+    is started speculatively, so a miss-heavy cascade costs roughly the slowest round
+    trip instead of the sum of them while one answered from the cache sends nothing
+    extra. Speculative steps run in the background lane, so they never take rate-limit
+    tokens from, or queue ahead of, interactive requests. Otherwise each step runs
+    lazily when first asked for, exactly as the sequential cascade did.
+    """
+    if not getattr(settings, 'OL_PARALLEL_SEARCH_CASCADE', False) or len(steps) < 2:
+        return {name: (lambda kwargs=kwargs: ol.Work.search(**kwargs)) for name, kwargs in steps}, lambda: None
+    (first_name, first_kwargs), fallbacks = steps[0], steps[1:]
+    delay = getattr(settings, 'OL_SEARCH_CASCADE_SPECULATION_DELAY', 0.1)
+    max_wait = getattr(settings, 'OL_SEARCH_CASCADE_SPECULATION_MAX_WAIT', 0.5)
+    settled = threading.Event()
+    search = {first_name: lambda: ol.Work.search(**first_kwargs)}
+    speculative = []
+    for name, kwargs in fallbacks:
+        step = _SpeculativeStep(ol, kwargs, settled)
+        # Each step runs in a copy of this context so its reads are seen by track_expiry
+        step.future = _search_cascade_executor.submit(contextvars.copy_context().run, step.speculate,
+                                                      delay, max_wait)
+        search[name] = lambda step=step: step.result(timeout=max_wait + delay)
+        speculative.append(step)
+
+    def settle():
+        # Speculative steps we no longer need: drop those not yet started, ignore the rest
+        settled.set()
+        for step in speculative:
+            step.future.cancel()
+    return search, settle
+
+def _record_alternate_olid(local_author, result):
+    """Remember the result's author OLID as an alternate for local_author if it differs"""
+    if hasattr(result, 'author_key') and result.author_key:
+        ol_author_id = result.author_key[0] if isinstance(result.author_key, list) else result.author_key
+        if ol_author_id and ol_author_id != local_author.olid:
+            logger.info("Found alternate OLID %s for author %s", ol_author_id, local_author.primary_name)
+            if not local_author.alternate_olids:
+                local_author.alternate_olids = []
+            if ol_author_id not in local_author.alternate_olids:
+                local_author.alternate_olids.append(ol_author_id)
+                local_author.save()
+
+def _record_alternate_olids(local_author, step, results):
+    """
+    Remember the alternate author OLIDs results from the given cascade step reveal: every
+    author of an author-OLID hit, otherwise those whose name matches local_author's.
+    """
+    if not local_author:
+        return
+    for result in results:
+        if step == 'author_olid':
+            _record_alternate_olid(local_author, result)
+        elif step in ('author_name', 'title') and result.authors:
+            details = _work_to_dict(result) if step == 'title' else result
+            for author in result.authors:
+                if _author_name_matches(author['name'], local_author, details):
+                    # Found a match - check for alternate OLID
+                    _record_alternate_olid(local_author, result)
+
+def _search_memo_key(title, author_olid, author_name):
+    def normalize(text):
+        return ' '.join((text or '').split()).casefold()
+    return (normalize(title), author_olid or '', normalize(author_name))
+
 def _search_openlibrary(ol, title, author_olid=None, author_name=None):
-    """Search OpenLibrary for works matching title and author"""
+    """
+    Search OpenLibrary for works matching title and author
+
+    Tries author OLID, cleaned author name, name without middle initial, last name only
+    and finally title only; the first step with results wins.
+
+    With OL_SEARCH_RESULT_MEMO the final results are remembered under the normalized
+    inputs until the first cached response they came from expires, so revisiting the
+    same confirmation page costs one lookup instead of the whole cascade. A memo hit
+    still records the alternate author OLIDs its results reveal.
+    """
+    if not getattr(settings, 'OL_SEARCH_RESULT_MEMO', False):
+        return _run_search_cascade(ol, title, author_olid, author_name)[1]
+
+    key = _search_memo_key(title, author_olid, author_name)
+    memo = search_result_memo.get(key)
+    if memo is not None:
+        logger.info("Search cascade result memo hit for %s", key)
+        step, results = memo
+        if author_olid:
+            _record_alternate_olids(Author.objects.filter(olid=author_olid).first(), step, results)
+        return results
+    with track_expiry() as expiries:
+        step, results = _run_search_cascade(ol, title, author_olid, author_name)
+    if expiries:
+        search_result_memo.set(key, (step, results), min(expiries))
+    return results
+
+def _run_search_cascade(ol, title, author_olid=None, author_name=None):
+    """The `_search_openlibrary` cascade itself; returns (name of the step that hit, results)"""
     results = []
+    step = None
     
     # Build author context and get local author if available
     local_author = None
@@ -536,108 +739,76 @@ def _search_openlibrary(ol, title, author_olid=None, author_name=None):
         logger.info("Found local author in `_search_openlibrary` (pass in?): %s with OLID %s", 
                    local_author.primary_name if local_author else None, 
                    author_olid)
-    
-    # Try initial search with author ID if available
-    if author_olid:
-        logger.info("Searching OpenLibrary with author='%s', title='%s', limit=2", author_olid, title)
-        try:
-            results = ol.Work.search(author=author_olid, title=title, limit=2)
-            # Check author keys in results
-            if results and local_author:
-                for result in results:
-                    if hasattr(result, 'author_key') and result.author_key:
-                        ol_author_id = result.author_key[0] if isinstance(result.author_key, list) else result.author_key
-                        if ol_author_id and ol_author_id != local_author.olid:
-                            logger.info("Found alternate OLID %s for author %s", ol_author_id, local_author.primary_name)
-                            if not local_author.alternate_olids:
-                                local_author.alternate_olids = []
-                            if ol_author_id not in local_author.alternate_olids:
-                                local_author.alternate_olids.append(ol_author_id)
-                                local_author.save()
-        except Exception as e:
-            logger.exception("Error during OpenLibrary search")
-            raise
 
-    # If no results with ID, try author name
-    if not results and author_name:
-        try:
-            # Strip dates and other parenthetical information before searching
-            clean_name = re.sub(r'\s*\([^)]*\)', '', author_name).strip()
-            logger.info("Trying search with author name '%s'", clean_name)
-            name_results = ol.Work.search(author=clean_name, title=title, limit=2)
-            if name_results:
-                # Check if any authors match our local author's alternate names
-                for result in name_results:
-                    if result.authors and local_author:
-                        for author in result.authors:
-                            if _author_name_matches(author['name'], local_author, result):
-                                # Found a match - check for alternate OLID
-                                if hasattr(result, 'author_key') and result.author_key:
-                                    ol_author_id = result.author_key[0] if isinstance(result.author_key, list) else result.author_key
-                                    if ol_author_id and ol_author_id != local_author.olid:
-                                        logger.info("Found alternate OLID %s for author %s", ol_author_id, local_author.primary_name)
-                                        if not local_author.alternate_olids:
-                                            local_author.alternate_olids = []
-                                        if ol_author_id not in local_author.alternate_olids:
-                                            local_author.alternate_olids.append(ol_author_id)
-                                            local_author.save()
-                results.extend(name_results)
-            
-            # If still no results, try with simplified author name (remove middle initial)
-            if not results and ' ' in clean_name:
-                # Split name and check if we have what looks like a middle initial
-                name_parts = clean_name.split()
-                if len(name_parts) > 2 and len(name_parts[1]) <= 2:
-                    simplified_name = f"{name_parts[0]} {name_parts[-1]}"
-                    logger.info("Trying search with simplified author name '%s'", simplified_name)
-                    simple_results = ol.Work.search(author=simplified_name, title=title, limit=2)
+    steps = _plan_search_cascade(title, author_olid, author_name)
+    step_kwargs = dict(steps)
+    search, settle = _start_search_cascade(ol, steps)
+    try:
+        # Try initial search with author ID if available
+        if 'author_olid' in search:
+            logger.info("Searching OpenLibrary with author='%s', title='%s', limit=2", author_olid, title)
+            try:
+                results = search['author_olid']()
+                if results:
+                    step = 'author_olid'
+                    # Check author keys in results
+                    _record_alternate_olids(local_author, step, results)
+            except Exception as e:
+                logger.exception("Error during OpenLibrary search")
+                raise
+
+        # If no results with ID, try author name
+        if not results and 'author_name' in search:
+            try:
+                logger.info("Trying search with author name '%s'", step_kwargs['author_name']['author'])
+                name_results = search['author_name']()
+                if name_results:
+                    step = 'author_name'
+                    # Check if any authors match our local author's alternate names
+                    _record_alternate_olids(local_author, step, name_results)
+                    results.extend(name_results)
+                
+                # If still no results, try with simplified author name (remove middle initial)
+                if not results and 'simplified_name' in search:
+                    logger.info("Trying search with simplified author name '%s'",
+                                step_kwargs['simplified_name']['author'])
+                    simple_results = search['simplified_name']()
                     if simple_results:
+                        step = 'simplified_name'
                         results.extend(simple_results)
-                        
-            # If still no results, try with last name only
-            if not results and ' ' in clean_name:
-                # Get the last word as the last name
-                last_name = clean_name.split()[-1]
-                logger.info("Trying search with author last name only '%s'", last_name)
-                try:
-                    last_name_results = ol.Work.search(author=last_name, title=title, limit=2)
-                    if last_name_results:
-                        results.extend(last_name_results)
-                except Exception as e:
-                    logger.warning("Error during last name search: %s", e)
-
-        except Exception as e:
-            logger.warning("Error during author name search: %s", e)
-
-    # If still no results, try title-only search
-    if not results:
-        logger.info("Trying title-only search for '%s'", title)
-        try:
-            title_results = ol.Work.search(title=title, limit=2)
-            if title_results:
-                # Check if any authors match our local author's alternate names
-                for result in title_results:
-                    if result.authors and local_author:
-                        result_dict = _work_to_dict(result)
-                        for author in result.authors:
-                            if _author_name_matches(author['name'], local_author, result_dict):
-                                # Found a match - check for alternate OLID
-                                if hasattr(result, 'author_key') and result.author_key:
-                                    ol_author_id = result.author_key[0] if isinstance(result.author_key, list) else result.author_key
-                                    if ol_author_id and ol_author_id != local_author.olid:
-                                        logger.info("Found alternate OLID %s for author %s", ol_author_id, local_author.primary_name)
-                                        if not local_author.alternate_olids:
-                                            local_author.alternate_olids = []
-                                        if ol_author_id not in local_author.alternate_olids:
-                                            local_author.alternate_olids.append(ol_author_id)
-                                            local_author.save()
-                results.extend(title_results)
-        except Exception as e:
-            logger.warning("Error during title-only search: %s", e)
-            if not results:
-                raise Exception("no result")
-
-    return results[:2]  # Keep only first two results
+                            
+                # If still no results, try with last name only
+                if not results and 'last_name' in search:
+                    logger.info("Trying search with author last name only '%s'", step_kwargs['last_name']['author'])
+                    try:
+                        last_name_results = search['last_name']()
+                        if last_name_results:
+                            step = 'last_name'
+                            results.extend(last_name_results)
+                    except Exception as e:
+                        logger.warning("Error during last name search: %s", e)
+
+            except Exception as e:
+                logger.warning("Error during author name search: %s", e)
+
+        # If still no results, try title-only search
+        if not results:
+            logger.info("Trying title-only search for '%s'", title)
+            try:
+                title_results = search['title']()
+                if title_results:
+                    step = 'title'
+                    # Check if any authors match our local author's alternate names
+                    _record_alternate_olids(local_author, step, title_results)
+                    results.extend(title_results)
+            except Exception as e:
+                logger.warning("Error during title-only search: %s", e)
+                if not results:
+                    raise Exception("no result")
+    finally:
+        settle()
+
+    return step, results[:2]  # Keep only first two results
 
 def title_only_search(request):
     """Search for a book by title only"""
@@ -690,7 +861,8 @@ def _handle_title_only_search(request, title):
             }
             
             forms.append(ConfirmBook(form_args))
-        
+
+        _prefetch_confirmation(ol, forms)
         context = {
             'forms': forms,
             'locations': Location.objects.all(),
@@ -93,6 +93,11 @@ def get_book_by_isbn(request):
                         form_data['author_names'] = ','.join(author_names)
                     
                     logger.info("Final form_data for confirmation: %s", form_data)
+                    # Warm the records the confirmation POST will read
+                    ol.prefetch_records(
+                        work_olids=[form_data['work_olid']],
+                        author_olids=form_data.get('author_olids', '').split(','),
+                    )
                     
                     confirm_form = ConfirmBook(form_data)
                     return render(request, 'confirm-book.html', {
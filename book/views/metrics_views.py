@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from ..utils.ol_circuit_breaker import CircuitBreaker, circuit_breaker
+from ..utils.ol_memory_cache import memory_cache
+from ..utils.ol_metrics import ol_metrics
+
+def openlibrary_metrics(request):
+    """
+    OpenLibrary client metrics for this worker process, in Prometheus text format.
+
+    For staff, or a scraper sending "Authorization: Bearer <OL_METRICS_TOKEN>".
+    """
+    token = getattr(settings, 'OL_METRICS_TOKEN', None)
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return _metrics_response(request)
+    return staff_member_required(_metrics_response)(request)
+
+def _metrics_response(request):
+    lines = ol_metrics.prometheus_lines()
+
+    cache = memory_cache.stats()
+    lines += [
+        '# HELP libracents_ol_memory_cache_entries Entries in the in-process OpenLibrary cache',
+        '# TYPE libracents_ol_memory_cache_entries gauge',
+        f'libracents_ol_memory_cache_entries {cache["entries"]}',
+        '# HELP libracents_ol_memory_cache_bytes Bytes held by the in-process OpenLibrary cache',
+        '# TYPE libracents_ol_memory_cache_bytes gauge',
+        f'libracents_ol_memory_cache_bytes {cache["bytes"]}',
+        '# HELP libracents_ol_memory_cache_evictions_total Evictions from the in-process OpenLibrary cache',
+        '# TYPE libracents_ol_memory_cache_evictions_total counter',
+        f'libracents_ol_memory_cache_evictions_total {cache["evictions"]}',
+    ]
+
+    circuit = circuit_breaker.stats()
+    lines += [
+        '# HELP libracents_ol_circuit_open Whether the OpenLibrary circuit breaker is refusing requests',
+        '# TYPE libracents_ol_circuit_open gauge',
+        f'libracents_ol_circuit_open {int(circuit["state"] != CircuitBreaker.CLOSED)}',
+    ]
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')